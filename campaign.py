@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import signal
+from collections import defaultdict
+from random import SystemRandom, Random
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+from drawing import drawing
+from emulator import runner
+from emulator.async_runner import AsyncPermutationRunner
+from emulator.results_store import RESULTS_DB_PATH, ResultsStore
+from emulator.runner import PERMUTATIONS, PTH_FILES, PermutationRunner, ResultKey, WallRunner
+from emulator.wall import DuplicateWall, get_all_tiles
+from emulator.wall_corpus import WallCorpus
+from emulator.wall_filter import WallFilter
+
+
+class CampaignState:
+    # Progress of a campaign, saved after every wall so that a restarted campaign resumes where it stopped
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.walls_done: int = 0
+        self.pending_walls: list[list[str]] = []  # walls that were started but whose results are not saved yet
+        self.random_state: Optional[Any] = None
+        if os.path.exists(file_path):
+            with open(file_path, "r") as f:
+                data = json.load(f)
+            self.walls_done = data["walls_done"]
+            self.pending_walls = data["pending_walls"]
+            self.random_state = data.get("random_state")
+
+    def save(self):
+        data = {
+            "walls_done": self.walls_done,
+            "pending_walls": self.pending_walls,
+            "random_state": self.random_state,
+        }
+        tmp_file_path = self.file_path + ".tmp"
+        with open(tmp_file_path, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file_path, self.file_path)
+
+
+class Campaign:
+    def __init__(self, pth_files: list[str], walls_count: Optional[int], seed: Optional[str], workers: Optional[int],
+                 state_file_path: str, results_db_path: str, corpus_path: Optional[str] = None,
+                 wall_filter: Optional[WallFilter] = None, max_rounds: Optional[int] = None,
+                 analyse_hands: bool = False):
+        self.pth_files = pth_files
+        self.walls_count = walls_count
+        self.workers = workers
+        # rounds emulated at once on one event loop, None spreads rounds over worker processes instead
+        self.max_rounds = max_rounds
+        self.analyse_hands = analyse_hands
+        self.results_db_path = results_db_path
+        self.state = CampaignState(file_path=state_file_path)
+        self.stop_requested = False
+        # walls are taken from a pre-generated corpus in row order instead of being shuffled here
+        self.corpus: Optional[WallCorpus] = None
+        self.corpus_rows: Optional[np.ndarray] = None  # rows that pass the wall filter, in row order
+        if corpus_path is not None:
+            self.corpus = WallCorpus(corpus_path=corpus_path)
+            if wall_filter is None:
+                self.corpus_rows = np.arange(len(self.corpus))
+            else:
+                self.corpus_rows = np.flatnonzero(wall_filter.get_mask(walls=self.corpus.walls))
+                logging.info("%d of %d corpus walls pass the wall filter", len(self.corpus_rows), len(self.corpus))
+        # walls that do not pass the filter are not emulated
+        self.wall_filter = wall_filter
+        self.filtered_walls: int = 0
+
+        self.seed = seed
+        if seed is None:
+            self.r = SystemRandom()
+        else:
+            self.r = Random(seed)
+            if self.state.random_state is not None:
+                version, internal_state, gauss_next = self.state.random_state
+                self.r.setstate((version, tuple(internal_state), gauss_next))
+
+    def request_stop(self, signum, frame):
+        if self.stop_requested:
+            raise KeyboardInterrupt()
+        logging.info("Signal %d received, finishing walls in progress", signum)
+        self.stop_requested = True
+
+    def generate_walls(self) -> Iterator[list[str]]:
+        for shuffled_tiles in list(self.state.pending_walls):
+            logging.info("Resuming wall %s", drawing.get_wall_hash(wall=DuplicateWall(shuffled_tiles=shuffled_tiles)))
+            yield shuffled_tiles
+        walls_started = self.state.walls_done + len(self.state.pending_walls)
+        while not self.stop_requested and (self.walls_count is None or walls_started < self.walls_count):
+            if self.corpus is not None:
+                if walls_started >= len(self.corpus_rows):
+                    logging.info("All %d walls of the corpus are started", len(self.corpus_rows))
+                    break
+                shuffled_tiles = self.corpus.get_shuffled_tiles(i=int(self.corpus_rows[walls_started]))
+            else:
+                shuffled_tiles = get_all_tiles()
+                self.r.shuffle(shuffled_tiles)
+                if self.wall_filter is not None and not self.wall_filter.accepts(shuffled_tiles=shuffled_tiles):
+                    self.filtered_walls += 1
+                    continue
+            self.state.pending_walls.append(shuffled_tiles)
+            if self.seed is not None:
+                self.state.random_state = self.r.getstate()
+            self.state.save()
+            walls_started += 1
+            yield shuffled_tiles
+
+    def save_wall_results(self, shuffled_tiles: list[str], emulation_results: list[dict[str, Any]]):
+        # pictures are not drawn here, choose_deals.py renders the chosen walls from the stored tiles
+        wall_hash = drawing.get_wall_hash(wall=DuplicateWall(shuffled_tiles=shuffled_tiles))
+        result_counts: dict[ResultKey, int] = defaultdict(int)
+        for emulation_result in emulation_results:
+            runner.add_emulation_result(result_counts=result_counts, emulation_result=emulation_result)
+
+        with ResultsStore(db_path=self.results_db_path) as store:
+            store.add_wall(
+                wall_hash=wall_hash,
+                shuffled_tiles=shuffled_tiles,
+                picture_path=None,
+                permutations=PERMUTATIONS,
+                pth_files=self.pth_files,
+                emulation_results=emulation_results,
+            )
+
+        self.state.pending_walls.remove(shuffled_tiles)
+        self.state.walls_done += 1
+        self.state.save()
+        runner.log_result_counts(result_counts=result_counts, duplicate_wall_file_path=None, wall_hash=wall_hash)
+        runner.log_progress(emulation_results=emulation_results)
+        logging.info("Walls done: %d", self.state.walls_done)
+
+    def create_runner(self) -> WallRunner:
+        if self.max_rounds is not None:
+            return AsyncPermutationRunner(pth_files=self.pth_files, max_rounds=self.max_rounds,
+                                          analyse_hands=self.analyse_hands)
+        return PermutationRunner(pth_files=self.pth_files, workers=self.workers, analyse_hands=self.analyse_hands)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        logging.info("Campaign started, %d walls already done", self.state.walls_done)
+        with self.create_runner() as permutation_runner:
+            for shuffled_tiles, emulation_results in permutation_runner.run_walls(walls=self.generate_walls()):
+                self.save_wall_results(shuffled_tiles=shuffled_tiles, emulation_results=emulation_results)
+        logging.info("Campaign stopped, %d walls done", self.state.walls_done)
+        if self.filtered_walls > 0:
+            logging.info("%d shuffled walls did not pass the wall filter", self.filtered_walls)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    campaign = Campaign(
+        pth_files=PTH_FILES,
+        walls_count=1000,  # None runs until stopped
+        seed=None,
+        workers=None,  # all cores
+        state_file_path="_campaign_state.json",
+        results_db_path=RESULTS_DB_PATH,
+        corpus_path=None,  # e.g. a corpus created by WallCorpus.generate
+        wall_filter=None,  # e.g. WallFilter(max_shanten=3, min_contenders=2) to skip walls with dull start hands
+        max_rounds=None,  # e.g. 2400 (at least 48) to emulate 100 walls at once on one event loop, not in processes
+        analyse_hands=False,  # log how early every seat gets tenpai, from per-turn shanten of every hand
+    )
+    campaign.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,40 @@
 import logging
 import os
-import shutil
 import time
+import zipfile
 from collections import defaultdict
 from random import Random
 
+from drawing import drawing
+from emulator.deal_selection import DealSelector, min_outcomes_filter, outcomes_count_weight, uniform_weight
+from emulator.results_store import RESULTS_DB_PATH, ResultsStore
+from emulator.wall import DuplicateWall
+
 
 def choose_random_deals_1(deal_map: dict[str, list[str]], count: int, r: Random) -> list[str]:
-    chosen_filenames = []
-    for filename, outcomes_list in deal_map.items():
-        if len(outcomes_list) >= 5:
-            chosen_filenames.append(filename)
-    assert len(chosen_filenames) >= count
-    r.shuffle(chosen_filenames)
-    chosen_filenames = chosen_filenames[:count]
-    return chosen_filenames
+    deal_selector = DealSelector(deal_filter=min_outcomes_filter(min_count=5), deal_weight=uniform_weight)
+    return deal_selector.choose(deals=deal_map.items(), count=count, r=r)
 
 
 def choose_random_deals_2(deal_map: dict[str, list[str]], count: int, r: Random) -> list[str]:
-    arr = []
-    for filename, outcomes_list in deal_map.items():
-        if len(outcomes_list) >= 3:
-            for _ in range(len(outcomes_list)):
-                arr.append(filename)
-    assert len(arr) >= count
-    chosen_filenames = []
-    while len(chosen_filenames) < count:
-        filename = r.choice(arr)
-        chosen_filenames.append(filename)
-        arr = [x for x in arr if x != filename]
-    return chosen_filenames
+    deal_selector = DealSelector(deal_filter=min_outcomes_filter(min_count=3), deal_weight=outcomes_count_weight)
+    return deal_selector.choose(deals=deal_map.items(), count=count, r=r)
 
 
-def main():
-    logging.basicConfig(level=logging.INFO, format="")
+def load_deal_map(store: ResultsStore, min_unique_outcomes: int) -> dict[str, list[str]]:
+    # tiles are not loaded here, only chosen deals need them for their pictures
+    deal_map: dict[str, list[str]] = {}  # wall hash -> list of unique outcomes
+    for wall_hash, _, result_counts in store.iter_result_counts(min_unique_outcomes=min_unique_outcomes):
+        deal_map[wall_hash] = [
+            f"{result} -> {count}"
+            for result, count in sorted(result_counts.items(), key=lambda t: (t[1], t[0]), reverse=True)
+        ]
+    return deal_map
+
 
+def load_deal_map_from_log(log_path: str) -> dict[str, list[str]]:
     deal_map: dict[str, list[str]] = defaultdict(list)  # filename -> list of unique outcomes
-    with open("_infinite_log.txt", "r") as f:
+    with open(log_path, "r") as f:
         filename = None
         for line in f:
             line = line.strip()
@@ -45,43 +43,68 @@ def main():
             elif "->" in line:
                 assert filename is not None
                 deal_map[filename].append(line[line.index("("):])
+    return deal_map
 
-    logging.info("Parsed %d deals", len(deal_map))
-    for i, (filename, outcomes_list) in enumerate(sorted(deal_map.items(), key=lambda t: (-len(t[1]), t[0]))):
-        logging.info("%d. Filename %s -> %d unique outcomes", i, filename, len(outcomes_list))
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="")
+
+    # deals are wall hashes when they come from the results store and picture filenames when they come from a log
+    use_store = os.path.exists(RESULTS_DB_PATH)
+    if use_store:
+        with ResultsStore(db_path=RESULTS_DB_PATH) as store:
+            deal_map = load_deal_map(store=store, min_unique_outcomes=3)
+    else:
+        logging.info("No results store %s, parsing old log", RESULTS_DB_PATH)
+        deal_map = load_deal_map_from_log(log_path="_infinite_log.txt")
+
+    logging.info("Loaded %d deals", len(deal_map))
+    for i, (deal, outcomes_list) in enumerate(sorted(deal_map.items(), key=lambda t: (-len(t[1]), t[0]))):
+        logging.info("%d. Deal %s -> %d unique outcomes", i, deal, len(outcomes_list))
 
     seed = str(time.time())  # 1748532061.7101543
     logging.info("Random seed: '%s'", seed)
     r = Random(seed)
-    chosen_filenames = choose_random_deals_2(deal_map=deal_map, count=12, r=r)
+    chosen_deals = choose_random_deals_2(deal_map=deal_map, count=12, r=r)
 
     logging.info("================================================================================")
-    for i, filename in enumerate(chosen_filenames):
+    for i, chosen_deal in enumerate(chosen_deals):
         game = i // 12 + 1
         deal = i % 12 + 1
         logging.info("Game %d, deal %d -> %s, %d outcomes:",
-                     game, deal, filename, len(deal_map[filename]))
-        for outcome in deal_map[filename]:
+                     game, deal, chosen_deal, len(deal_map[chosen_deal]))
+        for outcome in deal_map[chosen_deal]:
             logging.info("  %s", outcome)
 
-    archive_directory = "_chosen_deals"
-    if os.path.exists(archive_directory):
-        shutil.rmtree(archive_directory)
-    os.mkdir(archive_directory)
-    for i, filename in enumerate(chosen_filenames):
-        game = i // 12 + 1
-        deal = i % 12 + 1
-        src_file = os.path.join("wall_pictures", filename)
-        dst_file = os.path.join(archive_directory, f"{game}_{deal:02d}_{filename}")
-        shutil.copy(src_file, dst_file)
+    deal_walls: dict[str, list[str]] = {}  # wall hash -> shuffled tiles, only for the chosen deals
+    if use_store:
+        with ResultsStore(db_path=RESULTS_DB_PATH) as store:
+            deal_walls = store.get_shuffled_tiles_map(wall_hashes=chosen_deals)
 
     archive_name = "_chosen_deals_archive.zip"
     logging.info("Creating archive...")
-    if os.path.exists(archive_name):
-        os.remove(archive_name)
-    shutil.make_archive(archive_name.split(".")[0], "zip", archive_directory)
+    write_archive(archive_name=archive_name, chosen_deals=chosen_deals, deal_walls=deal_walls)
     logging.info("Archive created: %s bytes", os.path.getsize(archive_name))
 
 
+def write_archive(archive_name: str, chosen_deals: list[str], deal_walls: dict[str, list[str]]):
+    # pictures are rendered straight into the archive, PNG is already compressed so it is stored as is
+    tmp_archive_name = archive_name + ".tmp"
+    with zipfile.ZipFile(tmp_archive_name, "w", compression=zipfile.ZIP_STORED) as archive:
+        for i, chosen_deal in enumerate(chosen_deals):
+            game = i // 12 + 1
+            deal = i % 12 + 1
+            if chosen_deal in deal_walls:
+                wall = DuplicateWall(shuffled_tiles=deal_walls[chosen_deal])
+                archive_filename = f"{game}_{deal:02d}_{drawing.get_file_name(wall=wall)}"
+                img = drawing.render_duplicate_wall(wall=wall, dead_wall_in_one_line=True)
+                with archive.open(archive_filename, "w") as f:
+                    img.save(f, format="PNG")
+            else:
+                # deals from old logs only have their pictures
+                archive.write(os.path.join(drawing.PICTURES_DIR, chosen_deal), f"{game}_{deal:02d}_{chosen_deal}")
+    os.replace(tmp_archive_name, archive_name)
+
+
 if __name__ == "__main__":
     main()
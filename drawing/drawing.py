@@ -1,11 +1,20 @@
 import hashlib
 import logging
 import os.path
+import threading
+from functools import lru_cache
+from typing import Optional, Union
 
 from PIL import Image, ImageDraw, ImageFont
 
+from emulator.tiles import TILE_COUNT, Tile, to_name
 from emulator.wall import DuplicateWall
-from mortal.mortal_helpers import TILES
+
+PICTURES_DIR = "wall_pictures"
+PIC_WIDTH = 5500
+PIC_HEIGHT = 4000
+TILE_WIDTH = 200
+TILE_HEIGHT = int(TILE_WIDTH * 4 / 3)
 
 
 def get_wall_hash(wall: DuplicateWall) -> str:
@@ -15,23 +24,67 @@ def get_wall_hash(wall: DuplicateWall) -> str:
     return h.hexdigest()
 
 
-def get_file_path(pictures_dir: str, wall: DuplicateWall) -> str:
+def get_file_name(wall: DuplicateWall, extension: str = "png") -> str:
+    shuffled_tiles = wall.shuffled_tiles
     filename = "wall_" + get_wall_hash(wall=wall)
-    filename += "_" + wall.shuffled_tiles[0] + wall.shuffled_tiles[1]
-    filename += "_" + wall.shuffled_tiles[-2] + wall.shuffled_tiles[-1]
-    filename += ".png"
-    return os.path.join(pictures_dir, filename)
+    filename += "_" + shuffled_tiles[0] + shuffled_tiles[1]
+    filename += "_" + shuffled_tiles[-2] + shuffled_tiles[-1]
+    filename += "." + extension
+    return filename
+
+
+def get_file_path(pictures_dir: str, wall: DuplicateWall, extension: str = "png") -> str:
+    return os.path.join(pictures_dir, get_file_name(wall=wall, extension=extension))
 
 
-def create_tile_image(tile: str, angle: int = 0) -> Image.Image:
+def create_tile_image(tile: Tile, angle: int = 0) -> Image.Image:
     img_frame = Image.open("tiles_png/200/frame.png")
-    img_tile = Image.open(f"tiles_png/200/{tile}.png")
+    img_tile = Image.open(f"tiles_png/200/{to_name(tile)}.png")
     result = Image.alpha_composite(img_tile, img_frame)
     if angle != 0:
         result = result.rotate(angle, expand=True)
     return result
 
 
+class SpriteAtlas:
+    # Every tile composited with the frame in every rotation used by the pictures, built once per process
+    ANGLES = [0, 90, 180, -90]
+
+    def __init__(self):
+        self.sprites: dict[tuple[Tile, int], Image.Image] = {}
+        for tile in range(TILE_COUNT):
+            tile_img = create_tile_image(tile=tile)
+            for angle in SpriteAtlas.ANGLES:
+                self.sprites[(tile, angle)] = tile_img if angle == 0 else tile_img.rotate(angle, expand=True)
+
+    def get_tile_image(self, tile: Tile, angle: int = 0) -> Image.Image:
+        # shared image, must not be modified
+        return self.sprites[(tile, angle)]
+
+
+SPRITE_ATLAS: Optional[SpriteAtlas] = None
+SPRITE_ATLAS_LOCK = threading.Lock()
+
+
+def get_sprite_atlas() -> SpriteAtlas:
+    global SPRITE_ATLAS
+    with SPRITE_ATLAS_LOCK:
+        if SPRITE_ATLAS is None:
+            SPRITE_ATLAS = SpriteAtlas()
+        return SPRITE_ATLAS
+
+
+@lru_cache(maxsize=None)
+def load_font(font_size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.load_default(size=float(font_size))
+
+
+@lru_cache(maxsize=1024)
+def get_text_image(text: str, width: int, height: int, font_size: int, angle: int = 0) -> Image.Image:
+    # shared image, must not be modified
+    return create_text_image(text=text, width=width, height=height, font_size=font_size, angle=angle)
+
+
 def create_text_image(text: str, width: int, height: int, font_size: int, angle: int = 0):
     result = Image.new("RGB", (width, height), "white")
 
@@ -39,7 +92,7 @@ def create_text_image(text: str, width: int, height: int, font_size: int, angle:
     # ImageDraw.ImageDraw(result).rounded_rectangle(xy=(0, 0, width - 1, height - 1), radius=10, fill="black")
     # ImageDraw.ImageDraw(result).rounded_rectangle(xy=(4, 4, width - 5, height - 5), radius=10, fill="white")
 
-    font = ImageFont.load_default(size=float(font_size))
+    font = load_font(font_size=font_size)
     bbox = ImageDraw.ImageDraw(result).textbbox(xy=(0, 0), text=text, font=font, stroke_width=2)
     x = int(width / 2 - (bbox[2] - bbox[0]) / 2)
     y = int(height / 2 - (bbox[3] - bbox[1]) / 2)
@@ -51,187 +104,209 @@ def create_text_image(text: str, width: int, height: int, font_size: int, angle:
 
 
 def draw_duplicate_wall(wall: DuplicateWall, dead_wall_in_one_line: bool, overwrite_file: bool):
-    pictures_dir = "wall_pictures"
-    if not os.path.exists(pictures_dir):
-        os.mkdir(pictures_dir)
+    pictures_dir = PICTURES_DIR
+    os.makedirs(pictures_dir, exist_ok=True)  # can be called from several render threads
     file_path = get_file_path(pictures_dir=pictures_dir, wall=wall)
     logging.info("Will save picture to file %s", file_path)
 
-    pic_width = 5500
-    pic_height = 4000
-    img = Image.new("RGB", (pic_width, pic_height), "white")
+    img = render_duplicate_wall(wall=wall, dead_wall_in_one_line=dead_wall_in_one_line)
+    if not os.path.exists(file_path) or overwrite_file:
+        img.save(file_path)
+        logging.info("Duplicate wall picture saved to file %s", file_path)
+    else:
+        logging.info("File %s already exists!", file_path)
+    return file_path
 
-    tile_width = 200
-    tile_height = int(tile_width * 4 / 3)
+
+class TilePlacement:
+    # x and y are the top left corner of the rotated tile
+    def __init__(self, tile: Tile, angle: int, x: int, y: int):
+        self.tile = tile
+        self.angle = angle
+        self.x = x
+        self.y = y
+
+
+class TextPlacement:
+    # width and height are the size of the text box before rotation, x and y are the top left corner after it
+    def __init__(self, text: str, width: int, height: int, font_size: int, angle: int, x: int, y: int):
+        self.text = text
+        self.width = width
+        self.height = height
+        self.font_size = font_size
+        self.angle = angle
+        self.x = x
+        self.y = y
+
+
+def get_rotated_size(width: int, height: int, angle: int) -> tuple[int, int]:
+    if angle % 180 != 0:
+        return height, width
+    return width, height
+
+
+def layout_duplicate_wall(wall: DuplicateWall,
+                          dead_wall_in_one_line: bool) -> list[Union[TilePlacement, TextPlacement]]:
+    # positions of all tiles and captions in paste order, shared by the raster and vector pictures
+    pic_width = PIC_WIDTH
+    pic_height = PIC_HEIGHT
+    tile_width = TILE_WIDTH
+    tile_height = TILE_HEIGHT
     blank_space = 5
+    placements: list[Union[TilePlacement, TextPlacement]] = []
+
+    def place_tile(tile: Tile, angle: int, x: int, y: int):
+        placements.append(TilePlacement(tile=tile, angle=angle, x=x, y=y))
+
+    def place_text(text: str, width: int, height: int, font_size: int, angle: int, x: int, y: int):
+        placements.append(TextPlacement(text=text, width=width, height=height, font_size=font_size, angle=angle,
+                                        x=x, y=y))
+
+    caption_size = 100  # rotated captions are 100 pixels wide, the others are 100 pixels high
+    label_width, label_height = 500, 150
 
     # East hand
-    for i, tile in enumerate(sorted(wall.start_hands[0], key=lambda t: TILES.index(t))):
-        tile_img = create_tile_image(tile=tile)
+    for i, tile in enumerate(sorted(wall.start_hands[0])):
         x = int(pic_width / 2 - 6.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
         y = pic_height - tile_height - blank_space
-        img.paste(tile_img, (x, y))
+        place_tile(tile=tile, angle=0, x=x, y=y)
 
     # South hand
-    for i, tile in enumerate(sorted(wall.start_hands[1], key=lambda t: TILES.index(t))):
-        tile_img = create_tile_image(tile=tile, angle=90)
+    for i, tile in enumerate(sorted(wall.start_hands[1])):
         y = int(pic_height / 2 + 6.5 * (tile_width + blank_space) - (i + 1) * (tile_width + blank_space))
         x = pic_width - tile_height - blank_space
-        img.paste(tile_img, (x, y))
+        place_tile(tile=tile, angle=90, x=x, y=y)
 
     # West hand
-    for i, tile in enumerate(sorted(wall.start_hands[2], key=lambda t: TILES.index(t))):
-        tile_img = create_tile_image(tile=tile, angle=180)
+    for i, tile in enumerate(sorted(wall.start_hands[2])):
         x = int(pic_width / 2 + 6.5 * (tile_width + blank_space) - (i + 1) * (tile_width + blank_space))
         y = blank_space
-        img.paste(tile_img, (x, y))
+        place_tile(tile=tile, angle=180, x=x, y=y)
 
     # North hand
-    for i, tile in enumerate(sorted(wall.start_hands[3], key=lambda t: TILES.index(t))):
-        tile_img = create_tile_image(tile=tile, angle=-90)
+    for i, tile in enumerate(sorted(wall.start_hands[3])):
         y = int(pic_height / 2 - 6.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
         x = blank_space
-        img.paste(tile_img, (x, y))
+        place_tile(tile=tile, angle=-90, x=x, y=y)
 
     # East wall
     for i, tile in enumerate(wall.walls[0][16::-2]):
-        tile_img = create_tile_image(tile=tile)
-        caption_img = create_text_image(text="E0" + str(i), width=200, height=100, font_size=70)
         x = int(pic_width / 2 - 4.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
         y = int(pic_height - 3.5 * tile_height - blank_space)
-        img.paste(caption_img, (x, y - caption_img.height))
-        img.paste(tile_img, (x, y))
+        place_text(text="E0" + str(i), width=200, height=100, font_size=70, angle=0, x=x, y=y - caption_size)
+        place_tile(tile=tile, angle=0, x=x, y=y)
     for i, tile in enumerate(wall.walls[0][17::-2]):
-        tile_img = create_tile_image(tile=tile)
-        caption_img = create_text_image(text="E1" + str(i), width=200, height=100, font_size=70)
         x = int(pic_width / 2 - 4.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
         y = int(pic_height - 2.5 * tile_height)
-        img.paste(caption_img, (x, y + tile_height - 30))
-        img.paste(tile_img, (x, y))
+        place_text(text="E1" + str(i), width=200, height=100, font_size=70, angle=0, x=x, y=y + tile_height - 30)
+        place_tile(tile=tile, angle=0, x=x, y=y)
     # "East" text
-    text_img = create_text_image(text="East", width=500, height=150, font_size=100)
-    x = int(pic_width / 2 - text_img.width / 2)
-    y = int(pic_height - 4 * tile_height - blank_space - 1.2 * text_img.height)
-    img.paste(text_img, (x, y))
+    x = int(pic_width / 2 - label_width / 2)
+    y = int(pic_height - 4 * tile_height - blank_space - 1.2 * label_height)
+    place_text(text="East", width=label_width, height=label_height, font_size=100, angle=0, x=x, y=y)
 
     # South wall
     for i, tile in enumerate(wall.walls[1][16::-2]):
-        tile_img = create_tile_image(tile=tile, angle=90)
-        caption_img = create_text_image(text="S0" + str(i), width=200, height=100, font_size=70, angle=90)
         y = int(pic_height / 2 + 4.5 * (tile_width + blank_space) - (i + 1) * (tile_width + blank_space))
         x = int(pic_width - 3.5 * tile_height - blank_space)
-        img.paste(caption_img, (x - caption_img.width, y))
-        img.paste(tile_img, (x, y))
+        place_text(text="S0" + str(i), width=200, height=100, font_size=70, angle=90, x=x - caption_size, y=y)
+        place_tile(tile=tile, angle=90, x=x, y=y)
     for i, tile in enumerate(wall.walls[1][17::-2]):
-        tile_img = create_tile_image(tile=tile, angle=90)
-        caption_img = create_text_image(text="S1" + str(i), width=200, height=100, font_size=70, angle=90)
         y = int(pic_height / 2 + 4.5 * (tile_width + blank_space) - (i + 1) * (tile_width + blank_space))
         x = int(pic_width - 2.5 * tile_height)
-        img.paste(caption_img, (x + tile_height - 30, y))
-        img.paste(tile_img, (x, y))
+        place_text(text="S1" + str(i), width=200, height=100, font_size=70, angle=90, x=x + tile_height - 30, y=y)
+        place_tile(tile=tile, angle=90, x=x, y=y)
     # "South" text
-    text_img = create_text_image(text="South", width=500, height=150, font_size=100, angle=90)
-    x = int(pic_width - 4 * tile_height - blank_space - 1.2 * text_img.width)
-    y = int(pic_height / 2 - text_img.height / 2)
-    img.paste(text_img, (x, y))
+    x = int(pic_width - 4 * tile_height - blank_space - 1.2 * label_height)
+    y = int(pic_height / 2 - label_width / 2)
+    place_text(text="South", width=label_width, height=label_height, font_size=100, angle=90, x=x, y=y)
 
     # West wall
     for i, tile in enumerate(wall.walls[2][::2]):
-        tile_img = create_tile_image(tile=tile, angle=180)
-        caption_img = create_text_image(text="W0" + str(8 - i), width=200, height=100, font_size=70, angle=180)
         x = int(pic_width / 2 - 4.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
         y = int(2.5 * tile_height + blank_space)
-        img.paste(caption_img, (x, y + tile_height))
-        img.paste(tile_img, (x, y))
+        place_text(text="W0" + str(8 - i), width=200, height=100, font_size=70, angle=180, x=x, y=y + tile_height)
+        place_tile(tile=tile, angle=180, x=x, y=y)
     for i, tile in enumerate(wall.walls[2][1::2]):
-        tile_img = create_tile_image(tile=tile, angle=180)
-        caption_img = create_text_image(text="W1" + str(8 - i), width=200, height=100, font_size=70, angle=180)
         x = int(pic_width / 2 - 4.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
         y = int(1.5 * tile_height)
-        img.paste(caption_img, (x, y - caption_img.height + 30))
-        img.paste(tile_img, (x, y))
+        place_text(text="W1" + str(8 - i), width=200, height=100, font_size=70, angle=180,
+                   x=x, y=y - caption_size + 30)
+        place_tile(tile=tile, angle=180, x=x, y=y)
     # "West" text
-    text_img = create_text_image(text="West", width=500, height=150, font_size=100, angle=180)
-    x = int(pic_width / 2 - text_img.width / 2)
-    y = int(4 * tile_height + blank_space + 0.2 * text_img.height)
-    img.paste(text_img, (x, y))
+    x = int(pic_width / 2 - label_width / 2)
+    y = int(4 * tile_height + blank_space + 0.2 * label_height)
+    place_text(text="West", width=label_width, height=label_height, font_size=100, angle=180, x=x, y=y)
 
     # North wall
     for i, tile in enumerate(wall.walls[3][16::-2]):
-        tile_img = create_tile_image(tile=tile, angle=-90)
-        caption_img = create_text_image(text="N0" + str(i), width=200, height=100, font_size=70, angle=-90)
         y = int(pic_height / 2 - 4.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
         x = int(2.5 * tile_height) + blank_space
-        img.paste(caption_img, (x + tile_height, y))
-        img.paste(tile_img, (x, y))
+        place_text(text="N0" + str(i), width=200, height=100, font_size=70, angle=-90, x=x + tile_height, y=y)
+        place_tile(tile=tile, angle=-90, x=x, y=y)
     for i, tile in enumerate(wall.walls[3][17::-2]):
-        tile_img = create_tile_image(tile=tile, angle=-90)
-        caption_img = create_text_image(text="N1" + str(i), width=200, height=100, font_size=70, angle=-90)
         y = int(pic_height / 2 - 4.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
         x = int(1.5 * tile_height)
-        img.paste(caption_img, (x - caption_img.width + 30, y))
-        img.paste(tile_img, (x, y))
+        place_text(text="N1" + str(i), width=200, height=100, font_size=70, angle=-90,
+                   x=x - caption_size + 30, y=y)
+        place_tile(tile=tile, angle=-90, x=x, y=y)
     # "North" text
-    text_img = create_text_image(text="North", width=500, height=150, font_size=100, angle=-90)
-    x = int(4 * tile_height + blank_space + 0.2 * text_img.width)
-    y = int(pic_height / 2 - text_img.height / 2)
-    img.paste(text_img, (x, y))
+    x = int(4 * tile_height + blank_space + 0.2 * label_height)
+    y = int(pic_height / 2 - label_width / 2)
+    place_text(text="North", width=label_width, height=label_height, font_size=100, angle=-90, x=x, y=y)
 
     # Dead wall
     if dead_wall_in_one_line:
         for i, tile in enumerate(wall.dead_wall[-3::-2]):
-            tile_img = create_tile_image(tile=tile)
-            caption_img = create_text_image(text="D0" + str(i + 2), width=200, height=100, font_size=70)
             y = int(pic_height / 2 + 0.5 * (tile_height + blank_space))
             x = int(pic_width / 2 + (i - 6) * (tile_width + blank_space))
-            img.paste(caption_img, (x, y - caption_img.height))
-            img.paste(tile_img, (x, y))
+            place_text(text="D0" + str(i + 2), width=200, height=100, font_size=70, angle=0, x=x, y=y - caption_size)
+            place_tile(tile=tile, angle=0, x=x, y=y)
         for i, tile in enumerate(wall.dead_wall[11:9:-1] + wall.dead_wall[-4::-2]):
-            tile_img = create_tile_image(tile=tile)
-            caption_img = create_text_image(text="D1" + str(i), width=200, height=100, font_size=70)
             y = int(pic_height / 2 + 0.5 * (tile_height + blank_space))
             x = int(pic_width / 2 + (i - 1) * (tile_width + blank_space))
-            img.paste(caption_img, (x, y + tile_height - 30))
-            img.paste(tile_img, (x, y))
+            place_text(text="D1" + str(i), width=200, height=100, font_size=70, angle=0, x=x, y=y + tile_height - 30)
+            place_tile(tile=tile, angle=0, x=x, y=y)
         # "Upper part" and "lower part" text
-        text_img = create_text_image(text="Upper part", width=500, height=150, font_size=70)
-        x = int(pic_width / 2 - 3.5 * (tile_width + blank_space) - text_img.width / 2)
-        y = int(pic_height / 2 + 0.5 * (tile_height + blank_space) - 1.6 * text_img.height)
-        img.paste(text_img, (x, y))
-        text_img = create_text_image(text="Lower part", width=500, height=150, font_size=70)
-        x = int(pic_width / 2 + 2.5 * (tile_width + blank_space) - text_img.width / 2)
-        y = int(pic_height / 2 + 1.5 * (tile_height + blank_space) + 0.4 * text_img.height)
-        img.paste(text_img, (x, y))
+        x = int(pic_width / 2 - 3.5 * (tile_width + blank_space) - label_width / 2)
+        y = int(pic_height / 2 + 0.5 * (tile_height + blank_space) - 1.6 * label_height)
+        place_text(text="Upper part", width=label_width, height=label_height, font_size=70, angle=0, x=x, y=y)
+        x = int(pic_width / 2 + 2.5 * (tile_width + blank_space) - label_width / 2)
+        y = int(pic_height / 2 + 1.5 * (tile_height + blank_space) + 0.4 * label_height)
+        place_text(text="Lower part", width=label_width, height=label_height, font_size=70, angle=0, x=x, y=y)
     else:
         for i, tile in enumerate(wall.dead_wall[-3::-2]):
-            tile_img = create_tile_image(tile=tile)
-            caption_img = create_text_image(text="D0" + str(i + 2), width=200, height=100, font_size=70)
             y = int(pic_height / 2)
             x = int(pic_width / 2 - 1.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
-            img.paste(caption_img, (x, y - caption_img.height))
-            img.paste(tile_img, (x, y))
+            place_text(text="D0" + str(i + 2), width=200, height=100, font_size=70, angle=0, x=x, y=y - caption_size)
+            place_tile(tile=tile, angle=0, x=x, y=y)
         for i, tile in enumerate(wall.dead_wall[11:9:-1] + wall.dead_wall[-4::-2]):
-            tile_img = create_tile_image(tile=tile)
-            caption_img = create_text_image(text="D1" + str(i), width=200, height=100, font_size=70)
             y = int(pic_height / 2 + (tile_height + blank_space))
             x = int(pic_width / 2 - 3.5 * (tile_width + blank_space) + i * (tile_width + blank_space))
-            img.paste(caption_img, (x, y + tile_height - 30))
-            img.paste(tile_img, (x, y))
+            place_text(text="D1" + str(i), width=200, height=100, font_size=70, angle=0, x=x, y=y + tile_height - 30)
+            place_tile(tile=tile, angle=0, x=x, y=y)
     # "Dead wall" text
-    text_img = create_text_image(text="Dead wall", width=500, height=150, font_size=100)
-    x = int(pic_width / 2 - text_img.width / 2)
-    y = int(pic_height / 2 - 0.5 * tile_height - 1.2 * text_img.height)
-    img.paste(text_img, (x, y))
+    x = int(pic_width / 2 - label_width / 2)
+    y = int(pic_height / 2 - 0.5 * tile_height - 1.2 * label_height)
+    place_text(text="Dead wall", width=label_width, height=label_height, font_size=100, angle=0, x=x, y=y)
 
     # Wall hash
-    text_img = create_text_image(text="Hash: " + get_wall_hash(wall=wall), width=1700, height=150, font_size=80)
-    x = int(pic_width / 2 - text_img.width / 2)
-    y = int(pic_height / 2 - 4.2 * text_img.height)
-    img.paste(text_img, (x, y))
+    hash_width, hash_height = 1700, 150
+    x = int(pic_width / 2 - hash_width / 2)
+    y = int(pic_height / 2 - 4.2 * hash_height)
+    place_text(text="Hash: " + get_wall_hash(wall=wall), width=hash_width, height=hash_height, font_size=80, angle=0,
+               x=x, y=y)
+    return placements
 
-    if not os.path.exists(file_path) or overwrite_file:
-        img.save(file_path)
-        logging.info("Duplicate wall picture saved to file %s", file_path)
-    else:
-        logging.info("File %s already exists!", file_path)
-    return file_path
+
+def render_duplicate_wall(wall: DuplicateWall, dead_wall_in_one_line: bool) -> Image.Image:
+    img = Image.new("RGB", (PIC_WIDTH, PIC_HEIGHT), "white")
+    sprite_atlas = get_sprite_atlas()
+    for placement in layout_duplicate_wall(wall=wall, dead_wall_in_one_line=dead_wall_in_one_line):
+        if isinstance(placement, TilePlacement):
+            part_img = sprite_atlas.get_tile_image(tile=placement.tile, angle=placement.angle)
+        else:
+            part_img = get_text_image(text=placement.text, width=placement.width, height=placement.height,
+                                      font_size=placement.font_size, angle=placement.angle)
+        img.paste(part_img, (placement.x, placement.y))
+    return img
@@ -0,0 +1,58 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from drawing import drawing, svg_drawing
+from emulator.wall import DuplicateWall
+
+
+class RenderQueue:
+    # Draws and saves wall pictures in background threads, PNG encoding releases the GIL.
+    # submit() returns the picture path at once and blocks only when max_pending pictures are in progress.
+    def __init__(self, workers: int = 1, max_pending: int = 4, dead_wall_in_one_line: bool = True,
+                 overwrite_file: bool = True, vector: bool = False):
+        assert workers >= 1
+        assert max_pending >= 1
+        self.dead_wall_in_one_line = dead_wall_in_one_line
+        self.overwrite_file = overwrite_file
+        self.vector = vector  # svg pictures instead of png ones
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.failed_count: int = 0
+        self.lock = threading.Lock()
+
+    def submit(self, wall: DuplicateWall) -> str:
+        # the picture is drawn from a fresh copy of the wall, the caller can keep drawing tiles from its own
+        snapshot = DuplicateWall(tiles=wall.tiles)
+        file_path = drawing.get_file_path(pictures_dir=drawing.PICTURES_DIR, wall=snapshot,
+                                          extension="svg" if self.vector else "png")
+        self.slots.acquire()
+        future = self.executor.submit(self.render, snapshot)
+        future.add_done_callback(self.on_done)
+        return file_path
+
+    def render(self, wall: DuplicateWall):
+        if self.vector:
+            svg_drawing.draw_duplicate_wall_svg(wall=wall, dead_wall_in_one_line=self.dead_wall_in_one_line,
+                                                overwrite_file=self.overwrite_file)
+            return
+        drawing.draw_duplicate_wall(wall=wall, dead_wall_in_one_line=self.dead_wall_in_one_line,
+                                    overwrite_file=self.overwrite_file)
+
+    def on_done(self, future: Future):
+        self.slots.release()
+        error = future.exception()
+        if error is not None:
+            with self.lock:
+                self.failed_count += 1
+            logging.error("Failed to draw wall picture", exc_info=error)
+
+    def close(self):
+        # waits for all submitted pictures
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,89 @@
+import base64
+import logging
+import os.path
+from functools import lru_cache
+from typing import Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from drawing.drawing import (PIC_HEIGHT, PIC_WIDTH, PICTURES_DIR, TILE_HEIGHT, TILE_WIDTH, TilePlacement,
+                             get_file_path, get_rotated_size, layout_duplicate_wall)
+from emulator.tiles import to_name
+from emulator.wall import DuplicateWall
+
+TILES_DIR = "tiles_png/200"
+
+
+@lru_cache(maxsize=None)
+def get_embedded_png(file_name: str) -> str:
+    # png files are embedded as they are, without decoding
+    with open(f"{TILES_DIR}/{file_name}", "rb") as f:
+        return "data:image/png;base64," + base64.b64encode(f.read()).decode()
+
+
+def get_glyph_href(file_name: str, tiles_href: Optional[str]) -> str:
+    if tiles_href is None:
+        return get_embedded_png(file_name=file_name)
+    return f"{tiles_href}/{file_name}"
+
+
+def get_rotate_transform(angle: int, x: int, y: int, width: int, height: int) -> str:
+    # PIL rotates counterclockwise, SVG rotates clockwise; the rotated box gets its top left corner at (x, y)
+    rotated_width, rotated_height = get_rotated_size(width=width, height=height, angle=angle)
+    return (f"translate({x + rotated_width / 2:g} {y + rotated_height / 2:g}) rotate({-angle}) "
+            f"translate({-width / 2:g} {-height / 2:g})")
+
+
+def render_duplicate_wall_svg(wall: DuplicateWall, dead_wall_in_one_line: bool,
+                              tiles_href: Optional[str] = None) -> str:
+    # The same layout as the png picture. Every tile glyph is defined once and placed with <use>,
+    # glyph images are embedded into the file, or linked from tiles_href if it is given.
+    placements = layout_duplicate_wall(wall=wall, dead_wall_in_one_line=dead_wall_in_one_line)
+
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{PIC_WIDTH}" height="{PIC_HEIGHT}" viewBox="0 0 {PIC_WIDTH} {PIC_HEIGHT}">',
+        "<defs>",
+        f'<image id="frame" width="{TILE_WIDTH}" height="{TILE_HEIGHT}" '
+        f'xlink:href={quoteattr(get_glyph_href(file_name="frame.png", tiles_href=tiles_href))}/>',
+    ]
+    tile_names = sorted({to_name(placement.tile) for placement in placements if isinstance(placement, TilePlacement)})
+    for tile_name in tile_names:
+        lines.append(f'<g id="tile-{tile_name}">'
+                     f'<image width="{TILE_WIDTH}" height="{TILE_HEIGHT}" '
+                     f'xlink:href={quoteattr(get_glyph_href(file_name=f"{tile_name}.png", tiles_href=tiles_href))}/>'
+                     f'<use xlink:href="#frame"/></g>')
+    lines.append("</defs>")
+    lines.append('<rect width="100%" height="100%" fill="white"/>')
+    lines.append('<g font-family="sans-serif" text-anchor="middle" dominant-baseline="central" '
+                 'fill="black" stroke="black" stroke-width="4">')
+
+    for placement in placements:
+        if isinstance(placement, TilePlacement):
+            transform = get_rotate_transform(angle=placement.angle, x=placement.x, y=placement.y,
+                                             width=TILE_WIDTH, height=TILE_HEIGHT)
+            lines.append(f'<use xlink:href="#tile-{to_name(placement.tile)}" transform="{transform}"/>')
+        else:
+            transform = get_rotate_transform(angle=placement.angle, x=placement.x, y=placement.y,
+                                             width=placement.width, height=placement.height)
+            lines.append(f'<text x="{placement.width / 2:g}" y="{placement.height / 2:g}" '
+                         f'font-size="{placement.font_size}" transform="{transform}">{escape(placement.text)}</text>')
+
+    lines.append("</g>")
+    lines.append("</svg>")
+    return "\n".join(lines) + "\n"
+
+
+def draw_duplicate_wall_svg(wall: DuplicateWall, dead_wall_in_one_line: bool, overwrite_file: bool):
+    pictures_dir = PICTURES_DIR
+    os.makedirs(pictures_dir, exist_ok=True)
+    file_path = get_file_path(pictures_dir=pictures_dir, wall=wall, extension="svg")
+    logging.info("Will save vector picture to file %s", file_path)
+
+    if not os.path.exists(file_path) or overwrite_file:
+        svg = render_duplicate_wall_svg(wall=wall, dead_wall_in_one_line=dead_wall_in_one_line)
+        with open(file_path, "w") as f:
+            f.write(svg)
+        logging.info("Duplicate wall vector picture saved to file %s", file_path)
+    else:
+        logging.info("File %s already exists!", file_path)
+    return file_path
@@ -0,0 +1,53 @@
+import threading
+from random import Random
+
+from drawing import drawing
+from drawing.render_queue import RenderQueue
+from emulator.wall import DuplicateWall, get_all_tiles
+
+
+def get_wall(seed: int) -> DuplicateWall:
+    shuffled_tiles = get_all_tiles()
+    Random(seed).shuffle(shuffled_tiles)
+    return DuplicateWall(shuffled_tiles=shuffled_tiles)
+
+
+def test_failed_render(monkeypatch):
+    rendered = []
+
+    def draw_duplicate_wall(wall: DuplicateWall, dead_wall_in_one_line: bool, overwrite_file: bool):
+        if wall.tiles == get_wall(seed=1).tiles:
+            raise OSError("disk full")
+        rendered.append(wall.tiles)
+
+    monkeypatch.setattr(drawing, "draw_duplicate_wall", draw_duplicate_wall)
+    with RenderQueue(workers=2, max_pending=2) as render_queue:
+        file_paths = [render_queue.submit(wall=get_wall(seed=seed)) for seed in range(4)]
+    # the queue is drained, the failed picture is counted and the others are still drawn
+    assert render_queue.failed_count == 1
+    assert sorted(rendered) == sorted(get_wall(seed=seed).tiles for seed in [0, 2, 3])
+    assert file_paths == [drawing.get_file_path(pictures_dir=drawing.PICTURES_DIR, wall=get_wall(seed=seed),
+                                                extension="png") for seed in range(4)]
+
+
+def test_backpressure(monkeypatch):
+    started = threading.Event()
+    released = threading.Event()
+
+    def draw_duplicate_wall(wall: DuplicateWall, dead_wall_in_one_line: bool, overwrite_file: bool):
+        started.set()
+        released.wait()
+
+    monkeypatch.setattr(drawing, "draw_duplicate_wall", draw_duplicate_wall)
+    with RenderQueue(max_pending=1) as render_queue:
+        render_queue.submit(wall=get_wall(seed=0))
+        assert started.wait(timeout=10)
+        submitted = threading.Event()
+        thread = threading.Thread(target=lambda: render_queue.submit(wall=get_wall(seed=1)) and submitted.set())
+        thread.start()
+        # the second picture waits for a free slot
+        assert not submitted.wait(timeout=0.2)
+        released.set()
+        assert submitted.wait(timeout=10)
+        thread.join()
+    assert render_queue.failed_count == 0
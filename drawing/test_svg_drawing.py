@@ -0,0 +1,41 @@
+import xml.etree.ElementTree as ElementTree
+from random import Random
+
+from drawing.drawing import TextPlacement, TilePlacement, layout_duplicate_wall
+from drawing.svg_drawing import render_duplicate_wall_svg
+from emulator.wall import DuplicateWall, get_all_tiles
+
+SVG = "{http://www.w3.org/2000/svg}"
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+
+def create_wall() -> DuplicateWall:
+    shuffled_tiles = get_all_tiles()
+    Random(1).shuffle(shuffled_tiles)
+    return DuplicateWall(shuffled_tiles=shuffled_tiles)
+
+
+def test_placements():
+    wall = create_wall()
+    for dead_wall_in_one_line in [True, False]:
+        placements = layout_duplicate_wall(wall=wall, dead_wall_in_one_line=dead_wall_in_one_line)
+        root = ElementTree.fromstring(render_duplicate_wall_svg(wall=wall, dead_wall_in_one_line=dead_wall_in_one_line))
+        tile_uses = [use for use in root.iter(f"{SVG}use") if use.get(XLINK_HREF).startswith("#tile-")]
+        assert len(tile_uses) == sum(isinstance(placement, TilePlacement) for placement in placements)
+        texts = [text.text for text in root.iter(f"{SVG}text")]
+        assert texts == [placement.text for placement in placements if isinstance(placement, TextPlacement)]
+
+
+def test_glyph_images():
+    wall = create_wall()
+    embedded = ElementTree.fromstring(render_duplicate_wall_svg(wall=wall, dead_wall_in_one_line=True))
+    hrefs = [image.get(XLINK_HREF) for image in embedded.iter(f"{SVG}image")]
+    # the frame and every distinct tile are defined once
+    assert len(hrefs) == 1 + len({tile for tile in wall.shuffled_tiles})
+    assert all(href.startswith("data:image/png;base64,") for href in hrefs)
+
+    linked = ElementTree.fromstring(render_duplicate_wall_svg(wall=wall, dead_wall_in_one_line=True,
+                                                              tiles_href="tiles"))
+    hrefs = [image.get(XLINK_HREF) for image in linked.iter(f"{SVG}image")]
+    assert hrefs[0] == "tiles/frame.png"
+    assert sorted(hrefs[1:]) == sorted(f"tiles/{tile}.png" for tile in set(wall.shuffled_tiles))
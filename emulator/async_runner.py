@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from emulator import runner
+from emulator.emulator import SingleRoundEmulator
+from emulator.runner import PERMUTATIONS, WallRunner
+from emulator.wall import DuplicateWall
+from mortal.inference_broker import InferenceBroker
+from mortal.model_registry import EngineSource
+
+
+async def process_round(emulator: SingleRoundEmulator, executor: ThreadPoolExecutor) -> dict[str, Any]:
+    # same as SingleRoundEmulator.process, but bots react in executor threads while the event loop serves other rounds
+    loop = asyncio.get_running_loop()
+    emulator.start()
+    if len(emulator.players) == 0:
+        emulator.init_players()
+    try:
+        while emulator.result is None:
+            actions = await asyncio.gather(*[loop.run_in_executor(executor, emulator.react_player, request)
+                                             for request in emulator.pending_requests])
+            emulator.step(actions=actions)
+    finally:
+        # bots are the largest part of a table, they are dropped as soon as the round is over
+        emulator.players = []
+    return emulator.result
+
+
+class AsyncPermutationRunner(WallRunner):
+    # Emulates permutations of many walls at once on one event loop running in a background thread.
+    # Bots share the engines of an InferenceBroker, so every checkpoint is loaded once and decisions
+    # of all rounds in flight are evaluated in batches. A bot waits for its batch in a pool thread,
+    # so the number of threads limits the batch size, not the number of rounds.
+    def __init__(self, pth_files: list[str], max_rounds: int = 2400, threads: int = 256, max_batch_size: int = 256,
+                 max_wait: float = 0.002, analyse_hands: bool = False, registry: Optional[EngineSource] = None):
+        assert len(pth_files) == 4
+        # run_walls keeps one more wall than max_pending_walls in flight, at least two walls are needed
+        # to emulate the next wall while results of the previous one are saved
+        assert max_rounds >= 2 * len(PERMUTATIONS)
+        assert threads >= 1
+        super().__init__(max_pending_walls=max_rounds // len(PERMUTATIONS) - 1)
+        self.pth_files = pth_files
+        self.analyse_hands = analyse_hands
+        self.broker = InferenceBroker(max_batch_size=max_batch_size, max_wait=max_wait, registry=registry)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="bot")
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name="rounds", daemon=True)
+        self.loop_thread.start()
+        for pth_file in pth_files:
+            self.broker.get_engine(pth_file=pth_file)
+        logging.debug("Async runner started: up to %d rounds, %d bot threads", max_rounds, threads)
+
+    def submit_wall(self, shuffled_tiles: list[str]) -> list[Future]:
+        futures = []
+        for p in PERMUTATIONS:
+            emulator = runner.create_emulator(
+                wall=DuplicateWall(shuffled_tiles=shuffled_tiles),
+                player_pth_files=[self.pth_files[player] for player in p],
+                registry=self.broker,
+                analyse_hands=self.analyse_hands,
+            )
+            futures.append(asyncio.run_coroutine_threadsafe(process_round(emulator=emulator, executor=self.executor),
+                                                            self.loop))
+        return futures
+
+    async def cancel_rounds(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        # rounds still in flight are cancelled, their bots finish the decisions they have started
+        asyncio.run_coroutine_threadsafe(self.cancel_rounds(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.executor.shutdown(cancel_futures=True)
+        self.broker.close()
+        self.loop.close()
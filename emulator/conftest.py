@@ -0,0 +1,105 @@
+import hashlib
+import json
+from typing import Optional
+
+import numpy as np
+import pytest
+
+from emulator.shanten import calculate_shanten, get_counts_34
+from emulator.tiles import to_tiles
+from emulator.wall import DuplicateWall
+
+try:
+    import mortal.mortal_lib.model as mortal_model
+    from emulator import runner
+    from emulator.runner import PERMUTATIONS
+    from mortal.model_registry import ModelRegistry
+except ImportError:
+    # libriichi is not built, tests that use the stubs skip themselves
+    mortal_model = None
+    ModelRegistry = object
+
+PTH_FILES = ["a.pth", "b.pth", "c.pth", "d.pth"]
+
+
+class StubEngine:
+    # picks one of the allowed options by a hash of the checkpoint name and the observation
+    def __init__(self, name: str):
+        self.name = name
+        self.is_oracle = False
+
+    def react_batch(self, obs, masks, invisible_obs, with_meta=True):
+        actions = []
+        for row_obs, row_mask in zip(obs, masks):
+            h = hashlib.blake2b(self.name.encode() + row_obs.tobytes(), digest_size=8).digest()
+            actions.append(int.from_bytes(h, "little") % int(row_mask.sum()))
+        return actions, [[]] * len(obs), [[]] * len(obs), [True] * len(obs)
+
+
+class StubRegistry(ModelRegistry):
+    def get_engine(self, pth_file: str) -> StubEngine:
+        with self.lock:
+            if pth_file not in self.engines:
+                self.engines[pth_file] = StubEngine(name=pth_file)
+            return self.engines[pth_file]
+
+
+class StubBot:
+    # Stands in for the libriichi bot: discards towards tenpai, calls pon and wins by tsumo with a closed hand,
+    # every choice goes through the engine
+    def __init__(self, engine, seat: int):
+        self.engine = engine
+        self.seat = seat
+        self.hand: list[str] = []
+        self.closed = True
+        self.events_seen = 0
+
+    def choose(self, options: int) -> int:
+        obs = np.array(get_counts_34(to_tiles(self.hand)) + [self.events_seen], dtype=np.int64)
+        return self.engine.react_batch([obs], [np.ones(options, dtype=bool)], None)[0][0]
+
+    def discard(self) -> str:
+        shanten = {}
+        for tile in sorted(set(self.hand)):
+            hand = self.hand.copy()
+            hand.remove(tile)
+            shanten[tile] = calculate_shanten(get_counts_34(to_tiles(hand)), open_melds=0 if self.closed else 1)
+        candidates = [tile for tile in sorted(shanten) if shanten[tile] == min(shanten.values())]
+        return json.dumps({"type": "dahai", "actor": self.seat, "pai": candidates[self.choose(len(candidates))],
+                           "tsumogiri": False})
+
+    def react(self, event_str: str) -> Optional[str]:
+        event = json.loads(event_str)
+        self.events_seen += 1
+        if event["type"] == "start_kyoku":
+            self.hand = list(event["tehais"][self.seat])
+        elif event["type"] == "tsumo" and event["actor"] == self.seat:
+            self.hand.append(event["pai"])
+            if self.closed and calculate_shanten(get_counts_34(to_tiles(self.hand))) == -1:
+                return json.dumps({"type": "hora", "actor": self.seat, "target": self.seat})
+            return self.discard()
+        elif event["type"] == "dahai" and event["actor"] == self.seat:
+            self.hand.remove(event["pai"])
+        elif event["type"] == "dahai" and self.hand.count(event["pai"]) >= 2 and self.choose(2) == 0:
+            return json.dumps({"type": "pon", "actor": self.seat, "target": event["actor"], "pai": event["pai"],
+                               "consumed": [event["pai"], event["pai"]]})
+        elif event["type"] == "pon" and event["actor"] == self.seat:
+            for tile in event["consumed"]:
+                self.hand.remove(tile)
+            self.closed = False
+            return self.discard()
+        return None
+
+
+@pytest.fixture
+def stub_bots(monkeypatch):
+    monkeypatch.setattr(mortal_model, "Bot", StubBot)
+
+
+def emulate_separately(shuffled_tiles: list[str], registry: ModelRegistry) -> list[dict]:
+    results = []
+    for p in PERMUTATIONS:
+        emulator = runner.create_emulator(wall=DuplicateWall(shuffled_tiles=shuffled_tiles),
+                                          player_pth_files=[PTH_FILES[player] for player in p], registry=registry)
+        results.append(emulator.process())
+    return results
@@ -0,0 +1,55 @@
+import heapq
+import math
+from random import Random
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+DealFilter = Callable[[list[str]], bool]  # list of unique outcomes -> whether the deal can be chosen
+DealWeight = Callable[[list[str]], float]  # list of unique outcomes -> relative chance to be chosen
+
+
+def min_outcomes_filter(min_count: int) -> DealFilter:
+    return lambda outcomes_list: len(outcomes_list) >= min_count
+
+
+def uniform_weight(outcomes_list: list[str]) -> float:
+    return 1.0
+
+
+def outcomes_count_weight(outcomes_list: list[str]) -> float:
+    return float(len(outcomes_list))
+
+
+def weighted_sample_without_replacement(weighted_items: Iterable[tuple[T, float]], count: int, r: Random) -> list[T]:
+    # Efraimidis-Spirakis: every item gets key u^(1/w), the count largest keys win.
+    # Only a heap of count items is kept, so it takes O(n log count) time over a stream of n items.
+    # Keys are compared as log(u) / w to avoid underflow for large weights.
+    heap: list[tuple[float, int, T]] = []
+    for i, (item, weight) in enumerate(weighted_items):
+        assert weight >= 0
+        if weight == 0:
+            continue
+        key = math.log(1.0 - r.random()) / weight
+        if len(heap) < count:
+            heapq.heappush(heap, (key, i, item))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, i, item))
+    assert len(heap) == count, f"Only {len(heap)} items can be chosen, {count} requested"
+    # descending keys give the order of successive weighted draws
+    return [item for _, _, item in sorted(heap, reverse=True)]
+
+
+class DealSelector:
+    def __init__(self, deal_filter: DealFilter, deal_weight: DealWeight):
+        self.deal_filter = deal_filter
+        self.deal_weight = deal_weight
+
+    def choose(self, deals: Iterable[tuple[str, list[str]]], count: int, r: Random) -> list[str]:
+        # deals are (wall hash, list of unique outcomes), the result is reproducible for the same order of deals
+        weighted_wall_hashes = (
+            (wall_hash, self.deal_weight(outcomes_list))
+            for wall_hash, outcomes_list in deals
+            if self.deal_filter(outcomes_list)
+        )
+        return weighted_sample_without_replacement(weighted_items=weighted_wall_hashes, count=count, r=r)
@@ -1,19 +1,38 @@
 import copy
 import logging
 import os
-from typing import Any
+from concurrent.futures import Executor
+from typing import Any, Optional
 
 import mortal.mortal_helpers as mortal_helpers
 from emulator import win_calc
+from emulator.event_log import EventLog
+from emulator.hand_analyser import HandAnalyser
+from emulator.hand_state import HandState
+from emulator.round_state import RoundState
+from emulator.tiles import to_name, to_names, to_tile, to_tiles
+from emulator.tracing import TRACER, Tracer
 from emulator.wall import Wall
 from mortal.mortal_bot import MortalBot
 from mortal.mortal_helpers import MortalEvent
-from mortal.mortal_helpers import TILES
+from mortal.model_registry import EngineSource
+
+
+class DecisionRequest:
+    # Events a player has not seen yet, the player answers with one action ("none" when it has nothing to do)
+    def __init__(self, player_id: int, events: list[str]):
+        self.player_id = player_id
+        self.events = events
 
 
 class SingleRoundEmulator:
+    # A resumable round: start() and every step() leave pending requests for the players,
+    # their actions are fed back to step() until the round has a result.
+    # process() drives the round with its own bots, outside schedulers can answer requests themselves.
     def __init__(self, round_wind: str, round_id: int, honba: int, riichi_sticks: int,
-                 dealer_id: int, scores: list[int], wall: Wall, player_pth_files: list[str]):
+                 dealer_id: int, scores: list[int], wall: Wall, player_pth_files: list[str],
+                 registry: Optional[EngineSource] = None, tracer: Optional[Tracer] = None,
+                 analyser: Optional[HandAnalyser] = None, seat_executor: Optional[Executor] = None):
         assert round_wind in {"E", "S", "W"}
         assert 1 <= round_id <= 4
         assert honba >= 0
@@ -29,309 +48,323 @@ class SingleRoundEmulator:
 
         assert len(player_pth_files) == 4
         self.player_pth_files = player_pth_files
+        self.registry = registry
+        self.tracer = tracer or TRACER
+        # players react to the same events in executor threads instead of one after another,
+        # torch releases the GIL in the forward pass, with an InferenceBroker seats also share batches
+        self.seat_executor = seat_executor
         self.players: list[MortalBot] = []
         self.wall = wall
-        self.events: list[MortalEvent] = []
-        self.player_events: list[list[MortalEvent]] = [[], [], [], []]
+        self.events = EventLog()
+        self.player_event_counts: list[int] = [0, 0, 0, 0]  # events already sent to each player
+        self.round_state = RoundState(dealer_id=dealer_id)
+        self.analyser = analyser  # per-turn shanten and ukeire of every hand, added to the round result
 
-        self.player_closed_hands: list[list[str]] = [[], [], [], []]
-        self.player_open_sets: list[list[list[str]]] = [[], [], [], []]
-        self.player_closed_kans: list[list[list[str]]] = [[], [], [], []]
+        self.hands: list[HandState] = [HandState() for _ in range(4)]
         self.successful_riichi_players: set[int] = set()
+        self.turn: int = 0
+        self.pending_requests: list[DecisionRequest] = []
+        self.result: Optional[dict[str, Any]] = None
 
     def init_players(self):
         for player_id, pth_file in enumerate(self.player_pth_files):
             logging.debug("Initializing player %d with file %s", player_id, os.path.basename(pth_file))
-            self.players.append(MortalBot(player_id=player_id, pth_file=pth_file))
-
-    def get_public_events(self, player_id: int) -> list[MortalEvent]:
-        # add missing events since last caching
-        events_to_react = []
-        for ei in range(len(self.player_events[player_id]), len(self.events)):
-            event = copy.deepcopy(self.events[ei])
-            if event["type"] == "start_kyoku":
-                for i in range(4):
-                    if i != player_id:
-                        event["tehais"][i] = ["?"] * 13
-            elif event["type"] == "tsumo":
-                if event["actor"] != player_id:
-                    event["pai"] = "?"
-            events_to_react.append(event)
-        self.player_events[player_id].extend(events_to_react)
-        return events_to_react
+            self.players.append(MortalBot(player_id=player_id, pth_file=pth_file, registry=self.registry))
+
+    def get_public_events(self, player_id: int) -> list[str]:
+        # JSON of events since the last call, as seen by the player
+        start = self.player_event_counts[player_id]
+        self.player_event_counts[player_id] = len(self.events)
+        return self.events.get_player_json(player_id=player_id, start=start, end=len(self.events))
 
     def get_seat(self, player_id: int) -> str:
         return "ESWN"[(player_id - self.dealer_id + 4) % 4]
 
-    def get_win_tile(self, is_tsumo: bool) -> str:
-        for event in reversed(self.events):
-            if is_tsumo:
-                if event["type"] == "tsumo":
-                    return event["pai"]
-            else:
-                if event["type"] in {"dahai", "kakan"}:
-                    return event["pai"]
-        raise Exception("Can't find win tile")
+    def add_event(self, event: MortalEvent):
+        self.events.append(event)
+        self.round_state.update(event)
+        if self.analyser is not None:
+            self.analyser.update(event)
 
-    def process(self) -> dict[str, Any]:
+    def add_progress(self, result: dict[str, Any]) -> dict[str, Any]:
+        if self.analyser is not None:
+            result["progress"] = self.analyser.get_summary()
+        return result
+
+    def fork(self) -> "SingleRoundEmulator":
+        # copy of the round state without bots, the copy can continue the round independently
+        emulator = copy.copy(self)
+        emulator.players = []
+        emulator.wall = copy.deepcopy(self.wall)
+        emulator.events = self.events.copy()
+        emulator.player_event_counts = self.player_event_counts.copy()
+        emulator.round_state = copy.copy(self.round_state)
+        if self.analyser is not None:
+            emulator.analyser = self.analyser.copy()
+        emulator.hands = [hand.copy() for hand in self.hands]
+        emulator.successful_riichi_players = self.successful_riichi_players.copy()
+        emulator.pending_requests = self.pending_requests.copy()
+        return emulator
+
+    def start(self):
         start_hands = self.wall.deal_start_hands()
         dora_marker = self.wall.get_dora_markers()[-1]
-        self.events.append(mortal_helpers.start_hand(
+        self.add_event(mortal_helpers.start_hand(
             round_wind=self.round_wind,
-            dora_marker=dora_marker,
+            dora_marker=to_name(dora_marker),
             round_id=self.round_id,
             honba=self.honba,
             riichi_sticks=self.riichi_sticks,
             dealer_id=self.dealer_id,
             scores=self.scores,
-            start_hands=start_hands
+            start_hands=[to_names(start_hand) for start_hand in start_hands]
         ))
         for player_id in range(4):
-            self.player_closed_hands[player_id].extend(start_hands[player_id])
-        logging.debug("Round started, dora marker %s", dora_marker)
-        logging.debug("East: %s", sorted(start_hands[self.dealer_id], key=lambda x: TILES.index(x)))
-        logging.debug("South: %s", sorted(start_hands[(self.dealer_id + 1) % 4], key=lambda x: TILES.index(x)))
-        logging.debug("West: %s", sorted(start_hands[(self.dealer_id + 2) % 4], key=lambda x: TILES.index(x)))
-        logging.debug("North: %s", sorted(start_hands[(self.dealer_id + 3) % 4], key=lambda x: TILES.index(x)))
+            self.hands[player_id].add_tiles(start_hands[player_id])
+        if self.tracer.is_enabled():
+            self.tracer.emit("start", "Round started, dora marker %(dora_marker)s, start hands %(start_hands)s",
+                             dora_marker=to_name(dora_marker),
+                             start_hands={self.get_seat(player_id): to_names(sorted(start_hands[player_id]))
+                                          for player_id in range(4)})
+        self.turn = 0
+        self.result = None
+        self.pending_requests = self.get_pending_requests()
+
+    def get_pending_requests(self) -> list[DecisionRequest]:
+        # every player reacts to every batch of new events, bots have to see them all
+        return [DecisionRequest(player_id=player_id, events=self.get_public_events(player_id=player_id))
+                for player_id in range(4)]
+
+    def step(self, actions: list[Optional[MortalEvent]]) -> Optional[dict[str, Any]]:
+        # actions answer the pending requests in their order, None means that the wall supported by Mortal
+        # has ended for the player; returns the round result when the round is over
+        assert self.result is None
+        assert len(actions) == len(self.pending_requests)
+        result = self.apply_actions(actions=None if any(action is None for action in actions) else actions)
+        if result is None:
+            self.pending_requests = self.get_pending_requests()
+            return None
+        self.pending_requests = []
+        self.result = self.add_progress(result=result)
+        return self.result
+
+    def react_player(self, request: DecisionRequest) -> Optional[MortalEvent]:
+        # None means that the wall supported by Mortal has ended
+        try:
+            return self.players[request.player_id].react_one(request.events, with_meta=False, with_nulls=True)
+        except RuntimeError as e:
+            if not is_wall_ended_error(e):
+                raise
+            return None
+
+    def react_players(self) -> list[Optional[MortalEvent]]:
+        # actions in the order of pending requests, whichever way they are computed
+        if self.seat_executor is None:
+            return [self.react_player(request=request) for request in self.pending_requests]
+        return list(self.seat_executor.map(self.react_player, self.pending_requests))
+
+    def process(self) -> dict[str, Any]:
+        self.start()
         if len(self.players) == 0:
             self.init_players()
+        while self.result is None:
+            self.step(actions=self.react_players())
+        return self.result
 
-        turn = 0
-        while True:
-            logging.debug("Current hands:")
+    def apply_actions(self, actions: Optional[list[MortalEvent]]) -> Optional[dict[str, Any]]:
+        # applies reactions of all players to the last events, returns the round result when the round is over
+        tracing = self.tracer.is_enabled()
+        if tracing:
             for player_id in range(4):
-                logging.debug("Hand of player %d (%s): closed hands %s, open sets %s, closed kans %s",
-                              player_id, self.get_seat(player_id),
-                              sorted(self.player_closed_hands[player_id], key=lambda x: TILES.index(x)),
-                              self.player_open_sets[player_id],
-                              self.player_closed_kans[player_id],
-                              )
-
-            actions = []
-            wall_ended = False
-            for player_id in range(4):
-                try:
-                    action = self.players[player_id].react_one(self.get_public_events(player_id=player_id),
-                                                               with_meta=False,
-                                                               with_nulls=True)
-                    actions.append(action)
-                except RuntimeError as e:
-                    if "rule violation: attempt to tsumo from exhausted yama" in str(e):
-                        wall_ended = True
-
-            if wall_ended:
-                logging.info("Round (possibly) ended with a draw on turn %.2f, the wall supported by Mortal has ended, "
-                             "but probably duplicate wall has some more tiles", turn / 4.0)
-                return {"result": "draw"}
-
-            win_actions = []
-            for action in actions:
-                if action["type"] == "hora":
-                    win_actions.append(action)
-
-            if len(win_actions) > 0:
-                result = {"result": "win", "wins": []}
-                for action in win_actions:
-                    player_id = int(action["actor"])
-                    target = int(action["target"])
-                    is_tsumo: bool = player_id == target
-                    is_riichi: bool = player_id in self.successful_riichi_players
-                    dora_markers = self.wall.get_dora_markers()
-                    ura_dora_markers = self.wall.get_ura_dora_markers() if is_riichi else []
-                    han, fu, cost = win_calc.calculate_win(
-                        closed_hand=sorted(self.player_closed_hands[player_id], key=lambda x: TILES.index(x)),
-                        open_sets=self.player_open_sets[player_id],
-                        closed_kans=self.player_closed_kans[player_id],
-                        win_tile=self.get_win_tile(is_tsumo=is_tsumo),
-                        dora_markers=dora_markers,
-                        ura_dora_markers=ura_dora_markers,
-                        player_wind=self.get_seat(player_id),
-                        round_wind=self.round_wind,
-                        is_riichi=is_riichi,
-                        is_tsumo=is_tsumo,
-                        riichi_sticks=self.riichi_sticks + len(self.successful_riichi_players - {player_id}),
-                        honba=self.honba,
-                    )
-                    logging.info("Round ended on turn %.2f, player %d (%s) "
-                                 "declared win with %d han, %d fu: %s",
-                                 turn / 4.0, player_id, self.get_seat(player_id), han, fu, action)
-                    win_desc = {
-                        "win_type": "tsumo" if is_tsumo else "ron",
-                        "winner": self.get_seat(player_id),
-                        "han": han,
-                        "fu": fu,
-                    }
-                    if not is_tsumo:
-                        win_desc["loser"] = self.get_seat(target)
-                    result["wins"].append(win_desc)
-                return result
-
-            valid_actions_count = 0
-            for player_id in range(4):
-                if actions[player_id] == self.events[-1]:
-                    actions[player_id] = {"type": "none"}
-                if actions[player_id] != {"type": "none"}:
-                    valid_actions_count += 1
-
-            if valid_actions_count == 0:
-                # time to take tile
-                kan_player_id = None
-                kan_type = None
-                riichi_player_id = None
-                last_discard_player_id = None
-                for event in reversed(self.events):
-                    if event["type"] in {"ankan", "kakan", "daiminkan"}:
-                        kan_player_id = event["actor"]
-                        kan_type = event["type"]
-                        break
-                    if event["type"] == "reach":
-                        riichi_player_id = event["actor"]
-                        break
-                    if event["type"] == "dahai":
-                        last_discard_player_id = event["actor"]
-                        break
-
-                if kan_player_id is not None:
-                    if not self.wall.can_declare_kan(player_id=kan_player_id):
-                        logging.info("Round (possibly) ended with a draw on turn %.2f, "
-                                     "duplicate wall of a player has ended, but Mortal wants kan", turn / 4.0)
-                        return {"result": "draw"}
-                    tile = self.wall.draw_kan_tile(player_id=kan_player_id)
-                    logging.debug("Player %d (%s) drew kan replacement tile %s",
-                                  kan_player_id, self.get_seat(kan_player_id), tile)
-                    if kan_type == "ankan":
-                        dora_marker = self.wall.get_dora_markers()[-1]
-                        logging.debug("New dora marker: %s", dora_marker)
-                        self.events.append(mortal_helpers.add_dora_marker(tile=dora_marker))
-                    self.events.append(mortal_helpers.draw_tile(player_id=kan_player_id, tile=tile))
-                    self.player_closed_hands[kan_player_id].append(tile)
-                    turn += 1
-                else:
-                    if riichi_player_id is not None:
-                        logging.debug("Successful riichi by player %d (%s)",
-                                      riichi_player_id, self.get_seat(riichi_player_id))
-                        current_player_id = (riichi_player_id + 1) % 4
-                    elif last_discard_player_id is not None:
-                        current_player_id = (last_discard_player_id + 1) % 4
-                    else:
-                        current_player_id = self.dealer_id  # first turn only
-
-                    if not self.wall.can_draw_tile(player_id=current_player_id):
-                        logging.info("Round ended by draw on turn %.2f: player %d (%s) can't draw tile",
-                                     turn / 4.0, current_player_id, self.get_seat(current_player_id))
-                        return {"result": "draw"}
-
-                    if len(self.events) >= 2 and self.events[-2]["type"] == "reach":
-                        riichi_player_id = self.events[-2]["actor"]
-                        assert self.events[-1]["type"] == "dahai"
-                        assert self.events[-1]["actor"] == riichi_player_id
-                        self.events.append(mortal_helpers.successful_riichi(player_id=riichi_player_id))
-                        self.successful_riichi_players.add(riichi_player_id)
-
-                    tile = self.wall.draw_tile(player_id=current_player_id)
-                    logging.debug("Player %d (%s) drew tile %s",
-                                  current_player_id, self.get_seat(current_player_id), tile)
-                    self.events.append(mortal_helpers.draw_tile(player_id=current_player_id, tile=tile))
-                    self.player_closed_hands[current_player_id].append(tile)
-                    turn += 1
-                continue
-
-            redeal_actions = []
-            for action in actions:
-                if action["type"] == "ryukyoku":
-                    redeal_actions.append(action)
-            assert len(redeal_actions) <= 1
-            if len(redeal_actions) == 1:
-                logging.info("Round ended with an abortive draw")
-                return {"result": "draw"}
-
-            kan_and_pon_actions = []
-            for action in actions:
-                if action["type"] in {"ankan", "kakan", "daiminkan", "pon"}:
-                    kan_and_pon_actions.append(action)
-            assert len(kan_and_pon_actions) <= 1
-            if len(kan_and_pon_actions) == 1:
-                call_action = kan_and_pon_actions[0]
-                player_id = int(call_action["actor"])
-                logging.debug("Called %s by player %d (%s)", call_action["type"],
-                              player_id, self.get_seat(player_id))
-                self.events.append(call_action)
-                if call_action["type"] == "pon":
-                    # noinspection PyTypeChecker
-                    kan_tiles: list[str] = call_action["consumed"]
-                    for tile in kan_tiles:
-                        self.player_closed_hands[player_id].remove(tile)
-                    self.player_open_sets[player_id].append([call_action["pai"]] + kan_tiles)
-                elif call_action["type"] == "daiminkan":
-                    # noinspection PyTypeChecker
-                    kan_tiles: list[str] = call_action["consumed"]
-                    for tile in kan_tiles:
-                        self.player_closed_hands[player_id].remove(tile)
-                    self.player_open_sets[player_id].append([call_action["pai"]] + kan_tiles)
-                elif call_action["type"] == "ankan":
-                    # noinspection PyTypeChecker
-                    kan_tiles: list[str] = call_action["consumed"]
-                    for tile in kan_tiles:
-                        self.player_closed_hands[player_id].remove(tile)
-                    self.player_closed_kans[player_id].append(kan_tiles)
-                elif call_action["type"] == "kakan":
-                    # noinspection PyTypeChecker
-                    kan_tiles: list[str] = call_action["consumed"]
-                    self.player_closed_hands[player_id].remove(call_action["pai"])
-                    for i in range(len(self.player_open_sets[player_id])):
-                        if sorted(self.player_open_sets[player_id][i]) == sorted(kan_tiles):
-                            self.player_open_sets[player_id][i].insert(0, call_action["pai"])
-                continue
-
-            chi_actions = []
-            for action in actions:
-                if action["type"] == "chi":
-                    chi_actions.append(action)
-            assert len(chi_actions) <= 1
-            if len(chi_actions) == 1:
-                player_id = int(chi_actions[0]["actor"])
-                logging.debug("Called chi by player %d (%s)",
-                              player_id, self.get_seat(player_id))
-                self.events.append(chi_actions[0])
-                # noinspection PyTypeChecker
-                chi_tiles: list[str] = chi_actions[0]["consumed"]
-                for tile in chi_tiles:
-                    self.player_closed_hands[player_id].remove(tile)
-                self.player_open_sets[player_id].append([chi_actions[0]["pai"]] + chi_tiles)
-                continue
-
-            discard_actions = []
-            for action in actions:
-                if action["type"] == "dahai":
-                    discard_actions.append(action)
-            assert len(discard_actions) <= 1
-            if len(discard_actions) == 1:
-                player_id = int(discard_actions[0]["actor"])
-                logging.debug("Discarded tile %s by player %d (%s)", discard_actions[0]["pai"],
-                              player_id, self.get_seat(player_id))
-                self.events.append(discard_actions[0])
-                self.player_closed_hands[player_id].remove(discard_actions[0]["pai"])
-                if len(self.events) > 3 and self.events[-3]["type"] in {"daiminkan", "kakan"}:
-                    assert self.events[-3]["actor"] == player_id
-                    assert self.events[-2]["type"] == "tsumo"
-                    assert self.events[-2]["actor"] == player_id
+                self.tracer.emit("hand", "Hand of player %(player_id)d (%(seat)s) on turn %(turn)d: "
+                                         "closed hands %(closed_hand)s, open sets %(open_sets)s, "
+                                         "closed kans %(closed_kans)s",
+                                 turn=self.turn, player_id=player_id, seat=self.get_seat(player_id),
+                                 closed_hand=to_names(self.hands[player_id].get_closed_tiles()),
+                                 open_sets=[to_names(tiles) for tiles in self.hands[player_id].open_sets],
+                                 closed_kans=[to_names(tiles) for tiles in self.hands[player_id].closed_kans])
+
+        if actions is None:
+            logging.info("Round (possibly) ended with a draw on turn %.2f, the wall supported by Mortal has ended, "
+                         "but probably duplicate wall has some more tiles", self.turn / 4.0)
+            return {"result": "draw"}
+        actions = actions.copy()
+
+        win_actions = []
+        for action in actions:
+            if action["type"] == "hora":
+                win_actions.append(action)
+
+        if len(win_actions) > 0:
+            result = {"result": "win", "wins": []}
+            for action in win_actions:
+                player_id = int(action["actor"])
+                target = int(action["target"])
+                is_tsumo: bool = player_id == target
+                is_riichi: bool = player_id in self.successful_riichi_players
+                dora_markers = self.wall.get_dora_markers()
+                ura_dora_markers = self.wall.get_ura_dora_markers() if is_riichi else []
+                han, fu, cost = win_calc.calculate_win(
+                    closed_hand=self.hands[player_id].get_closed_tiles(),
+                    open_sets=self.hands[player_id].open_sets,
+                    closed_kans=self.hands[player_id].closed_kans,
+                    win_tile=to_tile(self.round_state.get_win_tile(is_tsumo=is_tsumo)),
+                    dora_markers=dora_markers,
+                    ura_dora_markers=ura_dora_markers,
+                    player_wind=self.get_seat(player_id),
+                    round_wind=self.round_wind,
+                    is_riichi=is_riichi,
+                    is_tsumo=is_tsumo,
+                    riichi_sticks=self.riichi_sticks + len(self.successful_riichi_players - {player_id}),
+                    honba=self.honba,
+                )
+                logging.info("Round ended on turn %.2f, player %d (%s) "
+                             "declared win with %d han, %d fu: %s",
+                             self.turn / 4.0, player_id, self.get_seat(player_id), han, fu, action)
+                win_desc = {
+                    "win_type": "tsumo" if is_tsumo else "ron",
+                    "winner": self.get_seat(player_id),
+                    "han": han,
+                    "fu": fu,
+                }
+                if not is_tsumo:
+                    win_desc["loser"] = self.get_seat(target)
+                result["wins"].append(win_desc)
+            return result
+
+        valid_actions_count = 0
+        for player_id in range(4):
+            if actions[player_id] == self.events[-1]:
+                actions[player_id] = {"type": "none"}
+            if actions[player_id] != {"type": "none"}:
+                valid_actions_count += 1
+
+        if valid_actions_count == 0:
+            # time to take tile
+            pending_kan = self.round_state.get_pending_kan()
+            if pending_kan is not None:
+                kan_player_id, kan_type = pending_kan
+                if not self.wall.can_declare_kan(player_id=kan_player_id):
+                    logging.info("Round (possibly) ended with a draw on turn %.2f, "
+                                 "duplicate wall of a player has ended, but Mortal wants kan", self.turn / 4.0)
+                    return {"result": "draw"}
+                tile = self.wall.draw_kan_tile(player_id=kan_player_id)
+                if tracing:
+                    self.tracer.emit("draw", "Player %(player_id)d (%(seat)s) drew kan replacement tile %(tile)s",
+                                     player_id=kan_player_id, seat=self.get_seat(kan_player_id), tile=to_name(tile))
+                if kan_type == "ankan":
                     dora_marker = self.wall.get_dora_markers()[-1]
-                    logging.debug("New dora marker: %s", dora_marker)
-                    self.events.append(mortal_helpers.add_dora_marker(tile=dora_marker))
-                continue
-
-            riichi_actions = []
-            for action in actions:
-                if action["type"] == "reach":
-                    riichi_actions.append(action)
-            assert len(riichi_actions) <= 1
-            if len(riichi_actions) == 1:
-                player_id = int(riichi_actions[0]["actor"])
-                logging.debug("Declared riichi by player %d (%s)",
-                              player_id, self.get_seat(player_id))
-                self.events.append(riichi_actions[0])
-                continue
-
-            raise Exception("Can't find a valid action")
-
-        raise Exception("Process cycle didn't end correctly")
+                    if tracing:
+                        self.tracer.emit("dora", "New dora marker: %(dora_marker)s", dora_marker=to_name(dora_marker))
+                    self.add_event(mortal_helpers.add_dora_marker(tile=to_name(dora_marker)))
+                self.add_event(mortal_helpers.draw_tile(player_id=kan_player_id, tile=to_name(tile)))
+                self.hands[kan_player_id].add(tile)
+                self.turn += 1
+            else:
+                current_player_id = self.round_state.get_next_player_id()
+
+                if not self.wall.can_draw_tile(player_id=current_player_id):
+                    logging.info("Round ended by draw on turn %.2f: player %d (%s) can't draw tile",
+                                 self.turn / 4.0, current_player_id, self.get_seat(current_player_id))
+                    return {"result": "draw"}
+
+                riichi_player_id = self.round_state.get_accepted_riichi_player_id()
+                if riichi_player_id is not None:
+                    if tracing:
+                        self.tracer.emit("riichi_accepted", "Successful riichi by player %(player_id)d (%(seat)s)",
+                                         player_id=riichi_player_id, seat=self.get_seat(riichi_player_id))
+                    self.add_event(mortal_helpers.successful_riichi(player_id=riichi_player_id))
+                    self.successful_riichi_players.add(riichi_player_id)
+
+                tile = self.wall.draw_tile(player_id=current_player_id)
+                if tracing:
+                    self.tracer.emit("draw", "Player %(player_id)d (%(seat)s) drew tile %(tile)s",
+                                     player_id=current_player_id, seat=self.get_seat(current_player_id),
+                                     tile=to_name(tile))
+                self.add_event(mortal_helpers.draw_tile(player_id=current_player_id, tile=to_name(tile)))
+                self.hands[current_player_id].add(tile)
+                self.turn += 1
+            return None
+
+        redeal_actions = []
+        for action in actions:
+            if action["type"] == "ryukyoku":
+                redeal_actions.append(action)
+        assert len(redeal_actions) <= 1
+        if len(redeal_actions) == 1:
+            logging.info("Round ended with an abortive draw")
+            return {"result": "draw"}
+
+        kan_and_pon_actions = []
+        for action in actions:
+            if action["type"] in {"ankan", "kakan", "daiminkan", "pon"}:
+                kan_and_pon_actions.append(action)
+        assert len(kan_and_pon_actions) <= 1
+        if len(kan_and_pon_actions) == 1:
+            call_action = kan_and_pon_actions[0]
+            player_id = int(call_action["actor"])
+            if tracing:
+                self.tracer.emit("call", "Called %(type)s by player %(player_id)d (%(seat)s)",
+                                 type=call_action["type"], player_id=player_id, seat=self.get_seat(player_id))
+            self.add_event(call_action)
+            if call_action["type"] in {"pon", "daiminkan"}:
+                self.hands[player_id].call(called_tile=to_tile(call_action["pai"]),
+                                           consumed=to_tiles(call_action["consumed"]))
+            elif call_action["type"] == "ankan":
+                self.hands[player_id].declare_closed_kan(consumed=to_tiles(call_action["consumed"]))
+            elif call_action["type"] == "kakan":
+                self.hands[player_id].declare_added_kan(tile=to_tile(call_action["pai"]))
+            return None
+
+        chi_actions = []
+        for action in actions:
+            if action["type"] == "chi":
+                chi_actions.append(action)
+        assert len(chi_actions) <= 1
+        if len(chi_actions) == 1:
+            player_id = int(chi_actions[0]["actor"])
+            if tracing:
+                self.tracer.emit("call", "Called %(type)s by player %(player_id)d (%(seat)s)",
+                                 type="chi", player_id=player_id, seat=self.get_seat(player_id))
+            self.add_event(chi_actions[0])
+            self.hands[player_id].call(called_tile=to_tile(chi_actions[0]["pai"]),
+                                       consumed=to_tiles(chi_actions[0]["consumed"]))
+            return None
+
+        discard_actions = []
+        for action in actions:
+            if action["type"] == "dahai":
+                discard_actions.append(action)
+        assert len(discard_actions) <= 1
+        if len(discard_actions) == 1:
+            player_id = int(discard_actions[0]["actor"])
+            if tracing:
+                self.tracer.emit("discard", "Discarded tile %(tile)s by player %(player_id)d (%(seat)s)",
+                                 tile=discard_actions[0]["pai"], player_id=player_id, seat=self.get_seat(player_id))
+            self.add_event(discard_actions[0])
+            self.hands[player_id].remove(to_tile(discard_actions[0]["pai"]))
+            if self.round_state.kan_dora_pending:
+                dora_marker = self.wall.get_dora_markers()[-1]
+                if tracing:
+                    self.tracer.emit("dora", "New dora marker: %(dora_marker)s", dora_marker=to_name(dora_marker))
+                self.add_event(mortal_helpers.add_dora_marker(tile=to_name(dora_marker)))
+            return None
+
+        riichi_actions = []
+        for action in actions:
+            if action["type"] == "reach":
+                riichi_actions.append(action)
+        assert len(riichi_actions) <= 1
+        if len(riichi_actions) == 1:
+            player_id = int(riichi_actions[0]["actor"])
+            if tracing:
+                self.tracer.emit("riichi", "Declared riichi by player %(player_id)d (%(seat)s)",
+                                 player_id=player_id, seat=self.get_seat(player_id))
+            self.add_event(riichi_actions[0])
+            return None
+
+        raise Exception("Can't find a valid action")
+
+
+def is_wall_ended_error(e: RuntimeError) -> bool:
+    return "rule violation: attempt to tsumo from exhausted yama" in str(e)
@@ -0,0 +1,63 @@
+import json
+from typing import Iterator, Union
+
+from mortal.mortal_helpers import MortalEvent
+
+EncodedEvent = Union[str, list[str]]  # the same JSON for all players, or JSON for each player
+
+
+def dumps_event(event: MortalEvent) -> str:
+    return json.dumps(event, separators=(",", ":"))
+
+
+def encode_event(event: MortalEvent) -> EncodedEvent:
+    # only start hands and drawn tiles are hidden from other players
+    if event["type"] == "start_kyoku":
+        encoded = []
+        for player_id in range(4):
+            tehais = [hand if i == player_id else ["?"] * 13 for i, hand in enumerate(event["tehais"])]
+            encoded.append(dumps_event({**event, "tehais": tehais}))
+        return encoded
+    if event["type"] == "tsumo":
+        full = dumps_event(event)
+        masked = dumps_event({**event, "pai": "?"})
+        return [full if player_id == event["actor"] else masked for player_id in range(4)]
+    return dumps_event(event)
+
+
+class EventLog:
+    # Events of a round with their JSON encoded once, bots get the strings their player is allowed to see
+    def __init__(self):
+        self.events: list[MortalEvent] = []
+        self.encoded_events: list[EncodedEvent] = []
+
+    def append(self, event: MortalEvent):
+        self.events.append(event)
+        self.encoded_events.append(encode_event(event))
+
+    def get_player_json(self, player_id: int, start: int, end: int) -> list[str]:
+        result = []
+        for encoded_event in self.encoded_events[start:end]:
+            if isinstance(encoded_event, str):
+                result.append(encoded_event)
+            else:
+                result.append(encoded_event[player_id])
+        return result
+
+    def copy(self) -> "EventLog":
+        event_log = EventLog()
+        event_log.events = self.events.copy()
+        event_log.encoded_events = self.encoded_events.copy()
+        return event_log
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __getitem__(self, index: int) -> MortalEvent:
+        return self.events[index]
+
+    def __iter__(self) -> Iterator[MortalEvent]:
+        return iter(self.events)
+
+    def __reversed__(self) -> Iterator[MortalEvent]:
+        return reversed(self.events)
@@ -0,0 +1,124 @@
+import copy
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+from emulator.shanten import calculate_ukeire, calculate_ukeire_batch
+from emulator.tiles import TILE_34, to_tile
+from mortal.mortal_helpers import MortalEvent
+
+HandSnapshot = tuple[int, int, list[int], int, list[int]]  # player id, turn, hand counts, open melds, visible counts
+
+
+class HandAnalyser:
+    # Per-turn progress of every hand, fed with the same events as the bots.
+    # Shanten and ukeire are measured whenever a hand has 3n + 1 tiles: after the deal and after every discard.
+    # Ukeire counts only tiles that are not visible: discards, melds and dora markers are subtracted.
+    # With deferred=True hands are only recorded, analyse_rounds measures them for many rounds at once.
+    def __init__(self, deferred: bool = False):
+        self.deferred = deferred
+        self.dealer_id: int = 0
+        self.turn: int = 0  # tiles drawn in the round
+        self.hands_34: list[list[int]] = [[0] * 34 for _ in range(4)]
+        self.open_melds: list[int] = [0] * 4  # kans included
+        self.visible_34: list[int] = [0] * 34
+        # (turn, shanten, ukeire) of every measurement of every player
+        self.progress: list[list[tuple[int, int, int]]] = [[] for _ in range(4)]
+        self.snapshots: list[HandSnapshot] = []
+
+    def update(self, event: MortalEvent):
+        event_type = event["type"]
+        if event_type == "start_kyoku":
+            self.dealer_id = event["oya"]
+            self.see_tile(tile=event["dora_marker"])
+            for player_id, start_hand in enumerate(event["tehais"]):
+                for tile in start_hand:
+                    self.hands_34[player_id][TILE_34[to_tile(tile)]] += 1
+                self.measure(player_id=player_id)
+        elif event_type == "tsumo":
+            self.turn += 1
+            self.hands_34[event["actor"]][TILE_34[to_tile(event["pai"])]] += 1
+        elif event_type == "dahai":
+            self.hands_34[event["actor"]][TILE_34[to_tile(event["pai"])]] -= 1
+            self.see_tile(tile=event["pai"])
+            self.measure(player_id=event["actor"])
+        elif event_type in {"chi", "pon", "daiminkan", "ankan"}:
+            # the called tile is already visible as a discard
+            for tile in event["consumed"]:
+                self.hands_34[event["actor"]][TILE_34[to_tile(tile)]] -= 1
+                self.see_tile(tile=tile)
+            self.open_melds[event["actor"]] += 1
+        elif event_type == "kakan":
+            self.hands_34[event["actor"]][TILE_34[to_tile(event["pai"])]] -= 1
+            self.see_tile(tile=event["pai"])
+        elif event_type == "dora":
+            self.see_tile(tile=event["dora_marker"])
+
+    def see_tile(self, tile: str):
+        self.visible_34[TILE_34[to_tile(tile)]] += 1
+
+    def measure(self, player_id: int):
+        if self.deferred:
+            self.snapshots.append((player_id, self.turn, self.hands_34[player_id].copy(), self.open_melds[player_id],
+                                   self.visible_34.copy()))
+            return
+        shanten, ukeire = calculate_ukeire(counts_34=self.hands_34[player_id], open_melds=self.open_melds[player_id],
+                                           visible_34=self.visible_34)
+        self.progress[player_id].append((self.turn, shanten, ukeire))
+
+    def copy(self) -> "HandAnalyser":
+        analyser = copy.copy(self)
+        analyser.hands_34 = [hand_34.copy() for hand_34 in self.hands_34]
+        analyser.open_melds = self.open_melds.copy()
+        analyser.visible_34 = self.visible_34.copy()
+        analyser.progress = [player_progress.copy() for player_progress in self.progress]
+        analyser.snapshots = self.snapshots.copy()
+        return analyser
+
+    def get_tenpai_turn(self, player_id: int) -> Optional[int]:
+        for turn, shanten, _ in self.progress[player_id]:
+            if shanten <= 0:
+                return turn
+        return None
+
+    def get_summary(self) -> dict[str, Any]:
+        # by seat, as winners and losers in emulation results
+        result = {}
+        for player_id in range(4):
+            result["ESWN"[(player_id - self.dealer_id + 4) % 4]] = {
+                "turns": [turn for turn, _, _ in self.progress[player_id]],
+                "shanten": [shanten for _, shanten, _ in self.progress[player_id]],
+                "ukeire": [ukeire for _, _, ukeire in self.progress[player_id]],
+                "tenpai_turn": self.get_tenpai_turn(player_id=player_id),
+            }
+        return result
+
+
+def analyse_rounds(rounds: Iterable[list[MortalEvent]]) -> list[dict[str, Any]]:
+    # Summaries of recorded rounds. Hands of all rounds are measured in one batch per number of open melds.
+    analysers = []
+    for events in rounds:
+        analyser = HandAnalyser(deferred=True)
+        for event in events:
+            analyser.update(event)
+        analysers.append(analyser)
+
+    snapshots = [(analyser, snapshot) for analyser in analysers for snapshot in analyser.snapshots]
+    for open_melds in range(5):
+        group = [(analyser, snapshot) for analyser, snapshot in snapshots if snapshot[3] == open_melds]
+        if len(group) == 0:
+            continue
+        shanten, ukeire = calculate_ukeire_batch(counts_34=np.array([snapshot[2] for _, snapshot in group]),
+                                                 open_melds=open_melds,
+                                                 visible_34=np.array([snapshot[4] for _, snapshot in group]))
+        for (analyser, snapshot), s, u in zip(group, shanten.tolist(), ukeire.tolist()):
+            analyser.progress[snapshot[0]].append((snapshot[1], s, u))
+
+    result = []
+    for analyser in analysers:
+        for player_progress in analyser.progress:
+            # groups go by open melds, which only grow, so the stable sort keeps the order of a turn
+            player_progress.sort(key=lambda item: item[0])
+        analyser.snapshots = []
+        result.append(analyser.get_summary())
+    return result
@@ -0,0 +1,66 @@
+from typing import Optional
+
+from emulator.tiles import TILE_34, TILE_COUNT, Tile
+
+
+class HandState:
+    # Closed hand as tile counts, so that drawing, discarding and calling are O(1),
+    # and melds with an index of pons by 34-space tile to resolve added kans directly
+    def __init__(self):
+        self.counts: list[int] = [0] * TILE_COUNT
+        self.size: int = 0
+        self.open_sets: list[list[Tile]] = []  # called tile first
+        self.closed_kans: list[list[Tile]] = []
+        self.pons: list[Optional[int]] = [None] * 34  # 34-space tile -> index of the pon in open_sets
+
+    def add(self, tile: Tile):
+        self.counts[tile] += 1
+        self.size += 1
+
+    def remove(self, tile: Tile):
+        assert self.counts[tile] > 0, f"No tile {tile} in hand"
+        self.counts[tile] -= 1
+        self.size -= 1
+
+    def add_tiles(self, tiles: list[Tile]):
+        for tile in tiles:
+            self.add(tile)
+
+    def remove_tiles(self, tiles: list[Tile]):
+        for tile in tiles:
+            self.remove(tile)
+
+    def get_closed_tiles(self) -> list[Tile]:
+        # sorted in TILES order
+        result = []
+        for tile, count in enumerate(self.counts):
+            if count > 0:
+                result.extend([tile] * count)
+        return result
+
+    def call(self, called_tile: Tile, consumed: list[Tile]):
+        # pon, chi or open kan
+        self.remove_tiles(consumed)
+        if len(consumed) == 2 and TILE_34[called_tile] == TILE_34[consumed[0]] == TILE_34[consumed[1]]:
+            self.pons[TILE_34[called_tile]] = len(self.open_sets)
+        self.open_sets.append([called_tile] + consumed)
+
+    def declare_closed_kan(self, consumed: list[Tile]):
+        self.remove_tiles(consumed)
+        self.closed_kans.append(consumed)
+
+    def declare_added_kan(self, tile: Tile):
+        self.remove(tile)
+        pon_index = self.pons[TILE_34[tile]]
+        assert pon_index is not None, f"No pon for added kan of tile {tile}"
+        self.open_sets[pon_index].insert(0, tile)
+        self.pons[TILE_34[tile]] = None
+
+    def copy(self) -> "HandState":
+        hand_state = HandState()
+        hand_state.counts = self.counts.copy()
+        hand_state.size = self.size
+        hand_state.open_sets = [open_set.copy() for open_set in self.open_sets]
+        hand_state.closed_kans = self.closed_kans.copy()  # closed kans are never changed
+        hand_state.pons = self.pons.copy()
+        return hand_state
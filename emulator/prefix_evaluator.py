@@ -0,0 +1,143 @@
+import json
+import logging
+from typing import Any, Optional
+
+import mortal.mortal_lib.model as mortal_model
+from emulator import runner
+from emulator.emulator import SingleRoundEmulator, is_wall_ended_error
+from emulator.runner import PERMUTATIONS
+from emulator.wall import DuplicateWall
+from mortal import model_registry
+from mortal.model_registry import CachingEngineSource, EngineSource
+from mortal.mortal_bot import MortalBot
+from mortal.mortal_helpers import MortalEvent
+
+BotKey = tuple[int, str]  # (player id, pth file)
+
+
+class Branch:
+    # Emulation state shared by all permutations that have seen the same events so far
+    def __init__(self, emulator: SingleRoundEmulator, permutations: list[tuple[int, ...]], bots: dict[BotKey, MortalBot]):
+        self.emulator = emulator
+        self.permutations = permutations
+        self.bots = bots
+
+
+class PrefixSharingEvaluator:
+    # Emulates all permutations of a duplicate wall as a tree: a bot is asked once per (seat, model)
+    # while the permutations agree, and the round state is forked only where their actions differ
+    def __init__(self, pth_files: list[str], registry: Optional[EngineSource] = None,
+                 decision_cache_size: int = 100000, analyse_hands: bool = False):
+        assert len(pth_files) == 4
+        self.pth_files = pth_files
+        self.analyse_hands = analyse_hands
+        if registry is None:
+            # engines of the process-wide registry behind a private cache: bots replaying a shared prefix
+            # get decisions from it, while other emulators in the process are not affected.
+            # A registry passed in is used as it is
+            registry = CachingEngineSource(source=model_registry.REGISTRY,
+                                           decision_cache=mortal_model.DecisionCache(max_size=decision_cache_size))
+        self.registry = registry
+        self.decision_cache: Optional[mortal_model.DecisionCache] = getattr(registry, "decision_cache", None)
+        self.bot_calls: int = 0
+        self.forks: int = 0
+
+    def get_bot_keys(self, permutations: list[tuple[int, ...]]) -> set[BotKey]:
+        return {(player_id, self.pth_files[p[player_id]]) for p in permutations for player_id in range(4)}
+
+    def get_player_pth_files(self, p: tuple[int, ...]) -> list[str]:
+        return [self.pth_files[p[0]], self.pth_files[p[1]], self.pth_files[p[2]], self.pth_files[p[3]]]
+
+    def evaluate(self, shuffled_tiles: list[str],
+                 permutations: Optional[list[tuple[int, ...]]] = None) -> list[dict[str, Any]]:
+        # returns emulation results in the order of permutations, same as emulating them one by one
+        if permutations is None:
+            permutations = PERMUTATIONS
+        decision_cache = self.decision_cache
+        hits = decision_cache.hits if decision_cache is not None else 0
+
+        root = runner.create_emulator(wall=DuplicateWall(shuffled_tiles=shuffled_tiles),
+                                      player_pth_files=self.get_player_pth_files(permutations[0]),
+                                      analyse_hands=self.analyse_hands)
+        root.start()
+        bots = {}
+        for player_id, pth_file in self.get_bot_keys(permutations=permutations):
+            bots[(player_id, pth_file)] = MortalBot(player_id=player_id, pth_file=pth_file, registry=self.registry)
+
+        results: dict[tuple[int, ...], dict[str, Any]] = {}
+        branches = [Branch(emulator=root, permutations=list(permutations), bots=bots)]
+        while len(branches) > 0:
+            branch = branches.pop()
+            for child, result in self.step(branch=branch):
+                if result is not None:
+                    for p in child.permutations:
+                        results[p] = result
+                else:
+                    branches.append(child)
+
+        logging.debug("Prefix sharing: %d bot calls, %d forks, %d decision cache hits", self.bot_calls, self.forks,
+                      decision_cache.hits - hits if decision_cache is not None else 0)
+        return [results[p] for p in permutations]
+
+    def react(self, branch: Branch) -> dict[BotKey, Optional[MortalEvent]]:
+        # None means that the wall supported by Mortal has ended for this bot
+        public_events = [request.events for request in branch.emulator.pending_requests]
+        reactions: dict[BotKey, Optional[MortalEvent]] = {}
+        for (player_id, pth_file), bot in branch.bots.items():
+            self.bot_calls += 1
+            try:
+                reactions[(player_id, pth_file)] = bot.react_one(public_events[player_id],
+                                                                 with_meta=False,
+                                                                 with_nulls=True)
+            except RuntimeError as e:
+                if not is_wall_ended_error(e):
+                    raise
+                reactions[(player_id, pth_file)] = None
+        return reactions
+
+    def step(self, branch: Branch) -> list[tuple[Branch, Optional[dict[str, Any]]]]:
+        reactions = self.react(branch=branch)
+
+        groups: dict[str, tuple[list[Optional[MortalEvent]], list[tuple[int, ...]]]] = {}
+        for p in branch.permutations:
+            actions = [reactions[(player_id, self.pth_files[p[player_id]])] for player_id in range(4)]
+            if any(action is None for action in actions):
+                actions = [None] * 4  # the round is a draw whatever the other bots do
+            group_key = json.dumps(actions, sort_keys=True)
+            if group_key not in groups:
+                groups[group_key] = (actions, [])
+            groups[group_key][1].append(p)
+
+        # fork before applying any actions, every child starts from the same state
+        children = []
+        free_bots = dict(branch.bots)
+        for i, (actions, permutations) in enumerate(groups.values()):
+            emulator = branch.emulator if i == 0 else branch.emulator.fork()
+            if i > 0:
+                self.forks += 1
+            children.append((emulator, actions, permutations, {}))
+        for emulator, actions, permutations, bots in children:
+            for bot_key in sorted(self.get_bot_keys(permutations=permutations)):
+                if bot_key in free_bots:
+                    bots[bot_key] = free_bots.pop(bot_key)
+                else:
+                    bots[bot_key] = self.replay_bot(emulator=emulator, bot_key=bot_key)
+
+        result = []
+        for emulator, actions, permutations, bots in children:
+            child = Branch(emulator=emulator, permutations=permutations, bots=bots)
+            result.append((child, emulator.step(actions=actions)))
+        return result
+
+    def replay_bot(self, emulator: SingleRoundEmulator, bot_key: BotKey) -> MortalBot:
+        # a new bot catches up with all events its player has seen, decisions come from the decision cache
+        player_id, pth_file = bot_key
+        bot = MortalBot(player_id=player_id, pth_file=pth_file, registry=self.registry)
+        try:
+            bot.react_all(emulator.events.get_player_json(player_id=player_id, start=0,
+                                                          end=emulator.player_event_counts[player_id]),
+                          with_meta=False)
+        except RuntimeError as e:
+            if not is_wall_ended_error(e):
+                raise
+        return bot
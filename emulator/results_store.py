@@ -0,0 +1,131 @@
+import itertools
+import os
+import sqlite3
+import time
+from typing import Any, Iterator, Optional
+
+ResultKey = tuple[str, Optional[str], Optional[str]]  # (win type, winner, loser)
+
+RESULTS_DB_PATH = "_results.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS walls (
+    wall_hash TEXT PRIMARY KEY,
+    shuffled_tiles TEXT NOT NULL,
+    picture_path TEXT,
+    unique_outcomes INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS walls_unique_outcomes ON walls (unique_outcomes);
+CREATE TABLE IF NOT EXISTS outcomes (
+    wall_hash TEXT NOT NULL REFERENCES walls (wall_hash),
+    permutation TEXT NOT NULL,
+    models TEXT NOT NULL,
+    win_type TEXT NOT NULL,
+    winner TEXT,
+    loser TEXT,
+    han INTEGER,
+    fu INTEGER
+);
+CREATE INDEX IF NOT EXISTS outcomes_wall_hash ON outcomes (wall_hash);
+"""
+
+
+def get_result_keys(emulation_result: dict[str, Any]) -> list[ResultKey]:
+    if emulation_result["result"] == "draw":
+        return [("draw", None, None)]
+    assert emulation_result["result"] == "win"
+    return [(win_desc["win_type"], win_desc["winner"], win_desc.get("loser")) for win_desc in emulation_result["wins"]]
+
+
+class ResultsStore:
+    # Append-only SQLite store of emulated walls, one row per round outcome of every permutation
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def has_wall(self, wall_hash: str) -> bool:
+        row = self.connection.execute("SELECT 1 FROM walls WHERE wall_hash = ?", (wall_hash,)).fetchone()
+        return row is not None
+
+    def add_wall(self, wall_hash: str, shuffled_tiles: list[str], picture_path: Optional[str],
+                 permutations: list[tuple[int, ...]], pth_files: list[str],
+                 emulation_results: list[dict[str, Any]]) -> bool:
+        assert len(permutations) == len(emulation_results)
+        unique_outcomes: set[ResultKey] = set()
+        rows = []
+        for p, emulation_result in zip(permutations, emulation_results):
+            models = ",".join(os.path.basename(pth_files[i]) for i in p)
+            wins = emulation_result.get("wins", [{}])
+            for result_key, win_desc in zip(get_result_keys(emulation_result=emulation_result), wins):
+                unique_outcomes.add(result_key)
+                rows.append((wall_hash, "".join(map(str, p)), models, *result_key,
+                             win_desc.get("han"), win_desc.get("fu")))
+
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO walls (wall_hash, shuffled_tiles, picture_path, unique_outcomes, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (wall_hash, " ".join(shuffled_tiles), picture_path, len(unique_outcomes), time.time()),
+            )
+            if cursor.rowcount == 0:
+                return False  # already stored, e.g. a wall that was re-run after a restart
+            self.connection.executemany(
+                "INSERT INTO outcomes (wall_hash, permutation, models, win_type, winner, loser, han, fu) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return True
+
+    def get_result_counts(self, wall_hash: str) -> dict[ResultKey, int]:
+        result_counts: dict[ResultKey, int] = {}
+        for win_type, winner, loser, count in self.connection.execute(
+                "SELECT win_type, winner, loser, COUNT(*) FROM outcomes WHERE wall_hash = ? "
+                "GROUP BY win_type, winner, loser", (wall_hash,)):
+            result_counts[(win_type, winner, loser)] = count
+        return result_counts
+
+    def get_shuffled_tiles(self, wall_hash: str) -> list[str]:
+        row = self.connection.execute("SELECT shuffled_tiles FROM walls WHERE wall_hash = ?", (wall_hash,)).fetchone()
+        assert row is not None, f"Unknown wall {wall_hash}"
+        return row[0].split(" ")
+
+    def get_shuffled_tiles_map(self, wall_hashes: list[str], chunk_size: int = 500) -> dict[str, list[str]]:
+        # wall hash -> shuffled tiles, one query per chunk of hashes
+        result: dict[str, list[str]] = {}
+        for start in range(0, len(wall_hashes), chunk_size):
+            chunk = wall_hashes[start:start + chunk_size]
+            for wall_hash, shuffled_tiles in self.connection.execute(
+                    "SELECT wall_hash, shuffled_tiles FROM walls WHERE wall_hash IN (%s)" % ",".join("?" * len(chunk)),
+                    chunk):
+                result[wall_hash] = shuffled_tiles.split(" ")
+        return result
+
+    def iter_walls(self, min_unique_outcomes: int = 0) -> Iterator[tuple[str, Optional[str], int]]:
+        # (wall hash, picture path, unique outcomes count), uses the unique_outcomes index
+        yield from self.connection.execute(
+            "SELECT wall_hash, picture_path, unique_outcomes FROM walls WHERE unique_outcomes >= ? "
+            "ORDER BY wall_hash", (min_unique_outcomes,))
+
+    def iter_result_counts(self, min_unique_outcomes: int = 0) -> Iterator[tuple[str, Optional[str], dict[ResultKey, int]]]:
+        # (wall hash, picture path, result counts) of all walls with enough unique outcomes, in one query
+        rows = self.connection.execute(
+            "SELECT w.wall_hash, w.picture_path, o.win_type, o.winner, o.loser, COUNT(*) "
+            "FROM walls w JOIN outcomes o ON o.wall_hash = w.wall_hash "
+            "WHERE w.unique_outcomes >= ? "
+            "GROUP BY w.wall_hash, o.win_type, o.winner, o.loser "
+            "ORDER BY w.wall_hash", (min_unique_outcomes,))
+        for (wall_hash, picture_path), wall_rows in itertools.groupby(rows, key=lambda row: (row[0], row[1])):
+            yield wall_hash, picture_path, {(row[2], row[3], row[4]): row[5] for row in wall_rows}
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
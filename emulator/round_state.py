@@ -0,0 +1,77 @@
+from typing import Optional
+
+from mortal.mortal_helpers import MortalEvent
+
+KAN_TYPES = {"ankan", "kakan", "daiminkan"}
+
+
+class RoundState:
+    # Facts about the latest events that the emulator needs on every step,
+    # updated on each appended event so that the event log is never rescanned
+    def __init__(self, dealer_id: int):
+        self.dealer_id = dealer_id
+        # the last kan, riichi or discard decides who takes the next tile
+        self.last_action_type: Optional[str] = None
+        self.last_action_player_id: Optional[int] = None
+        self.last_tsumo_tile: Optional[str] = None
+        self.last_ron_tile: Optional[str] = None  # last discarded or kakan tile
+        # riichi is accepted when its discard is the last event
+        self.riichi_player_id: Optional[int] = None
+        self.riichi_discarded: bool = False
+        # open kan reveals a new dora after the discard that follows its replacement tile
+        self.open_kan_player_id: Optional[int] = None
+        self.open_kan_tile_drawn: bool = False
+        self.kan_dora_pending: bool = False
+
+    def update(self, event: MortalEvent):
+        event_type = event["type"]
+        if event_type in KAN_TYPES or event_type in {"reach", "dahai"}:
+            self.last_action_type = event_type
+            self.last_action_player_id = event["actor"]
+        if event_type == "tsumo":
+            self.last_tsumo_tile = event["pai"]
+        elif event_type in {"dahai", "kakan"}:
+            self.last_ron_tile = event["pai"]
+
+        if event_type == "reach":
+            self.riichi_player_id = event["actor"]
+            self.riichi_discarded = False
+        elif event_type == "dahai" and self.riichi_player_id == event["actor"] and not self.riichi_discarded:
+            self.riichi_discarded = True
+        else:
+            self.riichi_player_id = None
+            self.riichi_discarded = False
+
+        self.kan_dora_pending = False
+        if event_type in {"daiminkan", "kakan"}:
+            self.open_kan_player_id = event["actor"]
+            self.open_kan_tile_drawn = False
+        elif event_type == "tsumo" and self.open_kan_player_id == event["actor"] and not self.open_kan_tile_drawn:
+            self.open_kan_tile_drawn = True
+        else:
+            if event_type == "dahai":
+                self.kan_dora_pending = self.open_kan_player_id == event["actor"] and self.open_kan_tile_drawn
+            self.open_kan_player_id = None
+            self.open_kan_tile_drawn = False
+
+    def get_pending_kan(self) -> Optional[tuple[int, str]]:
+        # (player id, kan type) when the player has to draw a replacement tile
+        if self.last_action_type in KAN_TYPES:
+            return self.last_action_player_id, self.last_action_type
+        return None
+
+    def get_next_player_id(self) -> int:
+        if self.last_action_player_id is None:
+            return self.dealer_id  # first turn only
+        return (self.last_action_player_id + 1) % 4
+
+    def get_accepted_riichi_player_id(self) -> Optional[int]:
+        if self.riichi_player_id is not None and self.riichi_discarded:
+            return self.riichi_player_id
+        return None
+
+    def get_win_tile(self, is_tsumo: bool) -> str:
+        win_tile = self.last_tsumo_tile if is_tsumo else self.last_ron_tile
+        if win_tile is None:
+            raise Exception("Can't find win tile")
+        return win_tile
@@ -0,0 +1,172 @@
+import itertools
+import logging
+import os
+import signal
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, Optional
+
+import torch
+
+from emulator.emulator import SingleRoundEmulator
+from emulator.hand_analyser import HandAnalyser
+from emulator.results_store import ResultKey, get_result_keys
+from emulator.wall import DuplicateWall, Wall
+from mortal import model_registry
+from mortal.model_registry import EngineSource
+
+PERMUTATIONS: list[tuple[int, ...]] = list(itertools.permutations(range(4)))
+
+PTH_FILES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "mortal/mortal_lib/pth")
+PTH_FILES = [
+    os.path.join(PTH_FILES_DIR, "bot_20240110_best_94dd_64e8.pth"),
+    os.path.join(PTH_FILES_DIR, "bot_20240110_mortal_1280_872a.pth"),
+    os.path.join(PTH_FILES_DIR, "bot_20240308_best_0a88_6563.pth"),
+    os.path.join(PTH_FILES_DIR, "bot_20240308_mortal_baad_d6a2.pth"),
+]
+
+
+def create_emulator(wall: Wall, player_pth_files: list[str], registry: Optional[EngineSource] = None,
+                    analyse_hands: bool = False, seat_executor: Optional[Executor] = None) -> SingleRoundEmulator:
+    return SingleRoundEmulator(
+        round_wind="E",
+        round_id=1,
+        honba=0,
+        riichi_sticks=0,
+        dealer_id=0,
+        scores=[25000] * 4,
+        wall=wall,
+        player_pth_files=player_pth_files,
+        registry=registry,
+        analyser=HandAnalyser() if analyse_hands else None,
+        seat_executor=seat_executor,
+    )
+
+
+def add_emulation_result(result_counts: dict[ResultKey, int], emulation_result: dict[str, Any]):
+    for result_key in get_result_keys(emulation_result=emulation_result):
+        result_counts[result_key] += 1
+
+
+def log_result_counts(result_counts: dict[ResultKey, int], duplicate_wall_file_path: Optional[str],
+                      wall_hash: Optional[str] = None):
+    logging.info("")
+    logging.info("================================================================================")
+    if duplicate_wall_file_path is not None:
+        logging.info("Duplicate wall picture path: %s", duplicate_wall_file_path)
+    if wall_hash is not None:
+        logging.info("Wall hash: %s", wall_hash)
+    logging.info("Round result counts:")
+    for result, count in sorted(result_counts.items(), key=lambda t: (t[1], t[0]), reverse=True):
+        logging.info("%s -> %d", result, count)
+
+
+def log_progress(emulation_results: list[dict[str, Any]]):
+    # hand progress is only present when hands are analysed
+    progress = [emulation_result["progress"] for emulation_result in emulation_results
+                if "progress" in emulation_result]
+    if len(progress) == 0:
+        return
+    logging.info("Tenpai by seat:")
+    for seat in "ESWN":
+        tenpai_turns = [p[seat]["tenpai_turn"] for p in progress if p[seat]["tenpai_turn"] is not None]
+        if len(tenpai_turns) == 0:
+            logging.info("%s -> 0 / %d rounds", seat, len(progress))
+        else:
+            logging.info("%s -> %d / %d rounds, mean turn %.1f", seat, len(tenpai_turns), len(progress),
+                         sum(tenpai_turns) / len(tenpai_turns))
+
+
+def process_concurrently(emulators: list[SingleRoundEmulator], max_workers: Optional[int] = None) -> list[dict[str, Any]]:
+    # one thread per table, so that an InferenceBroker can batch decisions of different tables
+    if max_workers is None:
+        max_workers = len(emulators)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda emulator: emulator.process(), emulators))
+
+
+def init_worker(pth_files: list[str], torch_threads: int):
+    # stopping is decided by the parent process, it shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    torch.set_num_threads(torch_threads)
+    for pth_file in pth_files:
+        model_registry.REGISTRY.get_engine(pth_file=pth_file)
+    logging.debug("Worker %d loaded %d models, %d torch threads", os.getpid(), len(pth_files), torch_threads)
+
+
+def emulate_permutation(shuffled_tiles: list[str], player_pth_files: list[str],
+                        analyse_hands: bool = False) -> dict[str, Any]:
+    emulator = create_emulator(wall=DuplicateWall(shuffled_tiles=shuffled_tiles), player_pth_files=player_pth_files,
+                               analyse_hands=analyse_hands)
+    return emulator.process()
+
+
+class WallRunner(ABC):
+    # Emulates all permutations of walls, several walls at a time; subclasses decide where the rounds run
+    def __init__(self, max_pending_walls: int):
+        self.max_pending_walls = max_pending_walls
+
+    @abstractmethod
+    def submit_wall(self, shuffled_tiles: list[str]) -> list[Future]:
+        # futures of emulation results in PERMUTATIONS order
+        pass
+
+    def run_walls(self, walls: Iterable[list[str]]) -> Iterator[tuple[list[str], list[dict[str, Any]]]]:
+        # yields (shuffled tiles, emulation results in PERMUTATIONS order) in the order of walls
+        pending: deque[tuple[list[str], list[Future]]] = deque()
+        for shuffled_tiles in walls:
+            pending.append((shuffled_tiles, self.submit_wall(shuffled_tiles=shuffled_tiles)))
+            while len(pending) > self.max_pending_walls:
+                shuffled_tiles, futures = pending.popleft()
+                yield shuffled_tiles, [future.result() for future in futures]
+        while len(pending) > 0:
+            shuffled_tiles, futures = pending.popleft()
+            yield shuffled_tiles, [future.result() for future in futures]
+
+    def run_wall(self, shuffled_tiles: list[str]) -> list[dict[str, Any]]:
+        return [future.result() for future in self.submit_wall(shuffled_tiles=shuffled_tiles)]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PermutationRunner(WallRunner):
+    # Spreads permutations of duplicate walls over worker processes, each worker loads every model once
+    def __init__(self, pth_files: list[str], workers: Optional[int] = None, torch_threads: Optional[int] = None,
+                 analyse_hands: bool = False):
+        assert len(pth_files) == 4
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if torch_threads is None:
+            torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        super().__init__(max_pending_walls=workers // len(PERMUTATIONS) + 2)
+        self.pth_files = pth_files
+        self.workers = workers
+        self.analyse_hands = analyse_hands
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(pth_files, torch_threads),
+        )
+
+    def submit_wall(self, shuffled_tiles: list[str]) -> list[Future]:
+        futures = []
+        for p in PERMUTATIONS:
+            futures.append(self.executor.submit(
+                emulate_permutation,
+                shuffled_tiles,
+                [self.pth_files[p[0]], self.pth_files[p[1]], self.pth_files[p[2]], self.pth_files[p[3]]],
+                self.analyse_hands,
+            ))
+        return futures
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
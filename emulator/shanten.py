@@ -0,0 +1,281 @@
+import threading
+from itertools import combinations_with_replacement
+from typing import Optional
+
+import numpy as np
+
+from emulator.tiles import TILE_34, Tile
+
+# Shanten is computed from suit tables (Tomohxx's method): for every count vector of one suit, the table keeps
+# the number of tiles missing to k complete melds (k = 0..4), without a pair (column k) and with a pair
+# (column 5 + k). A hand is then combined from its four suits with a min-plus convolution.
+# Suit tables have 5^9 rows, honor tables have 5^7 rows; a row index is the count vector in base 5.
+
+SUITS = [(0, 9), (9, 18), (18, 27), (27, 34)]  # 34-space slices of man, pin, sou and honors
+INF = 100  # larger than any distance
+
+SUIT_POWERS: list[int] = [5 ** (8 - i) for i in range(9)]
+HONOR_POWERS: list[int] = [5 ** (6 - i) for i in range(7)]
+TERMINALS_34: list[int] = [0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33]
+IS_TERMINAL_34: list[bool] = [tile in TERMINALS_34 for tile in range(34)]
+
+
+def build_table(size: int, has_chi: bool) -> np.ndarray:
+    # For every subset s of a complete shape, |s| tiles of the shape are already in any hand h >= s,
+    # so the missing tiles are 3k + 2p - max{|s| : s <= h, s is a part of a complete shape}.
+    # Parts are the down-closure of complete shapes and the max over s <= h is a cumulative max along every axis.
+    melds = []
+    for i in range(size):
+        melds.append([i, i, i])
+    if has_chi:
+        for i in range(size - 2):
+            melds.append([i, i + 1, i + 2])
+    shape = (5,) * size
+    tile_sums = np.indices(shape).sum(axis=0).astype(np.int8)
+    table = np.empty((5 ** size, 10), dtype=np.int8)
+    for k in range(5):
+        for p in range(2):
+            parts = np.zeros(shape, dtype=bool)
+            for meld_combination in combinations_with_replacement(range(len(melds)), k):
+                counts = [0] * size
+                for meld in meld_combination:
+                    for tile in melds[meld]:
+                        counts[tile] += 1
+                for pair in (range(size) if p == 1 else [None]):
+                    if pair is not None:
+                        counts[pair] += 2
+                    if max(counts) <= 4:
+                        parts[tuple(counts)] = True
+                    if pair is not None:
+                        counts[pair] -= 2
+            for axis in range(size):
+                parts = np.flip(np.logical_or.accumulate(np.flip(parts, axis=axis), axis=axis), axis=axis)
+            best = np.where(parts, tile_sums, -1).astype(np.int8)
+            for axis in range(size):
+                best = np.maximum.accumulate(best, axis=axis)
+            table[:, 5 * p + k] = 3 * k + 2 * p - best.reshape(-1)  # the empty part is always there
+    return table
+
+
+class ShantenTables:
+    def __init__(self):
+        self.suit_table = build_table(size=9, has_chi=True)
+        self.honor_table = build_table(size=7, has_chi=False)
+
+
+SHANTEN_TABLES: Optional[ShantenTables] = None
+SHANTEN_TABLES_LOCK = threading.Lock()
+
+
+def get_shanten_tables() -> ShantenTables:
+    global SHANTEN_TABLES
+    with SHANTEN_TABLES_LOCK:
+        if SHANTEN_TABLES is None:
+            SHANTEN_TABLES = ShantenTables()
+        return SHANTEN_TABLES
+
+
+def get_counts_34(tiles: list[Tile]) -> list[int]:
+    result = [0] * 34
+    for tile in tiles:
+        result[TILE_34[tile]] += 1
+    return result
+
+
+def get_table_rows(tables: ShantenTables, counts_34: list[int]) -> list[np.ndarray]:
+    rows = []
+    for start, end in SUITS:
+        if end - start == 9:
+            index = sum(count * power for count, power in zip(counts_34[start:end], SUIT_POWERS))
+            rows.append(tables.suit_table[index])
+        else:
+            index = sum(count * power for count, power in zip(counts_34[start:end], HONOR_POWERS))
+            rows.append(tables.honor_table[index])
+    return rows
+
+
+def get_combine_indices() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # column pairs (of a, of b) for every column of the min-plus convolution, at most one of them has the pair
+    a_columns, b_columns, starts = [], [], []
+    for p in range(2):
+        for k in range(5):
+            starts.append(len(a_columns))
+            for k1 in range(k + 1):
+                for p1 in range(p + 1):
+                    a_columns.append(5 * p1 + k1)
+                    b_columns.append(5 * (p - p1) + k - k1)
+    return np.array(a_columns), np.array(b_columns), np.array(starts)
+
+
+COMBINE_A_COLUMNS, COMBINE_B_COLUMNS, COMBINE_STARTS = get_combine_indices()
+# column pairs of the column with the pair and the given number of melds
+DISTANCE_COLUMNS: list[tuple[np.ndarray, np.ndarray]] = [
+    (COMBINE_A_COLUMNS[COMBINE_STARTS[5 + melds]:COMBINE_STARTS[5 + melds] + 2 * (melds + 1)],
+     COMBINE_B_COLUMNS[COMBINE_STARTS[5 + melds]:COMBINE_STARTS[5 + melds] + 2 * (melds + 1)])
+    for melds in range(5)
+]
+
+
+def combine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # min-plus convolution of table rows, [10] for one hand or [N, 10] for a batch of hands
+    return np.minimum.reduceat(a[..., COMBINE_A_COLUMNS] + b[..., COMBINE_B_COLUMNS], COMBINE_STARTS, axis=-1)
+
+
+def get_regular_distance(a: np.ndarray, b: np.ndarray, melds: int) -> np.ndarray:
+    # tiles missing to the given number of melds and a pair, combined from two rows
+    a_columns, b_columns = DISTANCE_COLUMNS[melds]
+    return (a[..., a_columns] + b[..., b_columns]).min(axis=-1)
+
+
+def get_chiitoi_distance(pairs, kinds, maximum=max):
+    # 6 - pairs + max(0, 7 - kinds) is the shanten
+    return 7 - pairs + maximum(7 - kinds, 0)
+
+
+def get_kokushi_distance(terminal_kinds, has_terminal_pair):
+    # 13 - kinds - pair is the shanten
+    return 14 - terminal_kinds - has_terminal_pair
+
+
+def get_special_counts(counts_34: list[int]) -> tuple[int, int, int, int]:
+    # pairs, kinds, terminal and honor kinds, whether there is a terminal or honor pair
+    pairs = sum(1 for count in counts_34 if count >= 2)
+    kinds = sum(1 for count in counts_34 if count >= 1)
+    terminal_kinds = sum(1 for tile in TERMINALS_34 if counts_34[tile] >= 1)
+    has_terminal_pair = int(any(counts_34[tile] >= 2 for tile in TERMINALS_34))
+    return pairs, kinds, terminal_kinds, has_terminal_pair
+
+
+def calculate_distance(counts_34: list[int], open_melds: int = 0) -> int:
+    # shanten is the distance minus one, -1 for a complete hand
+    rows = get_table_rows(tables=get_shanten_tables(), counts_34=counts_34)
+    result = int(get_regular_distance(a=combine_rows(rows[0], rows[1]), b=combine_rows(rows[2], rows[3]),
+                                      melds=4 - open_melds))
+    if open_melds == 0:
+        pairs, kinds, terminal_kinds, has_terminal_pair = get_special_counts(counts_34=counts_34)
+        result = min(result, get_chiitoi_distance(pairs=pairs, kinds=kinds),
+                     get_kokushi_distance(terminal_kinds=terminal_kinds, has_terminal_pair=has_terminal_pair))
+    return result
+
+
+def calculate_shanten(counts_34: list[int], open_melds: int = 0) -> int:
+    return calculate_distance(counts_34=counts_34, open_melds=open_melds) - 1
+
+
+def get_suits_without(rows: list[np.ndarray]) -> list[np.ndarray]:
+    # for every suit, the other three suits combined; a drawn tile changes only its own suit
+    suits_01 = combine_rows(rows[0], rows[1])
+    suits_23 = combine_rows(rows[2], rows[3])
+    return [combine_rows(rows[1], suits_23), combine_rows(rows[0], suits_23),
+            combine_rows(suits_01, rows[3]), combine_rows(suits_01, rows[2])]
+
+
+def calculate_ukeire(counts_34: list[int], open_melds: int = 0,
+                     visible_34: Optional[list[int]] = None) -> tuple[int, int]:
+    # Shanten and ukeire of a hand with 3n + 1 closed tiles: the number of unseen tiles that lower the shanten.
+    # Tiles seen elsewhere (discards, melds, dora markers) can be given in visible_34.
+    tables = get_shanten_tables()
+    rows = get_table_rows(tables=tables, counts_34=counts_34)
+    suits_without = get_suits_without(rows=rows)
+    melds = 4 - open_melds
+    distance = int(get_regular_distance(a=suits_without[0], b=rows[0], melds=melds))
+    # chiitoi and kokushi distances after drawing a tile that the hand has 0, 1 or more copies of
+    special_distances = [INF] * 3
+    terminal_special_distances = [INF] * 3
+    if open_melds == 0:
+        pairs, kinds, terminal_kinds, has_terminal_pair = get_special_counts(counts_34=counts_34)
+        distance = min(distance, get_chiitoi_distance(pairs=pairs, kinds=kinds),
+                       get_kokushi_distance(terminal_kinds=terminal_kinds, has_terminal_pair=has_terminal_pair))
+        special_distances = [get_chiitoi_distance(pairs=pairs, kinds=kinds + 1),
+                             get_chiitoi_distance(pairs=pairs + 1, kinds=kinds),
+                             get_chiitoi_distance(pairs=pairs, kinds=kinds)]
+        terminal_special_distances = [
+            min(special_distances[0], get_kokushi_distance(terminal_kinds=terminal_kinds + 1,
+                                                           has_terminal_pair=has_terminal_pair)),
+            min(special_distances[1], get_kokushi_distance(terminal_kinds=terminal_kinds, has_terminal_pair=1)),
+            min(special_distances[2], get_kokushi_distance(terminal_kinds=terminal_kinds,
+                                                           has_terminal_pair=has_terminal_pair)),
+        ]
+
+    ukeire = 0
+    for suit, (start, end) in enumerate(SUITS):
+        table = tables.suit_table if end - start == 9 else tables.honor_table
+        powers = SUIT_POWERS if end - start == 9 else HONOR_POWERS
+        counts = counts_34[start:end]
+        index = sum(count * power for count, power in zip(counts, powers))
+        # rows of the suit with every tile drawn, a tile that has all 4 copies in the hand keeps the row
+        new_rows = table[[index + power if count < 4 else index for count, power in zip(counts, powers)]]
+        new_distances = get_regular_distance(a=suits_without[suit], b=new_rows, melds=melds).tolist()
+        for i, count in enumerate(counts):
+            tile = start + i
+            if count == 4:
+                continue
+            special_distances_of_tile = terminal_special_distances if IS_TERMINAL_34[tile] else special_distances
+            if min(new_distances[i], special_distances_of_tile[min(count, 2)]) < distance:
+                ukeire += max(4 - count - (0 if visible_34 is None else visible_34[tile]), 0)
+    return distance - 1, ukeire
+
+
+def get_batch_rows(tables: ShantenTables, counts_34: np.ndarray) -> list[np.ndarray]:
+    # for every suit, the [N, 10] table rows of all hands
+    rows = []
+    for start, end in SUITS:
+        if end - start == 9:
+            rows.append(tables.suit_table[counts_34[:, start:end] @ np.array(SUIT_POWERS, dtype=np.int64)])
+        else:
+            rows.append(tables.honor_table[counts_34[:, start:end] @ np.array(HONOR_POWERS, dtype=np.int64)])
+    return rows
+
+
+def get_batch_special_distance(counts_34: np.ndarray) -> np.ndarray:
+    # chiitoi and kokushi, for closed hands only
+    pairs = (counts_34 >= 2).sum(axis=1)
+    kinds = (counts_34 >= 1).sum(axis=1)
+    terminal_counts = counts_34[:, TERMINALS_34]
+    terminal_kinds = (terminal_counts >= 1).sum(axis=1)
+    has_terminal_pair = (terminal_counts >= 2).any(axis=1).astype(np.int64)
+    return np.minimum(get_chiitoi_distance(pairs=pairs, kinds=kinds, maximum=np.maximum),
+                      get_kokushi_distance(terminal_kinds=terminal_kinds, has_terminal_pair=has_terminal_pair))
+
+
+def calculate_shanten_batch(counts_34: np.ndarray, open_melds: int = 0) -> np.ndarray:
+    # counts_34 is an [N, 34] array of hands with the same number of open melds
+    counts_34 = counts_34.astype(np.int64)
+    rows = get_batch_rows(tables=get_shanten_tables(), counts_34=counts_34)
+    result = get_regular_distance(a=combine_rows(rows[0], rows[1]), b=combine_rows(rows[2], rows[3]),
+                                  melds=4 - open_melds).astype(np.int64)
+    if open_melds == 0:
+        result = np.minimum(result, get_batch_special_distance(counts_34=counts_34))
+    return result - 1
+
+
+def calculate_ukeire_batch(counts_34: np.ndarray, open_melds: int = 0,
+                           visible_34: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+    # calculate_ukeire for an [N, 34] array of hands with the same number of open melds
+    counts_34 = counts_34.astype(np.int64)  # a copy, drawn tiles are added to it in place
+    tables = get_shanten_tables()
+    rows = get_batch_rows(tables=tables, counts_34=counts_34)
+    suits_without = get_suits_without(rows=rows)
+    melds = 4 - open_melds
+    closed = open_melds == 0
+    distance = get_regular_distance(a=suits_without[0], b=rows[0], melds=melds).astype(np.int64)
+    if closed:
+        distance = np.minimum(distance, get_batch_special_distance(counts_34=counts_34))
+    unseen_34 = 4 - counts_34 if visible_34 is None else 4 - counts_34 - visible_34
+    ukeire = np.zeros(len(counts_34), dtype=np.int64)
+    for suit, (start, end) in enumerate(SUITS):
+        table = tables.suit_table if end - start == 9 else tables.honor_table
+        powers = SUIT_POWERS if end - start == 9 else HONOR_POWERS
+        index = counts_34[:, start:end] @ np.array(powers, dtype=np.int64)
+        for i in range(end - start):
+            tile = start + i
+            drawable = counts_34[:, tile] < 4
+            new_row = table[index + powers[i] * drawable]
+            new_distance = get_regular_distance(a=suits_without[suit], b=new_row, melds=melds)
+            if closed:
+                counts_34[:, tile] += drawable
+                new_distance = np.minimum(new_distance, get_batch_special_distance(counts_34=counts_34))
+                counts_34[:, tile] -= drawable
+            effective = drawable & (new_distance < distance)
+            ukeire += np.where(effective, np.maximum(unseen_34[:, tile], 0), 0)
+    return distance - 1, ukeire
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from random import Random
+
+import pytest
+
+pytest.importorskip("mortal.mortal_lib.libriichi")
+
+from emulator import runner
+from emulator.async_runner import AsyncPermutationRunner, process_round
+from emulator.conftest import PTH_FILES, StubEngine, StubRegistry, emulate_separately
+from emulator.wall import DuplicateWall, get_all_tiles
+
+
+def get_walls(count: int) -> list[list[str]]:
+    walls = []
+    for seed in range(count):
+        shuffled_tiles = get_all_tiles()
+        Random(seed).shuffle(shuffled_tiles)
+        walls.append(shuffled_tiles)
+    return walls
+
+
+class BlockingEngine(StubEngine):
+    # every decision waits until the test releases it
+    def __init__(self, name: str, started: threading.Event, released: threading.Event):
+        super().__init__(name=name)
+        self.started = started
+        self.released = released
+
+    def react_batch(self, obs, masks, invisible_obs, with_meta=True):
+        self.started.set()
+        self.released.wait()
+        return super().react_batch(obs, masks, invisible_obs, with_meta=with_meta)
+
+
+class BlockingRegistry(StubRegistry):
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def get_engine(self, pth_file: str) -> BlockingEngine:
+        with self.lock:
+            if pth_file not in self.engines:
+                self.engines[pth_file] = BlockingEngine(name=pth_file, started=self.started, released=self.released)
+            return self.engines[pth_file]
+
+
+def test_run_walls_in_order(stub_bots):
+    walls = get_walls(count=3)
+    with AsyncPermutationRunner(pth_files=PTH_FILES, max_rounds=48, threads=48, max_wait=0,
+                                registry=StubRegistry()) as wall_runner:
+        wall_results = list(wall_runner.run_walls(walls=walls))
+    assert [shuffled_tiles for shuffled_tiles, _ in wall_results] == walls
+    for shuffled_tiles, emulation_results in wall_results:
+        assert emulation_results == emulate_separately(shuffled_tiles=shuffled_tiles, registry=StubRegistry())
+
+
+def test_max_rounds():
+    with pytest.raises(AssertionError):
+        AsyncPermutationRunner(pth_files=PTH_FILES, max_rounds=47, registry=StubRegistry())
+
+
+def test_close_cancels_rounds(stub_bots):
+    registry = BlockingRegistry()
+    wall_runner = AsyncPermutationRunner(pth_files=PTH_FILES, max_rounds=48, threads=4, registry=registry)
+    futures = wall_runner.submit_wall(shuffled_tiles=get_walls(count=1)[0])
+    assert registry.started.wait(timeout=10)
+    # bots waiting for their decisions are released only after close has cancelled the rounds
+    threading.Timer(0.2, registry.released.set).start()
+    wall_runner.close()
+    assert all(future.cancelled() for future in futures)
+
+
+def test_process_round_releases_bots(stub_bots):
+    shuffled_tiles = get_walls(count=1)[0]
+    registry = StubRegistry()
+    emulator = runner.create_emulator(wall=DuplicateWall(shuffled_tiles=shuffled_tiles), player_pth_files=PTH_FILES,
+                                      registry=registry)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result = asyncio.run(process_round(emulator=emulator, executor=executor))
+    assert emulator.players == []
+    expected = runner.create_emulator(wall=DuplicateWall(shuffled_tiles=shuffled_tiles), player_pth_files=PTH_FILES,
+                                      registry=registry).process()
+    assert result == expected
+
+
+def test_process_round_releases_bots_on_error(stub_bots):
+    emulator = runner.create_emulator(wall=DuplicateWall(shuffled_tiles=get_walls(count=1)[0]),
+                                      player_pth_files=PTH_FILES, registry=StubRegistry())
+    emulator.init_players()
+
+    def react(event_str: str):
+        raise ValueError("broken bot")
+
+    emulator.players[2].model.react = react
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        with pytest.raises(ValueError, match="broken bot"):
+            asyncio.run(process_round(emulator=emulator, executor=executor))
+    assert emulator.players == []
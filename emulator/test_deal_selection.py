@@ -0,0 +1,38 @@
+from collections import Counter
+from random import Random
+
+import pytest
+
+from emulator.deal_selection import DealSelector, min_outcomes_filter, outcomes_count_weight, \
+    weighted_sample_without_replacement
+
+DEAL_MAP = {f"wall_{i}.png": [f"outcome {j}" for j in range(i % 7)] for i in range(100)}
+
+
+def test_sample_is_reproducible():
+    deal_selector = DealSelector(deal_filter=min_outcomes_filter(min_count=3), deal_weight=outcomes_count_weight)
+    chosen_1 = deal_selector.choose(deals=DEAL_MAP.items(), count=12, r=Random("seed"))
+    chosen_2 = deal_selector.choose(deals=DEAL_MAP.items(), count=12, r=Random("seed"))
+    assert chosen_1 == chosen_2
+    assert len(set(chosen_1)) == 12
+    assert all(len(DEAL_MAP[filename]) >= 3 for filename in chosen_1)
+
+
+def test_not_enough_deals():
+    deal_selector = DealSelector(deal_filter=min_outcomes_filter(min_count=6), deal_weight=outcomes_count_weight)
+    with pytest.raises(AssertionError):
+        deal_selector.choose(deals=DEAL_MAP.items(), count=15, r=Random(0))
+
+
+def test_zero_weight_is_never_chosen():
+    items = [("a", 0.0), ("b", 1.0), ("c", 2.0)]
+    for seed in range(100):
+        assert sorted(weighted_sample_without_replacement(weighted_items=items, count=2, r=Random(seed))) == ["b", "c"]
+
+
+def test_first_choice_follows_weights():
+    items = [("a", 1.0), ("b", 3.0)]
+    r = Random(42)
+    first_choices = Counter(weighted_sample_without_replacement(weighted_items=items, count=1, r=r)[0]
+                            for _ in range(10000))
+    assert 0.72 < first_choices["b"] / 10000 < 0.78
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+from random import Random
+from typing import Any, Optional
+
+import pytest
+
+pytest.importorskip("mortal.mortal_lib.libriichi")
+
+from emulator import runner
+from emulator.conftest import PTH_FILES, StubRegistry
+from emulator.runner import PERMUTATIONS
+from emulator.wall import DuplicateWall, get_all_tiles
+
+
+def emulate(shuffled_tiles: list[str], p: tuple[int, ...],
+            seat_executor: Optional[ThreadPoolExecutor]) -> tuple[dict[str, Any], list[list[str]]]:
+    emulator = runner.create_emulator(
+        wall=DuplicateWall(shuffled_tiles=shuffled_tiles),
+        player_pth_files=[PTH_FILES[player] for player in p],
+        registry=StubRegistry(),
+        seat_executor=seat_executor,
+    )
+    result = emulator.process()
+    # every player sees the same events, so the decisions were the same
+    events = [emulator.events.get_player_json(player_id=player_id, start=0, end=len(emulator.events))
+              for player_id in range(4)]
+    return result, events
+
+
+def test_concurrent_seats(stub_bots):
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="seat") as seat_executor:
+        for seed in range(2):
+            shuffled_tiles = get_all_tiles()
+            Random(seed).shuffle(shuffled_tiles)
+            for p in PERMUTATIONS[::6]:
+                expected = emulate(shuffled_tiles=shuffled_tiles, p=p, seat_executor=None)
+                assert emulate(shuffled_tiles=shuffled_tiles, p=p, seat_executor=seat_executor) == expected
@@ -0,0 +1,33 @@
+import json
+
+import mortal.mortal_helpers as mortal_helpers
+from emulator.event_log import EventLog
+
+START_HANDS = [[tile] * 13 for tile in ["1m", "2p", "3s", "E"]]
+
+
+def test_hidden_tiles_are_masked():
+    event_log = EventLog()
+    event_log.append(mortal_helpers.start_hand(round_wind="E", dora_marker="1s", round_id=1, honba=0,
+                                               riichi_sticks=0, dealer_id=0, scores=[25000] * 4,
+                                               start_hands=START_HANDS))
+    event_log.append(mortal_helpers.draw_tile(player_id=0, tile="5mr"))
+    for player_id in range(4):
+        start_kyoku, tsumo = [json.loads(s) for s in event_log.get_player_json(player_id=player_id, start=0, end=2)]
+        for i in range(4):
+            assert start_kyoku["tehais"][i] == (START_HANDS[i] if i == player_id else ["?"] * 13)
+        assert tsumo["pai"] == ("5mr" if player_id == 0 else "?")
+    # the original events stay untouched
+    assert event_log[0]["tehais"] == START_HANDS
+    assert event_log[-1]["pai"] == "5mr"
+
+
+def test_copy_is_independent():
+    event_log = EventLog()
+    event_log.append(mortal_helpers.draw_tile(player_id=1, tile="E"))
+    event_log_copy = event_log.copy()
+    event_log_copy.append({"type": "dahai", "actor": 1, "pai": "E", "tsumogiri": True})
+    assert len(event_log) == 1
+    assert len(event_log_copy) == 2
+    assert event_log_copy.get_player_json(player_id=3, start=1, end=2) == \
+        ['{"type":"dahai","actor":1,"pai":"E","tsumogiri":true}']
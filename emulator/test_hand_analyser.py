@@ -0,0 +1,56 @@
+from emulator.hand_analyser import HandAnalyser, analyse_rounds
+
+START_HANDS = [
+    "1m 2m 3m 4p 5p 6p 7s 8s 9s E E 2m 4m",
+    "1m 4m 7m 2p 5p 8p 3s 6s 9s E S W N",
+    "1p 1p 3p 3p 5pr 5p 7s 7s 9s 9s C C N",
+    "1s 2s 3s 4s 5s 6s 7s 8s 9s P P F N",
+]
+
+
+def get_round_events() -> list[dict]:
+    return [
+        {"type": "start_kyoku", "bakaze": "E", "dora_marker": "9p", "kyoku": 2, "honba": 0, "kyotaku": 0, "oya": 1,
+         "scores": [25000] * 4, "tehais": [hand.split() for hand in START_HANDS]},
+        {"type": "tsumo", "actor": 1, "pai": "1s"},
+        {"type": "dahai", "actor": 1, "pai": "1s", "tsumogiri": True},
+        {"type": "tsumo", "actor": 2, "pai": "N"},
+        {"type": "dahai", "actor": 2, "pai": "9s", "tsumogiri": False},
+        {"type": "tsumo", "actor": 3, "pai": "F"},
+        {"type": "dahai", "actor": 3, "pai": "N", "tsumogiri": False},
+        {"type": "tsumo", "actor": 0, "pai": "3m"},
+        {"type": "dahai", "actor": 0, "pai": "4m", "tsumogiri": False},
+        {"type": "tsumo", "actor": 1, "pai": "C"},
+        {"type": "dahai", "actor": 1, "pai": "C", "tsumogiri": True},
+        {"type": "pon", "actor": 2, "target": 1, "pai": "C", "consumed": ["C", "C"]},
+        {"type": "dahai", "actor": 2, "pai": "9s", "tsumogiri": False},
+    ]
+
+
+def test_progress():
+    analyser = HandAnalyser()
+    for event in get_round_events():
+        analyser.update(event)
+    summary = analyser.get_summary()
+    assert summary == analyse_rounds([get_round_events()])[0]
+
+    # the dealer is player 1, seats go from there
+    assert summary["E"]["shanten"] == [6, 6, 6]
+    assert summary["E"]["tenpai_turn"] is None
+    # chiitoi on N, then on 9s with one 9s discarded, then two shanten after the pon
+    assert summary["S"] == {"turns": [0, 2, 5], "shanten": [0, 0, 2], "ukeire": [3, 2, 17], "tenpai_turn": 0}
+    assert summary["W"] == {"turns": [0, 3], "shanten": [1, 0], "ukeire": [8, 4], "tenpai_turn": 3}
+    # kanchan on 3m, then 1m-4m with one 4m discarded
+    assert summary["N"] == {"turns": [0, 4], "shanten": [0, 0], "ukeire": [3, 6], "tenpai_turn": 0}
+
+
+def test_copy():
+    events = get_round_events()
+    analyser = HandAnalyser()
+    for event in events[:5]:
+        analyser.update(event)
+    fork = analyser.copy()
+    for event in events[5:]:
+        fork.update(event)
+    assert analyser.get_summary()["S"]["turns"] == [0, 2]
+    assert fork.get_summary()["S"]["turns"] == [0, 2, 5]
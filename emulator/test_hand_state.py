@@ -0,0 +1,28 @@
+from emulator.hand_state import HandState
+from emulator.tiles import to_names, to_tiles
+
+
+def create_hand_state(names: list[str]) -> HandState:
+    hand_state = HandState()
+    hand_state.add_tiles(to_tiles(names))
+    return hand_state
+
+
+def test_closed_tiles_are_sorted():
+    hand_state = create_hand_state(["C", "5mr", "1m", "5m", "E", "1m"])
+    hand_state.remove(to_tiles(["E"])[0])
+    assert to_names(hand_state.get_closed_tiles()) == ["1m", "1m", "5m", "5mr", "C"]
+    assert hand_state.size == 5
+
+
+def test_added_kan_upgrades_pon():
+    hand_state = create_hand_state(["5p", "5pr", "5p", "2s", "3s", "9m"])
+    called_5p, called_1s = to_tiles(["5p", "1s"])
+    hand_state.call(called_tile=called_1s, consumed=to_tiles(["2s", "3s"]))
+    hand_state.call(called_tile=called_5p, consumed=to_tiles(["5p", "5pr"]))
+    fork = hand_state.copy()
+    hand_state.declare_added_kan(tile=to_tiles(["5p"])[0])
+    assert [to_names(open_set) for open_set in hand_state.open_sets] == [["1s", "2s", "3s"], ["5p", "5p", "5p", "5pr"]]
+    assert to_names(hand_state.get_closed_tiles()) == ["9m"]
+    assert [to_names(open_set) for open_set in fork.open_sets] == [["1s", "2s", "3s"], ["5p", "5p", "5pr"]]
+    assert to_names(fork.get_closed_tiles()) == ["9m", "5p"]
@@ -0,0 +1,32 @@
+from random import Random
+
+import pytest
+
+pytest.importorskip("mortal.mortal_lib.libriichi")
+
+from emulator.conftest import PTH_FILES, StubRegistry, emulate_separately
+from emulator.prefix_evaluator import PrefixSharingEvaluator
+from emulator.wall import get_all_tiles
+from mortal import model_registry
+
+
+def test_same_results_as_separate_emulation(stub_bots):
+    wins = 0
+    for seed in range(3):
+        shuffled_tiles = get_all_tiles()
+        Random(seed).shuffle(shuffled_tiles)
+        expected = emulate_separately(shuffled_tiles=shuffled_tiles, registry=StubRegistry())
+        evaluator = PrefixSharingEvaluator(pth_files=PTH_FILES, registry=StubRegistry())
+        assert evaluator.evaluate(shuffled_tiles=shuffled_tiles) == expected
+        # models choose differently, so branches are forked and new bots replay the prefix
+        assert evaluator.forks > 0
+        wins += sum(result["result"] == "win" for result in expected)
+    assert wins > 0
+
+
+def test_default_registry():
+    # engines are shared with the process-wide registry, the decision cache is private
+    evaluator = PrefixSharingEvaluator(pth_files=PTH_FILES)
+    assert evaluator.registry.source is model_registry.REGISTRY
+    assert evaluator.decision_cache is not None
+    assert evaluator.decision_cache is not PrefixSharingEvaluator(pth_files=PTH_FILES).decision_cache
@@ -0,0 +1,68 @@
+import os
+
+from emulator.results_store import ResultsStore
+from emulator.wall import get_all_tiles
+
+PTH_FILES = ["a.pth", "b.pth", "c.pth", "d.pth"]
+PERMUTATIONS = [(0, 1, 2, 3), (1, 0, 2, 3), (0, 1, 3, 2)]
+EMULATION_RESULTS = [
+    {"result": "draw"},
+    {"result": "win", "wins": [{"win_type": "ron", "winner": "S", "han": 2, "fu": 30, "loser": "E"},
+                               {"win_type": "ron", "winner": "W", "han": 1, "fu": 40, "loser": "E"}]},
+    {"result": "win", "wins": [{"win_type": "tsumo", "winner": "E", "han": 3, "fu": 30}]},
+]
+
+
+def test_add_and_query_wall(tmp_path):
+    with ResultsStore(db_path=os.path.join(tmp_path, "results.sqlite")) as store:
+        assert not store.has_wall(wall_hash="abc")
+        assert store.add_wall(wall_hash="abc", shuffled_tiles=get_all_tiles(), picture_path="wall_pictures/abc.png",
+                              permutations=PERMUTATIONS, pth_files=PTH_FILES, emulation_results=EMULATION_RESULTS)
+        assert store.has_wall(wall_hash="abc")
+        assert store.get_shuffled_tiles(wall_hash="abc") == get_all_tiles()
+        assert store.get_result_counts(wall_hash="abc") == {
+            ("draw", None, None): 1,
+            ("ron", "S", "E"): 1,
+            ("ron", "W", "E"): 1,
+            ("tsumo", "E", None): 1,
+        }
+        assert list(store.iter_walls(min_unique_outcomes=4)) == [("abc", "wall_pictures/abc.png", 4)]
+        assert list(store.iter_walls(min_unique_outcomes=5)) == []
+
+        row = store.connection.execute(
+            "SELECT permutation, models, han, fu FROM outcomes WHERE winner = 'S'").fetchone()
+        assert row == ("1023", "b.pth,a.pth,c.pth,d.pth", 2, 30)
+
+
+def test_add_wall_twice(tmp_path):
+    with ResultsStore(db_path=os.path.join(tmp_path, "results.sqlite")) as store:
+        for expected in [True, False]:
+            assert store.add_wall(wall_hash="abc", shuffled_tiles=get_all_tiles(), picture_path=None,
+                                  permutations=PERMUTATIONS, pth_files=PTH_FILES,
+                                  emulation_results=EMULATION_RESULTS) == expected
+        assert sum(store.get_result_counts(wall_hash="abc").values()) == 4
+
+
+def test_iter_result_counts(tmp_path):
+    with ResultsStore(db_path=os.path.join(tmp_path, "results.sqlite")) as store:
+        store.add_wall(wall_hash="b", shuffled_tiles=get_all_tiles(), picture_path="b.png",
+                       permutations=PERMUTATIONS, pth_files=PTH_FILES, emulation_results=EMULATION_RESULTS)
+        store.add_wall(wall_hash="a", shuffled_tiles=get_all_tiles(), picture_path="a.png",
+                       permutations=PERMUTATIONS[:1], pth_files=PTH_FILES, emulation_results=EMULATION_RESULTS[:1])
+        assert list(store.iter_result_counts()) == [
+            ("a", "a.png", {("draw", None, None): 1}),
+            ("b", "b.png", store.get_result_counts(wall_hash="b")),
+        ]
+        assert [t[0] for t in store.iter_result_counts(min_unique_outcomes=2)] == ["b"]
+
+
+def test_get_shuffled_tiles_map(tmp_path):
+    with ResultsStore(db_path=os.path.join(tmp_path, "results.sqlite")) as store:
+        for wall_hash, shuffled_tiles in [("a", get_all_tiles()), ("b", get_all_tiles()[::-1]), ("c", get_all_tiles())]:
+            store.add_wall(wall_hash=wall_hash, shuffled_tiles=shuffled_tiles, picture_path=None,
+                           permutations=PERMUTATIONS[:1], pth_files=PTH_FILES, emulation_results=EMULATION_RESULTS[:1])
+        # unknown walls are left out, hashes are queried in chunks
+        assert store.get_shuffled_tiles_map(wall_hashes=["b", "x", "a"], chunk_size=2) == {
+            "a": get_all_tiles(),
+            "b": get_all_tiles()[::-1],
+        }
@@ -0,0 +1,47 @@
+from emulator.round_state import RoundState
+
+
+def create_round_state(events: list[dict]) -> RoundState:
+    round_state = RoundState(dealer_id=1)
+    for event in events:
+        round_state.update(event)
+    return round_state
+
+
+def test_first_draw_is_dealer():
+    round_state = create_round_state([{"type": "start_kyoku"}])
+    assert round_state.get_pending_kan() is None
+    assert round_state.get_next_player_id() == 1
+
+
+def test_riichi_is_accepted_after_discard():
+    events = [
+        {"type": "tsumo", "actor": 1, "pai": "3m"},
+        {"type": "reach", "actor": 1},
+    ]
+    assert create_round_state(events).get_accepted_riichi_player_id() is None
+    events.append({"type": "dahai", "actor": 1, "pai": "9p", "tsumogiri": False})
+    round_state = create_round_state(events)
+    assert round_state.get_accepted_riichi_player_id() == 1
+    assert round_state.get_next_player_id() == 2
+    assert round_state.get_win_tile(is_tsumo=False) == "9p"
+    assert round_state.get_win_tile(is_tsumo=True) == "3m"
+    events.append({"type": "reach_accepted", "actor": 1})
+    assert create_round_state(events).get_accepted_riichi_player_id() is None
+
+
+def test_open_kan_dora_after_discard():
+    events = [
+        {"type": "dahai", "actor": 0, "pai": "E", "tsumogiri": True},
+        {"type": "daiminkan", "actor": 2, "target": 0, "pai": "E", "consumed": ["E", "E", "E"]},
+    ]
+    assert create_round_state(events).get_pending_kan() == (2, "daiminkan")
+    events.append({"type": "tsumo", "actor": 2, "pai": "1s"})
+    assert not create_round_state(events).kan_dora_pending
+    events.append({"type": "dahai", "actor": 2, "pai": "1s", "tsumogiri": True})
+    round_state = create_round_state(events)
+    assert round_state.kan_dora_pending
+    assert round_state.get_pending_kan() is None
+    assert round_state.get_next_player_id() == 3
+    round_state.update({"type": "dora", "dora_marker": "5p"})
+    assert not round_state.kan_dora_pending
@@ -0,0 +1,28 @@
+import multiprocessing
+from random import Random
+
+import pytest
+
+pytest.importorskip("mortal.mortal_lib.libriichi")
+
+from emulator.conftest import PTH_FILES, StubRegistry, emulate_separately
+from emulator.runner import PermutationRunner
+from emulator.wall import get_all_tiles
+from mortal import model_registry
+
+
+# workers get the stubs by inheriting the patched modules
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="worker processes are not forked")
+def test_permutation_runner(stub_bots, monkeypatch):
+    monkeypatch.setattr(model_registry, "REGISTRY", StubRegistry())
+    walls = []
+    for seed in range(2):
+        shuffled_tiles = get_all_tiles()
+        Random(seed).shuffle(shuffled_tiles)
+        walls.append(shuffled_tiles)
+    with PermutationRunner(pth_files=PTH_FILES, workers=2, torch_threads=1) as permutation_runner:
+        wall_results = list(permutation_runner.run_walls(walls=walls))
+    assert [shuffled_tiles for shuffled_tiles, _ in wall_results] == walls
+    for shuffled_tiles, emulation_results in wall_results:
+        # results of all permutations come back in PERMUTATIONS order
+        assert emulation_results == emulate_separately(shuffled_tiles=shuffled_tiles, registry=StubRegistry())
@@ -0,0 +1,35 @@
+import numpy as np
+
+from emulator.shanten import calculate_shanten, calculate_shanten_batch, calculate_ukeire_batch, get_counts_34
+from emulator.tiles import to_tiles
+
+
+def get_hand_counts(names: str) -> list[int]:
+    return get_counts_34(to_tiles(names.split()))
+
+
+def test_shanten():
+    assert calculate_shanten(get_hand_counts("1m 2m 3m 4p 5p 6p 7s 8s 9s E E 2m 3m")) == 0
+    assert calculate_shanten(get_hand_counts("1m 2m 3m 4p 5p 6p 7s 8s 9s E E 2m 3m 4m")) == -1
+    assert calculate_shanten(get_hand_counts("1m 1m 3m 3m 5pr 5p 7p 7p 9s 9s C C N")) == 0  # chiitoi
+    assert calculate_shanten(get_hand_counts("1m 9m 1p 9p 1s 9s E S W N P F F")) == 0  # kokushi
+    assert calculate_shanten(get_hand_counts("1m 4m 7m 2p 5p 8p 3s 6s 9s E S W N")) == 6
+    # four 9m can not wait for a fifth one
+    assert calculate_shanten(get_hand_counts("3m 3m 3m 4m 5m 5m 6m 6m 7m 9m 9m 9m 9m")) == 1
+    # an open hand with one meld called
+    assert calculate_shanten(get_hand_counts("1m 2m 3m 4p 5p 6p E E 2m 3m"), open_melds=1) == 0
+
+
+def test_batch_and_ukeire():
+    hands = ["1m 2m 3m 4p 5p 6p 7s 8s 9s E E 2m 3m",
+             "1m 9m 1p 9p 1s 9s E S W N P F C",
+             "1m 4m 7m 2p 5p 8p 3s 6s 9s E S W N"]
+    counts_34 = np.array([get_hand_counts(hand) for hand in hands])
+    assert calculate_shanten_batch(counts_34).tolist() == [0, 0, 6]
+    shanten, ukeire = calculate_ukeire_batch(counts_34)
+    assert shanten.tolist() == [0, 0, 6]
+    assert ukeire[0] == 3 + 4  # 1m and 4m
+    assert ukeire[1] == 13 * 3  # any terminal or honor
+    visible_34 = np.zeros_like(counts_34)
+    visible_34[0, 3] = 4  # all 4m are seen
+    assert calculate_ukeire_batch(counts_34, visible_34=visible_34)[1][0] == 3
@@ -0,0 +1,27 @@
+from emulator.tiles import IS_RED, TILE_34, TILE_FROM_136, TILE_NAMES, TILES_136, to_names, to_tile, to_tiles
+from emulator.wall import DuplicateWall, get_all_tiles
+
+
+def test_tile_tables():
+    assert to_tile("1m") == 0
+    assert to_tile("5mr") == 5
+    assert to_tile("C") == 36
+    assert to_names(to_tiles(TILE_NAMES)) == TILE_NAMES
+    assert sum(len(tiles_136) for tiles_136 in TILES_136) == 136
+    assert TILES_136[to_tile("5mr")] == [16]
+    assert TILES_136[to_tile("5m")] == [17, 18, 19]
+    assert all(TILE_FROM_136[tile_136] == tile for tile, tiles_136 in enumerate(TILES_136) for tile_136 in tiles_136)
+    assert TILE_34[to_tile("5pr")] == TILE_34[to_tile("5p")] == 13
+    assert TILE_34[to_tile("C")] == 33
+    assert [name for name, is_red in zip(TILE_NAMES, IS_RED) if is_red] == ["5mr", "5pr", "5sr"]
+
+
+def test_duplicate_wall_layout():
+    shuffled_tiles = get_all_tiles()
+    wall = DuplicateWall(shuffled_tiles=shuffled_tiles)
+    assert to_names(wall.start_hands[1]) == shuffled_tiles[13:26]
+    assert to_names(wall.walls[3]) == shuffled_tiles[106:124]
+    assert to_names(wall.dead_wall) == shuffled_tiles[124:]
+    assert wall.get_dora_markers() == [to_tile(shuffled_tiles[133])]
+    assert wall.draw_tile(player_id=2) == to_tile(shuffled_tiles[88])
+    assert wall.shuffled_tiles == shuffled_tiles
@@ -0,0 +1,63 @@
+import copy
+import json
+import logging
+
+import pytest
+
+from emulator.tracing import JsonlSink, LoggingSink, RingBufferSink, Tracer
+
+
+def test_disabled_logging_sink():
+    logger = logging.getLogger("test_tracing")
+    logger.setLevel(logging.INFO)
+    tracer = Tracer(sinks=[LoggingSink(level=logging.DEBUG, logger=logger)])
+    assert not tracer.is_enabled()
+    logger.setLevel(logging.DEBUG)
+    assert tracer.is_enabled()
+
+
+def test_ring_buffer_keeps_last_records():
+    ring_buffer_sink = RingBufferSink(max_size=3)
+    tracer = Tracer(sinks=[ring_buffer_sink])
+    for i in range(5):
+        tracer.emit("draw", "Player %(player_id)d drew tile %(tile)s", player_id=i % 4, tile="1m")
+    assert [record["player_id"] for record in ring_buffer_sink.records] == [2, 3, 0]
+    assert all(record["kind"] == "draw" for record in ring_buffer_sink.records)
+
+
+def test_jsonl_sink(tmp_path):
+    file_path = str(tmp_path / "trace.jsonl")
+    tracer = Tracer(sinks=[JsonlSink(file_path=file_path)])
+    tracer.emit("dora", "New dora marker: %(dora_marker)s", dora_marker="5pr")
+    tracer.emit("riichi", "Declared riichi by player %(player_id)d (%(seat)s)", player_id=2, seat="W")
+    tracer.close()
+    with open(file_path) as f:
+        records = [json.loads(line) for line in f]
+    assert records == [
+        {"kind": "dora", "dora_marker": "5pr"},
+        {"kind": "riichi", "player_id": 2, "seat": "W"},
+    ]
+
+
+def test_emulator_records_are_snapshots():
+    pytest.importorskip("mortal.mortal_lib.libriichi")
+    from emulator import runner
+    from emulator.wall import DuplicateWall, get_all_tiles
+
+    ring_buffer_sink = RingBufferSink(max_size=1000)
+    emulator = runner.create_emulator(wall=DuplicateWall(shuffled_tiles=get_all_tiles()), player_pth_files=["a.pth"] * 4)
+    emulator.tracer = Tracer(sinks=[ring_buffer_sink])
+    emulator.start()
+    # scripted players: whoever draws a tile discards it
+    first_records = None
+    for _ in range(16):
+        actions = [{"type": "none"} for _ in range(4)]
+        last_event = emulator.events[-1]
+        if last_event["type"] == "tsumo":
+            actions[last_event["actor"]] = {"type": "dahai", "actor": last_event["actor"], "pai": last_event["pai"],
+                                            "tsumogiri": True}
+        emulator.step(actions=actions)
+        if first_records is None:
+            first_records = copy.deepcopy(list(ring_buffer_sink.records))
+    # hands change as the round goes on, records kept by sinks must not
+    assert list(ring_buffer_sink.records)[:len(first_records)] == first_records
@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+
+from emulator.tiles import to_names
+from emulator.wall import DuplicateWall, get_all_tiles
+from emulator.wall_corpus import ALL_TILES, WallCorpus, generate_walls
+
+
+def test_generate_and_find(tmp_path):
+    corpus = WallCorpus.generate(corpus_path=os.path.join(tmp_path, "corpus"), count=1000, seed=1, chunk_size=300)
+    assert len(corpus) == 1000
+    assert all(sorted(to_names(corpus[i])) == sorted(get_all_tiles()) for i in range(0, 1000, 97))
+    assert corpus.find(tiles=corpus[123]) == 123
+    assert corpus.find(tiles=ALL_TILES) is None
+    assert sum(len(corpus.get_shard(shard_id=i, shard_count=3)) for i in range(3)) == 1000
+
+    wall = corpus.create_duplicate_wall(i=5)
+    assert wall.shuffled_tiles == corpus.get_shuffled_tiles(i=5)
+    assert wall.get_wall_info() == DuplicateWall(shuffled_tiles=corpus.get_shuffled_tiles(i=5)).get_wall_info()
+
+
+def test_dedupe(tmp_path):
+    walls = generate_walls(count=10, rng=np.random.default_rng(2))
+    walls = np.concatenate([walls, walls[3:5], walls[:1]])
+    corpus = WallCorpus.create(corpus_path=os.path.join(tmp_path, "corpus"), walls=walls)
+    assert len(corpus) == 10
+    assert np.array_equal(corpus.walls, walls[:10])
@@ -0,0 +1,19 @@
+import numpy as np
+
+from emulator.tiles import to_names, to_tiles
+from emulator.wall import DuplicateWall, get_all_tiles
+from emulator.wall_filter import WallFilter, score_walls
+
+
+def test_score_walls():
+    # unshuffled tiles: East holds 1m-3m x4 and 4m, the dora marker is C and nobody has P
+    wall = DuplicateWall(shuffled_tiles=get_all_tiles())
+    assert to_names(wall.get_dora_markers()) == ["C"]
+    walls = np.array([to_tiles(get_all_tiles())], dtype=np.uint8)
+    scores = score_walls(walls=walls)
+    assert scores.shanten[0].tolist() == [0, 0, 0, 0]
+    assert scores.ukeire[0, 0] == 3 + 4  # 4m and 5m
+    assert scores.dora[0].tolist() == [1, 1, 1, 0]  # red fives only
+
+    assert WallFilter(max_shanten=0, min_contenders=4).accepts(shuffled_tiles=get_all_tiles())
+    assert not WallFilter(max_shanten=0, min_contenders=4, min_dora=4).accepts(shuffled_tiles=get_all_tiles())
@@ -0,0 +1,39 @@
+from emulator.tiles import to_tile, to_tiles
+from emulator.win_calc import WinCalculator
+
+PINFU_HAND = "2m 3m 4m 5m 6m 7p 8p 9p 2s 3s 4s 5s 5s".split()
+
+
+def create_win(is_tsumo: bool, closed_hand: list[str]) -> dict:
+    return {
+        "closed_hand": to_tiles(closed_hand),
+        "open_sets": [],
+        "closed_kans": [],
+        "win_tile": to_tile("7m"),
+        "dora_markers": to_tiles(["1m"]),
+        "ura_dora_markers": to_tiles(["N"]),
+        "player_wind": "S",
+        "round_wind": "E",
+        "is_riichi": True,
+        "is_tsumo": is_tsumo,
+        "riichi_sticks": 0,
+        "honba": 0,
+    }
+
+
+def test_riichi_pinfu_dora():
+    win_calculator = WinCalculator()
+    assert win_calculator.calculate(**create_win(is_tsumo=False, closed_hand=PINFU_HAND)) == (3, 30, 3900)
+    assert win_calculator.calculate(**create_win(is_tsumo=True, closed_hand=PINFU_HAND + ["7m"])) == (4, 20, 5200)
+
+
+def test_results_are_cached():
+    win_calculator = WinCalculator(max_size=1)
+    ron = create_win(is_tsumo=False, closed_hand=PINFU_HAND)
+    ron_shuffled = create_win(is_tsumo=False, closed_hand=list(reversed(PINFU_HAND)))
+    tsumo = create_win(is_tsumo=True, closed_hand=PINFU_HAND + ["7m"])
+    results = win_calculator.calculate_many([ron, ron_shuffled, tsumo, ron])
+    assert results == [(3, 30, 3900), (3, 30, 3900), (4, 20, 5200), (3, 30, 3900)]
+    assert win_calculator.hits == 1
+    assert win_calculator.misses == 3
+    assert len(win_calculator.results) == 1
@@ -0,0 +1,34 @@
+from mortal.mortal_helpers import TILES, convert_tile_to_mortal
+
+# Tiles inside the emulator are indices in TILES (0..36, red fives have their own index),
+# mjai names are used only in events that go to and come from bots
+Tile = int
+
+TILE_NAMES: list[str] = TILES
+TILE_IDS: dict[str, Tile] = {name: tile for tile, name in enumerate(TILE_NAMES)}
+TILE_COUNT = len(TILE_NAMES)
+
+TILE_FROM_136: list[Tile] = [TILE_IDS[convert_tile_to_mortal(tile_136=tile_136)] for tile_136 in range(136)]
+TILES_136: list[list[int]] = [[] for _ in range(TILE_COUNT)]  # 136-ids of every tile, in ascending order
+for _tile_136, _tile in enumerate(TILE_FROM_136):
+    TILES_136[_tile].append(_tile_136)
+
+IS_RED: list[bool] = [name.endswith("r") for name in TILE_NAMES]
+# index in the 34 tile space, red fives are plain fives there
+TILE_34: list[int] = [tile_136 // 4 for tile_136 in (tiles_136[0] for tiles_136 in TILES_136)]
+
+
+def to_tile(name: str) -> Tile:
+    return TILE_IDS[name]
+
+
+def to_name(tile: Tile) -> str:
+    return TILE_NAMES[tile]
+
+
+def to_tiles(names: list[str]) -> list[Tile]:
+    return [TILE_IDS[name] for name in names]
+
+
+def to_names(tiles: list[Tile]) -> list[str]:
+    return [TILE_NAMES[tile] for tile in tiles]
@@ -0,0 +1,84 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Optional
+
+TraceRecord = dict[str, Any]
+
+
+class TraceSink(ABC):
+    def is_enabled(self) -> bool:
+        return True
+
+    @abstractmethod
+    def write(self, kind: str, message: str, fields: dict[str, Any]):
+        pass
+
+    def close(self):
+        pass
+
+
+class LoggingSink(TraceSink):
+    # Human-readable log, the message is a %-format with named fields
+    def __init__(self, level: int = logging.DEBUG, logger: Optional[logging.Logger] = None):
+        self.level = level
+        self.logger = logger or logging.getLogger()
+
+    def is_enabled(self) -> bool:
+        return self.logger.isEnabledFor(self.level)
+
+    def write(self, kind: str, message: str, fields: dict[str, Any]):
+        self.logger.log(self.level, message, fields)
+
+
+class JsonlSink(TraceSink):
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.f = open(file_path, "a", encoding="utf-8")
+
+    def write(self, kind: str, message: str, fields: dict[str, Any]):
+        self.f.write(json.dumps({"kind": kind, **fields}, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+class RingBufferSink(TraceSink):
+    # Keeps the last records in memory, to look at what happened before a failure
+    def __init__(self, max_size: int = 1000):
+        self.records: deque[TraceRecord] = deque(maxlen=max_size)
+
+    def write(self, kind: str, message: str, fields: dict[str, Any]):
+        self.records.append({"kind": kind, **fields})
+
+    def dump(self, level: int = logging.ERROR):
+        for record in self.records:
+            logging.log(level, "%s", record)
+
+
+class Tracer:
+    # Callers check is_enabled() once per step and only then build records,
+    # so tracing costs a single call when all sinks are disabled
+    def __init__(self, sinks: Optional[list[TraceSink]] = None):
+        if sinks is None:
+            sinks = [LoggingSink()]
+        self.sinks = sinks
+
+    def is_enabled(self) -> bool:
+        for sink in self.sinks:
+            if sink.is_enabled():
+                return True
+        return False
+
+    def emit(self, kind: str, message: str, **fields: Any):
+        for sink in self.sinks:
+            if sink.is_enabled():
+                sink.write(kind=kind, message=message, fields=fields)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+TRACER = Tracer()
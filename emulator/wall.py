@@ -1,3 +1,6 @@
+from typing import Optional, Sequence
+
+from emulator.tiles import Tile, to_names, to_tiles
 from mortal.mortal_helpers import TILES
 
 
@@ -19,13 +22,13 @@ class Wall:
     def get_wall_info(self) -> str:
         raise NotImplemented()
 
-    def deal_start_hands(self) -> list[list[str]]:
+    def deal_start_hands(self) -> list[list[Tile]]:
         raise NotImplemented()
 
-    def get_dora_markers(self) -> list[str]:
+    def get_dora_markers(self) -> list[Tile]:
         raise NotImplemented()
 
-    def get_ura_dora_markers(self) -> list[str]:
+    def get_ura_dora_markers(self) -> list[Tile]:
         raise NotImplemented()
 
     def can_draw_tile(self, player_id: int) -> bool:
@@ -34,23 +37,31 @@ class Wall:
     def can_declare_kan(self, player_id: int) -> bool:
         raise NotImplemented()
 
-    def draw_tile(self, player_id: int) -> str:
+    def draw_tile(self, player_id: int) -> Tile:
         raise NotImplemented()
 
-    def draw_kan_tile(self, player_id: int) -> str:
+    def draw_kan_tile(self, player_id: int) -> Tile:
         raise NotImplemented()
 
 
+def get_wall_tiles(shuffled_tiles: Optional[list[str]], tiles: Optional[Sequence[Tile]]) -> list[Tile]:
+    # walls are given either by mjai names or by tiles, e.g. a row of a wall corpus
+    assert (shuffled_tiles is None) != (tiles is None)
+    if tiles is None:
+        return to_tiles(shuffled_tiles)
+    return [int(tile) for tile in tiles]
+
+
 class StandardWall(Wall):
-    def __init__(self, shuffled_tiles: list[str]):
-        self.wall = shuffled_tiles
+    def __init__(self, shuffled_tiles: Optional[list[str]] = None, tiles: Optional[Sequence[Tile]] = None):
+        self.wall = get_wall_tiles(shuffled_tiles=shuffled_tiles, tiles=tiles)
 
         self.kan_count: int = 0
         self.pointer: int = 0
 
     def get_wall_info(self) -> str:
         result = ""
-        for tile in self.wall:
+        for tile in to_names(self.wall):
             if tile[0].isdigit():
                 if tile.endswith("r"):
                     result += "0" + tile[1]
@@ -61,8 +72,8 @@ class StandardWall(Wall):
                 result += str(index) + "z"
         return result
 
-    def deal_start_hands(self) -> list[list[str]]:
-        result: list[list[str]] = []
+    def deal_start_hands(self) -> list[list[Tile]]:
+        result: list[list[Tile]] = []
         for player_id in range(4):
             result.append([])
         for deal_count in [4, 4, 4, 1]:
@@ -73,13 +84,13 @@ class StandardWall(Wall):
             assert len(result[player_id]) == 13
         return result
 
-    def get_dora_markers(self):
+    def get_dora_markers(self) -> list[Tile]:
         result = []
         for i in range(self.kan_count + 1):
             result.append(self.wall[len(self.wall) - 5 - 2 * i])
         return result
 
-    def get_ura_dora_markers(self):
+    def get_ura_dora_markers(self) -> list[Tile]:
         result = []
         for i in range(self.kan_count + 1):
             result.append(self.wall[len(self.wall) - 6 - 2 * i])
@@ -91,67 +102,55 @@ class StandardWall(Wall):
     def can_declare_kan(self, player_id: int) -> bool:
         return self.kan_count < 4 and self.can_draw_tile(player_id=player_id)
 
-    def draw_tile(self, player_id: int) -> str:
+    def draw_tile(self, player_id: int) -> Tile:
         result = self.wall[self.pointer]
         self.pointer += 1
         return result
 
-    def draw_kan_tile(self, player_id: int) -> str:
+    def draw_kan_tile(self, player_id: int) -> Tile:
         self.kan_count += 1
         return self.wall[len(self.wall) - self.kan_count]
 
 
 class DuplicateWall(Wall):
-    def __init__(self, shuffled_tiles: list[str]):
-        self.start_hands: list[list[str]] = []
-        self.walls: list[list[str]] = []
-        self.dead_wall: list[str] = []
+    def __init__(self, shuffled_tiles: Optional[list[str]] = None, tiles: Optional[Sequence[Tile]] = None):
+        all_tiles = get_wall_tiles(shuffled_tiles=shuffled_tiles, tiles=tiles)
+        assert len(all_tiles) == 136
+        self.tiles: Sequence[Tile] = all_tiles if tiles is None else tiles  # a corpus row is kept as is
+        # mjai names, the wall hash and the stored walls use them
+        self.shuffled_tiles: list[str] = shuffled_tiles.copy() if shuffled_tiles is not None else to_names(all_tiles)
+
+        self.start_hands: list[list[Tile]] = [all_tiles[13 * i:13 * (i + 1)] for i in range(4)]
+        self.walls: list[list[Tile]] = [all_tiles[52 + 18 * i:52 + 18 * (i + 1)] for i in range(4)]
+        self.dead_wall: list[Tile] = all_tiles[124:]
         self.pointers: list[int] = [0] * 4
         self.kan_count: int = 0
 
-        self.shuffled_tiles = shuffled_tiles.copy()
-        all_tiles = list(reversed(shuffled_tiles))
-
-        for player_id in range(4):
-            self.start_hands.append([])
-            for i in range(13):
-                self.start_hands[player_id].append(all_tiles.pop())
-
-        for player_id in range(4):
-            self.walls.append([])
-            for i in range(18):
-                self.walls[player_id].append(all_tiles.pop())
-
-        for i in range(12):
-            self.dead_wall.append(all_tiles.pop())
-
-        assert len(all_tiles) == 0
-
     def get_wall_info(self) -> str:
         result = "\n"
-        result += "East start hand: " + str(sorted(self.start_hands[0], key=lambda x: TILES.index(x))) + "\n"
-        result += "South start hand: " + str(sorted(self.start_hands[1], key=lambda x: TILES.index(x))) + "\n"
-        result += "West start hand: " + str(sorted(self.start_hands[2], key=lambda x: TILES.index(x))) + "\n"
-        result += "North start hand: " + str(sorted(self.start_hands[3], key=lambda x: TILES.index(x))) + "\n"
-        result += "East wall: " + str(self.walls[0]) + "\n"
-        result += "South wall: " + str(self.walls[1]) + "\n"
-        result += "West wall: " + str(self.walls[2]) + "\n"
-        result += "North wall: " + str(self.walls[3]) + "\n"
-        result += "Dora indicators: " + str(self.dead_wall[-3::-2]) + "\n"
-        result += "Ura dora indicators: " + str(self.dead_wall[-4::-2]) + "\n"
-        result += "Not used tiles:" + str(self.dead_wall[11:9:-1]) + "\n"
+        result += "East start hand: " + str(to_names(sorted(self.start_hands[0]))) + "\n"
+        result += "South start hand: " + str(to_names(sorted(self.start_hands[1]))) + "\n"
+        result += "West start hand: " + str(to_names(sorted(self.start_hands[2]))) + "\n"
+        result += "North start hand: " + str(to_names(sorted(self.start_hands[3]))) + "\n"
+        result += "East wall: " + str(to_names(self.walls[0])) + "\n"
+        result += "South wall: " + str(to_names(self.walls[1])) + "\n"
+        result += "West wall: " + str(to_names(self.walls[2])) + "\n"
+        result += "North wall: " + str(to_names(self.walls[3])) + "\n"
+        result += "Dora indicators: " + str(to_names(self.dead_wall[-3::-2])) + "\n"
+        result += "Ura dora indicators: " + str(to_names(self.dead_wall[-4::-2])) + "\n"
+        result += "Not used tiles:" + str(to_names(self.dead_wall[11:9:-1])) + "\n"
         return result
 
-    def deal_start_hands(self) -> list[list[str]]:
+    def deal_start_hands(self) -> list[list[Tile]]:
         return self.start_hands
 
-    def get_dora_markers(self) -> list[str]:
+    def get_dora_markers(self) -> list[Tile]:
         result = []
         for i in range(self.kan_count + 1):
             result.append(self.dead_wall[len(self.dead_wall) - 3 - 2 * i])
         return result
 
-    def get_ura_dora_markers(self) -> list[str]:
+    def get_ura_dora_markers(self) -> list[Tile]:
         result = []
         for i in range(self.kan_count + 1):
             result.append(self.dead_wall[len(self.dead_wall) - 4 - 2 * i])
@@ -163,11 +162,11 @@ class DuplicateWall(Wall):
     def can_declare_kan(self, player_id: int) -> bool:
         return self.kan_count < 4 and self.can_draw_tile(player_id=player_id)
 
-    def draw_tile(self, player_id: int) -> str:
+    def draw_tile(self, player_id: int) -> Tile:
         result = self.walls[player_id][self.pointers[player_id]]
         self.pointers[player_id] += 1
         return result
 
-    def draw_kan_tile(self, player_id: int) -> str:
+    def draw_kan_tile(self, player_id: int) -> Tile:
         self.kan_count += 1
         return self.draw_tile(player_id=player_id)
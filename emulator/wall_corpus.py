@@ -0,0 +1,144 @@
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+from emulator.tiles import to_names, to_tiles
+from emulator.wall import DuplicateWall, StandardWall, get_all_tiles
+
+# Walls are rows of uint8 tiles (indices in TILES, see emulator.tiles)
+WALL_SIZE = 136
+ALL_TILES: np.ndarray = np.array(to_tiles(get_all_tiles()), dtype=np.uint8)
+
+HASH_PRIME = np.uint64(0x100000001B3)
+HASH_OFFSET = np.uint64(0xCBF29CE484222325)
+
+
+def generate_walls(count: int, rng: np.random.Generator) -> np.ndarray:
+    # every row is an independent shuffle of all tiles
+    return rng.permuted(np.broadcast_to(ALL_TILES, (count, WALL_SIZE)), axis=1)
+
+
+def hash_walls(walls: np.ndarray) -> np.ndarray:
+    # 64-bit FNV-like hash over the 17 words of every row, computed for all rows at once
+    words = np.ascontiguousarray(walls, dtype=np.uint8).view(np.uint64)
+    result = np.full(len(walls), HASH_OFFSET, dtype=np.uint64)
+    for i in range(words.shape[1]):
+        result ^= words[:, i]
+        result *= HASH_PRIME
+        result ^= result >> np.uint64(29)
+    return result
+
+
+def find_duplicates(walls: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    # mask of rows that repeat an earlier row; rows are compared only when their hashes are equal
+    order = np.argsort(hashes, kind="stable")
+    sorted_hashes = hashes[order]
+    candidates = np.flatnonzero(sorted_hashes[1:] == sorted_hashes[:-1]) + 1
+    result = np.zeros(len(walls), dtype=bool)
+    for i in candidates:
+        if np.array_equal(walls[order[i]], walls[order[i - 1]]):
+            result[order[i]] = True
+    return result
+
+
+def get_walls_file_path(corpus_path: str) -> str:
+    return corpus_path + ".walls.npy"
+
+
+def get_index_file_path(corpus_path: str) -> str:
+    return corpus_path + ".index.npy"
+
+
+class WallCorpus:
+    # Walls in a memory-mapped .npy file, with an index of wall hashes sorted for binary search.
+    # Rows are views into the file, walls are created from them without going through mjai names.
+    def __init__(self, corpus_path: str):
+        self.corpus_path = corpus_path
+        self.walls: np.ndarray = np.load(get_walls_file_path(corpus_path=corpus_path), mmap_mode="r")
+        index = np.load(get_index_file_path(corpus_path=corpus_path))
+        self.sorted_hashes: np.ndarray = index["hash"]
+        self.sorted_rows: np.ndarray = index["row"]
+        assert self.walls.ndim == 2 and self.walls.shape[1] == WALL_SIZE
+        assert len(self.sorted_hashes) == len(self.walls)
+
+    @staticmethod
+    def create(corpus_path: str, walls: np.ndarray, dedupe: bool = True, chunk_size: int = 1 << 20) -> "WallCorpus":
+        assert walls.ndim == 2 and walls.shape[1] == WALL_SIZE
+        hashes = np.concatenate([hash_walls(walls[start:start + chunk_size])
+                                 for start in range(0, len(walls), chunk_size)] or [np.zeros(0, dtype=np.uint64)])
+        if dedupe:
+            duplicates = find_duplicates(walls=walls, hashes=hashes)
+            if duplicates.any():
+                logging.info("Dropping %d duplicate walls", duplicates.sum())
+                walls = walls[~duplicates]
+                hashes = hashes[~duplicates]
+
+        # files are written under temporary names, so a corpus on disk is always complete
+        walls_file_path = get_walls_file_path(corpus_path=corpus_path)
+        out = np.lib.format.open_memmap(walls_file_path + ".tmp.npy", mode="w+", dtype=np.uint8,
+                                        shape=(len(walls), WALL_SIZE))
+        for start in range(0, len(walls), chunk_size):
+            out[start:start + chunk_size] = walls[start:start + chunk_size]
+        out.flush()
+        del out
+
+        order = np.argsort(hashes, kind="stable")
+        index = np.empty(len(walls), dtype=[("hash", np.uint64), ("row", np.int64)])
+        index["hash"] = hashes[order]
+        index["row"] = order
+        index_file_path = get_index_file_path(corpus_path=corpus_path)
+        np.save(index_file_path + ".tmp.npy", index)
+
+        os.replace(walls_file_path + ".tmp.npy", walls_file_path)
+        os.replace(index_file_path + ".tmp.npy", index_file_path)
+        logging.info("Wall corpus %s created with %d walls", corpus_path, len(walls))
+        return WallCorpus(corpus_path=corpus_path)
+
+    @staticmethod
+    def generate(corpus_path: str, count: int, seed: Optional[int] = None,
+                 chunk_size: int = 1 << 20) -> "WallCorpus":
+        # rows are generated in chunks straight into a memory-mapped file, then deduped and indexed
+        rng = np.random.default_rng(seed)
+        tmp_file_path = corpus_path + ".generated.npy"
+        walls = np.lib.format.open_memmap(tmp_file_path, mode="w+", dtype=np.uint8, shape=(count, WALL_SIZE))
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            walls[start:start + size] = generate_walls(count=size, rng=rng)
+        try:
+            return WallCorpus.create(corpus_path=corpus_path, walls=walls, chunk_size=chunk_size)
+        finally:
+            del walls
+            os.remove(tmp_file_path)
+
+    def __len__(self) -> int:
+        return len(self.walls)
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        return self.walls[i]
+
+    def find(self, tiles: np.ndarray) -> Optional[int]:
+        # row of the wall, or None if the corpus does not have it
+        tiles = np.asarray(tiles, dtype=np.uint8).reshape(1, WALL_SIZE)
+        h = hash_walls(tiles)[0]
+        start = np.searchsorted(self.sorted_hashes, h, side="left")
+        end = np.searchsorted(self.sorted_hashes, h, side="right")
+        for row in self.sorted_rows[start:end]:
+            if np.array_equal(self.walls[row], tiles[0]):
+                return int(row)
+        return None
+
+    def get_shard(self, shard_id: int, shard_count: int) -> np.ndarray:
+        # strided view, shards are disjoint and together cover the corpus
+        assert 0 <= shard_id < shard_count
+        return self.walls[shard_id::shard_count]
+
+    def get_shuffled_tiles(self, i: int) -> list[str]:
+        return to_names(self.walls[i])
+
+    def create_duplicate_wall(self, i: int) -> DuplicateWall:
+        return DuplicateWall(tiles=self.walls[i])
+
+    def create_standard_wall(self, i: int) -> StandardWall:
+        return StandardWall(tiles=self.walls[i])
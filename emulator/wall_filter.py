@@ -0,0 +1,84 @@
+import logging
+
+import numpy as np
+
+from emulator.shanten import calculate_ukeire_batch
+from emulator.tiles import IS_RED, TILE_34, to_tiles
+from emulator.wall_corpus import WALL_SIZE
+
+TILE_34_ARRAY = np.array(TILE_34, dtype=np.int64)
+IS_RED_ARRAY = np.array(IS_RED, dtype=np.int64)
+# dora for every 34-space dora marker: the next tile of the suit, of the winds or of the dragons
+DORA_34 = np.array([start + (i - start + 1) % size
+                    for start, size in [(0, 9), (9, 9), (18, 9), (27, 4), (31, 3)]
+                    for i in range(start, start + size)], dtype=np.int64)
+
+# DuplicateWall layout: 13 tile start hands, 18 tile walls of every seat, the dead wall
+START_HANDS = [slice(13 * i, 13 * (i + 1)) for i in range(4)]
+SEAT_WALLS = [slice(52 + 18 * i, 52 + 18 * (i + 1)) for i in range(4)]
+DORA_MARKER_INDEX = WALL_SIZE - 3
+
+
+class WallScores:
+    # [N, 4] arrays, seats in the order of start hands
+    def __init__(self, shanten: np.ndarray, ukeire: np.ndarray, dora: np.ndarray):
+        self.shanten = shanten
+        self.ukeire = ukeire
+        self.dora = dora  # dora and red fives among the start hand and the own wall of the seat
+
+
+def get_counts_34(tiles: np.ndarray) -> np.ndarray:
+    # [N, k] tiles -> [N, 34] counts
+    tiles_34 = TILE_34_ARRAY[tiles]
+    result = np.zeros((len(tiles), 34), dtype=np.int64)
+    rows = np.arange(len(tiles))
+    for j in range(tiles.shape[1]):
+        result[rows, tiles_34[:, j]] += 1
+    return result
+
+
+def score_walls(walls: np.ndarray) -> WallScores:
+    # walls are [N, 136] rows of tiles, as in a wall corpus
+    walls = np.asarray(walls)
+    assert walls.ndim == 2 and walls.shape[1] == WALL_SIZE
+    dora_34 = DORA_34[TILE_34_ARRAY[walls[:, DORA_MARKER_INDEX]]]
+    shanten = np.empty((len(walls), 4), dtype=np.int64)
+    ukeire = np.empty((len(walls), 4), dtype=np.int64)
+    dora = np.empty((len(walls), 4), dtype=np.int64)
+    for seat in range(4):
+        counts_34 = get_counts_34(tiles=walls[:, START_HANDS[seat]])
+        shanten[:, seat], ukeire[:, seat] = calculate_ukeire_batch(counts_34=counts_34)
+        seat_tiles = np.concatenate([walls[:, START_HANDS[seat]], walls[:, SEAT_WALLS[seat]]], axis=1)
+        dora[:, seat] = ((TILE_34_ARRAY[seat_tiles] == dora_34[:, None]).sum(axis=1)
+                         + IS_RED_ARRAY[seat_tiles].sum(axis=1))
+    return WallScores(shanten=shanten, ukeire=ukeire, dora=dora)
+
+
+class WallFilter:
+    # A cheap guess of walls that give different outcomes for different models: several seats start
+    # close to tenpai with enough effective tiles, so the round is a race rather than a sure win or a draw.
+    def __init__(self, max_shanten: int = 3, min_ukeire: int = 0, min_contenders: int = 2, min_dora: int = 0,
+                 chunk_size: int = 10000):
+        assert 1 <= min_contenders <= 4
+        self.max_shanten = max_shanten
+        self.min_ukeire = min_ukeire
+        self.min_contenders = min_contenders
+        self.min_dora = min_dora
+        self.chunk_size = chunk_size
+
+    def get_scores_mask(self, scores: WallScores) -> np.ndarray:
+        contenders = (scores.shanten <= self.max_shanten) & (scores.ukeire >= self.min_ukeire)
+        return (contenders.sum(axis=1) >= self.min_contenders) & (scores.dora.sum(axis=1) >= self.min_dora)
+
+    def get_mask(self, walls: np.ndarray) -> np.ndarray:
+        # walls are scored in chunks, so that a memory-mapped corpus is never loaded at once
+        result = np.zeros(len(walls), dtype=bool)
+        for start in range(0, len(walls), self.chunk_size):
+            scores = score_walls(walls=walls[start:start + self.chunk_size])
+            result[start:start + self.chunk_size] = self.get_scores_mask(scores=scores)
+        logging.debug("%d of %d walls pass the filter", result.sum(), len(walls))
+        return result
+
+    def accepts(self, shuffled_tiles: list[str]) -> bool:
+        walls = np.array([to_tiles(shuffled_tiles)], dtype=np.uint8)
+        return bool(self.get_mask(walls=walls)[0])
@@ -1,5 +1,6 @@
-from collections import defaultdict
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
 
 from mahjong.constants import EAST, SOUTH, WEST, NORTH
 from mahjong.hand_calculating.hand import HandCalculator
@@ -7,65 +8,91 @@ from mahjong.hand_calculating.hand_config import HandConfig, OptionalRules
 from mahjong.hand_calculating.hand_response import HandResponse
 from mahjong.meld import Meld
 
-import mortal.mortal_helpers as mortal_helpers
+from emulator.tiles import TILE_COUNT, TILE_FROM_136, TILES_136, Tile
 
+WinResult = tuple[int, int, Optional[int]]  # han, fu, cost
+WinKey = tuple
 
-# TODO: add ippatsu, chankan, rinshan, houtei, haitei, daburu riichi, etc.
-def calculate_win(closed_hand: list[str],
-                  open_sets: list[list[str]],
-                  closed_kans: list[list[str]],
-                  win_tile: str,
-                  dora_markers: list[str],
-                  ura_dora_markers: list[str],
-                  player_wind: str,
-                  round_wind: str,
-                  is_riichi: bool,
-                  is_tsumo: bool,
-                  riichi_sticks: int,
-                  honba: int,
-                  ) -> tuple[int, int, Optional[int]]:
-    hand_config = HandConfig(
-        is_riichi=is_riichi,
-        player_wind=[EAST, SOUTH, WEST, NORTH]["ESWN".index(player_wind)],
-        round_wind=[EAST, SOUTH, WEST, NORTH]["ESWN".index(round_wind)],
-        is_tsumo=is_tsumo,
-        options=OptionalRules(
-            has_aka_dora=True,
-            has_open_tanyao=True,
-            has_double_yakuman=False,
-        ),
-        tsumi_number=honba,
-        kyoutaku_number=riichi_sticks,
+OPTIONAL_RULES = OptionalRules(
+    has_aka_dora=True,
+    has_open_tanyao=True,
+    has_double_yakuman=False,
+)
+WINDS = {"E": EAST, "S": SOUTH, "W": WEST, "N": NORTH}
+
+
+def get_win_key(closed_hand: list[Tile],
+                open_sets: list[list[Tile]],
+                closed_kans: list[list[Tile]],
+                win_tile: Tile,
+                dora_markers: list[Tile],
+                ura_dora_markers: list[Tile],
+                player_wind: str,
+                round_wind: str,
+                is_riichi: bool,
+                is_tsumo: bool,
+                riichi_sticks: int,
+                honba: int,
+                ) -> WinKey:
+    # the same for all orders of tiles, melds and dora markers
+    return (
+        tuple(sorted(closed_hand)),
+        tuple(sorted(tuple(open_set) for open_set in open_sets)),
+        tuple(sorted(tuple(closed_kan) for closed_kan in closed_kans)),
+        win_tile,
+        tuple(sorted(dora_markers)),
+        tuple(sorted(ura_dora_markers)),
+        player_wind,
+        round_wind,
+        is_riichi,
+        is_tsumo,
+        riichi_sticks,
+        honba,
     )
 
-    tile_map: dict[str, list[int]] = defaultdict(list)
-    for tile_136 in range(136):
-        tile_map[mortal_helpers.convert_tile_to_mortal(tile_136=tile_136)].append(tile_136)
+
+# TODO: add ippatsu, chankan, rinshan, houtei, haitei, daburu riichi, etc.
+def estimate_win(hand_calculator: HandCalculator,
+                 hand_config: HandConfig,
+                 closed_hand: list[Tile],
+                 open_sets: list[list[Tile]],
+                 closed_kans: list[list[Tile]],
+                 win_tile: Tile,
+                 dora_markers: list[Tile],
+                 ura_dora_markers: list[Tile],
+                 is_tsumo: bool,
+                 ) -> WinResult:
+    # every tile gets its own 136-id, the largest ids are taken first
+    used_counts = [0] * TILE_COUNT
+
+    def take_tile_136(tile: Tile) -> int:
+        used_counts[tile] += 1
+        return TILES_136[tile][-used_counts[tile]]
 
     tiles_136 = []
     for tile in closed_hand:
-        tiles_136.append(tile_map[tile].pop())
+        tiles_136.append(take_tile_136(tile))
     if is_tsumo:
         assert len(tiles_136) % 3 == 2
         win_tile_136 = None
         for tile_136 in tiles_136:
-            if mortal_helpers.convert_tile_to_mortal(tile_136=tile_136) == win_tile:
+            if TILE_FROM_136[tile_136] == win_tile:
                 win_tile_136 = tile_136
                 break
         assert win_tile_136 is not None
     else:
         assert len(tiles_136) % 3 == 1
-        win_tile_136 = tile_map[win_tile].pop()
+        win_tile_136 = take_tile_136(win_tile)
         tiles_136.append(win_tile_136)
     dora_markers_136 = []
     for tile in dora_markers + ura_dora_markers:
-        dora_markers_136.append(tile_map[tile].pop())
+        dora_markers_136.append(take_tile_136(tile))
 
     melds = []
     for closed_kan in closed_kans:
         meld_tiles_136 = []
         for tile in closed_kan:
-            meld_tiles_136.append(tile_map[tile].pop())
+            meld_tiles_136.append(take_tile_136(tile))
         melds.append(Meld(meld_type=Meld.KAN, tiles=meld_tiles_136, opened=False, called_tile=meld_tiles_136[0]))
     for open_set in open_sets:
         if len(open_set) == 3:
@@ -77,14 +104,13 @@ def calculate_win(closed_hand: list[str],
             meld_type = Meld.KAN
         meld_tiles_136 = []
         for tile in open_set:
-            meld_tiles_136.append(tile_map[tile].pop())
+            meld_tiles_136.append(take_tile_136(tile))
         melds.append(Meld(meld_type=meld_type, tiles=meld_tiles_136, opened=True, called_tile=meld_tiles_136[0]))
 
     for meld in melds:
         for tile_136 in meld.tiles:
             tiles_136.append(tile_136)
 
-    hand_calculator = HandCalculator()
     hand_response: HandResponse = hand_calculator.estimate_hand_value(
         tiles=tiles_136,
         win_tile=win_tile_136,
@@ -93,3 +119,104 @@ def calculate_win(closed_hand: list[str],
         config=hand_config,
     )
     return hand_response.han, hand_response.fu, (hand_response.cost or {}).get("total")
+
+
+class WinCalculator:
+    # Reuses the hand calculator and configs, results are kept in a bounded LRU cache.
+    # The mahjong library keeps state in both of them, so estimations are serialised with a lock.
+    def __init__(self, max_size: int = 100000):
+        assert max_size >= 1
+        self.max_size = max_size
+        self.hand_calculator = HandCalculator()
+        self.hand_configs: dict[tuple[str, str, bool, bool, int, int], HandConfig] = {}
+        self.results: OrderedDict[WinKey, WinResult] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get_hand_config(self, player_wind: str, round_wind: str, is_riichi: bool, is_tsumo: bool,
+                        riichi_sticks: int, honba: int) -> HandConfig:
+        key = (player_wind, round_wind, is_riichi, is_tsumo, riichi_sticks, honba)
+        hand_config = self.hand_configs.get(key)
+        if hand_config is None:
+            hand_config = HandConfig(
+                is_riichi=is_riichi,
+                player_wind=WINDS[player_wind],
+                round_wind=WINDS[round_wind],
+                is_tsumo=is_tsumo,
+                options=OPTIONAL_RULES,
+                tsumi_number=honba,
+                kyoutaku_number=riichi_sticks,
+            )
+            self.hand_configs[key] = hand_config
+        return hand_config
+
+    def calculate_unlocked(self, closed_hand: list[Tile],
+                           open_sets: list[list[Tile]],
+                           closed_kans: list[list[Tile]],
+                           win_tile: Tile,
+                           dora_markers: list[Tile],
+                           ura_dora_markers: list[Tile],
+                           player_wind: str,
+                           round_wind: str,
+                           is_riichi: bool,
+                           is_tsumo: bool,
+                           riichi_sticks: int,
+                           honba: int,
+                           ) -> WinResult:
+        key = get_win_key(closed_hand=closed_hand, open_sets=open_sets, closed_kans=closed_kans,
+                          win_tile=win_tile, dora_markers=dora_markers, ura_dora_markers=ura_dora_markers,
+                          player_wind=player_wind, round_wind=round_wind, is_riichi=is_riichi, is_tsumo=is_tsumo,
+                          riichi_sticks=riichi_sticks, honba=honba)
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+            self.hits += 1
+            return result
+        self.misses += 1
+        hand_config = self.get_hand_config(player_wind=player_wind, round_wind=round_wind, is_riichi=is_riichi,
+                                           is_tsumo=is_tsumo, riichi_sticks=riichi_sticks, honba=honba)
+        result = estimate_win(hand_calculator=self.hand_calculator, hand_config=hand_config,
+                              closed_hand=sorted(closed_hand), open_sets=open_sets, closed_kans=closed_kans,
+                              win_tile=win_tile, dora_markers=dora_markers, ura_dora_markers=ura_dora_markers,
+                              is_tsumo=is_tsumo)
+        self.results[key] = result
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+        return result
+
+    def calculate(self, **win: Any) -> WinResult:
+        # takes the arguments of calculate_win
+        with self.lock:
+            return self.calculate_unlocked(**win)
+
+    def calculate_many(self, wins: Iterable[dict[str, Any]]) -> list[WinResult]:
+        # every win is a dict with the arguments of calculate_win
+        with self.lock:
+            return [self.calculate_unlocked(**win) for win in wins]
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+
+
+WIN_CALCULATOR = WinCalculator()
+
+
+def calculate_win(closed_hand: list[Tile],
+                  open_sets: list[list[Tile]],
+                  closed_kans: list[list[Tile]],
+                  win_tile: Tile,
+                  dora_markers: list[Tile],
+                  ura_dora_markers: list[Tile],
+                  player_wind: str,
+                  round_wind: str,
+                  is_riichi: bool,
+                  is_tsumo: bool,
+                  riichi_sticks: int,
+                  honba: int,
+                  ) -> WinResult:
+    return WIN_CALCULATOR.calculate(closed_hand=closed_hand, open_sets=open_sets, closed_kans=closed_kans,
+                                    win_tile=win_tile, dora_markers=dora_markers, ura_dora_markers=ura_dora_markers,
+                                    player_wind=player_wind, round_wind=round_wind, is_riichi=is_riichi,
+                                    is_tsumo=is_tsumo, riichi_sticks=riichi_sticks, honba=honba)
@@ -1,31 +1,36 @@
-import itertools
 import logging
-import os
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from random import SystemRandom, Random
-from typing import Optional
 
 from drawing import drawing
-from emulator.emulator import SingleRoundEmulator
+from drawing.render_queue import RenderQueue
+from emulator import runner
+from emulator.prefix_evaluator import PrefixSharingEvaluator
+from emulator.results_store import RESULTS_DB_PATH, ResultsStore
+from emulator.runner import PERMUTATIONS, PTH_FILES, PermutationRunner, ResultKey
 # noinspection PyUnresolvedReferences
 from emulator.wall import StandardWall, DuplicateWall, get_all_tiles
+from mortal.inference_broker import InferenceBroker
 
 
 def main():
     logging.basicConfig(level=logging.INFO)
 
-    pth_files_dir = os.path.join(os.path.dirname(__file__), "mortal/mortal_lib/pth")
-    pth_files = [
-        os.path.join(pth_files_dir, "bot_20240110_best_94dd_64e8.pth"),
-        os.path.join(pth_files_dir, "bot_20240110_mortal_1280_872a.pth"),
-        os.path.join(pth_files_dir, "bot_20240308_best_0a88_6563.pth"),
-        os.path.join(pth_files_dir, "bot_20240308_mortal_baad_d6a2.pth"),
-    ]
+    pth_files = PTH_FILES
     logging.info("Pth files:")
     for pth_file in pth_files:
         logging.info("%s", pth_file)
 
     seed = None
+    workers = 1  # > 1 spreads permutations over worker processes
+    prefix_sharing = False  # emulate permutations as a tree, computing identical opening turns once
+    batch_inference = True  # run all permutations at once, batching NN calls of different tables
+    vector_pictures = False  # save the wall picture as svg instead of png
+    # the four players of a table react in parallel threads, only when permutations are emulated one by one:
+    # it has no effect with workers > 1, prefix_sharing or batch_inference
+    concurrent_seats = False
+    analyse_hands = False  # add per-turn shanten and ukeire of every hand to the round results
     logging.info("Seed: %s", seed)
     if seed is None:
         r = SystemRandom()
@@ -35,44 +40,68 @@ def main():
     r.shuffle(shuffled_tiles)
     logging.info("Shuffled tiles: %s", shuffled_tiles)
 
-    result_counts: dict[tuple[str, Optional[str], Optional[str]], int] = defaultdict(int)
-    duplicate_wall_file_path = None
-    for i, p in enumerate(itertools.permutations(range(4))):
-        wall = DuplicateWall(shuffled_tiles=shuffled_tiles)
-        if i == 0:
-            logging.info("Wall: %s", wall.get_wall_info())
-            if isinstance(wall, DuplicateWall):
-                duplicate_wall_file_path = drawing.draw_duplicate_wall(
-                    wall=wall,
-                    dead_wall_in_one_line=True,
-                    overwrite_file=True,
-                )
-        logging.info("Testing model permutation %d / 24", i + 1)
-        emulator = SingleRoundEmulator(
-            round_wind="E",
-            round_id=1,
-            honba=0,
-            riichi_sticks=0,
-            dealer_id=0,
-            scores=[25000] * 4,
-            wall=wall,
-            player_pth_files=[pth_files[p[0]], pth_files[p[1]], pth_files[p[2]], pth_files[p[3]]],
-        )
-        emulation_result = emulator.process()
-        if emulation_result["result"] == "draw":
-            result_counts[("draw", None, None)] += 1
+    wall = DuplicateWall(shuffled_tiles=shuffled_tiles)
+    logging.info("Wall: %s", wall.get_wall_info())
+    # the picture is drawn in background while the wall is emulated
+    with RenderQueue(vector=vector_pictures) as render_queue:
+        duplicate_wall_file_path = None
+        if isinstance(wall, DuplicateWall):
+            duplicate_wall_file_path = render_queue.submit(wall=wall)
+
+        if workers > 1:
+            logging.info("Testing %d model permutations on %d workers", len(PERMUTATIONS), workers)
+            with PermutationRunner(pth_files=pth_files, workers=workers,
+                                   analyse_hands=analyse_hands) as permutation_runner:
+                emulation_results = permutation_runner.run_wall(shuffled_tiles=shuffled_tiles)
+        elif prefix_sharing:
+            logging.info("Testing %d model permutations with shared prefixes", len(PERMUTATIONS))
+            evaluator = PrefixSharingEvaluator(pth_files=pth_files, analyse_hands=analyse_hands)
+            emulation_results = evaluator.evaluate(shuffled_tiles=shuffled_tiles)
+        elif batch_inference:
+            logging.info("Testing %d model permutations concurrently", len(PERMUTATIONS))
+            with InferenceBroker() as broker:
+                emulators = []
+                for p in PERMUTATIONS:
+                    emulators.append(runner.create_emulator(
+                        wall=DuplicateWall(shuffled_tiles=shuffled_tiles),
+                        player_pth_files=[pth_files[p[0]], pth_files[p[1]], pth_files[p[2]], pth_files[p[3]]],
+                        registry=broker,
+                        analyse_hands=analyse_hands,
+                    ))
+                emulation_results = runner.process_concurrently(emulators=emulators)
         else:
-            assert emulation_result["result"] == "win"
-            for win_desc in emulation_result["wins"]:
-                result_counts[(win_desc["win_type"], win_desc["winner"], win_desc.get("loser"))] += 1
+            emulation_results = []
+            seat_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="seat") if concurrent_seats else None
+            try:
+                for i, p in enumerate(PERMUTATIONS):
+                    logging.info("Testing model permutation %d / 24", i + 1)
+                    emulator = runner.create_emulator(
+                        wall=DuplicateWall(shuffled_tiles=shuffled_tiles),
+                        player_pth_files=[pth_files[p[0]], pth_files[p[1]], pth_files[p[2]], pth_files[p[3]]],
+                        seat_executor=seat_executor,
+                        analyse_hands=analyse_hands,
+                    )
+                    emulation_results.append(emulator.process())
+            finally:
+                if seat_executor is not None:
+                    seat_executor.shutdown()
+
+    result_counts: dict[ResultKey, int] = defaultdict(int)
+    for emulation_result in emulation_results:
+        runner.add_emulation_result(result_counts=result_counts, emulation_result=emulation_result)
+    if isinstance(wall, DuplicateWall):
+        with ResultsStore(db_path=RESULTS_DB_PATH) as store:
+            store.add_wall(
+                wall_hash=drawing.get_wall_hash(wall=wall),
+                shuffled_tiles=shuffled_tiles,
+                picture_path=duplicate_wall_file_path,
+                permutations=PERMUTATIONS,
+                pth_files=pth_files,
+                emulation_results=emulation_results,
+            )
 
-    logging.info("")
-    logging.info("================================================================================")
-    if duplicate_wall_file_path is not None:
-        logging.info("Duplicate wall picture path: %s", duplicate_wall_file_path)
-    logging.info("Round result counts:")
-    for result, count in sorted(result_counts.items(), key=lambda t: (t[1], t[0]), reverse=True):
-        logging.info("%s -> %d", result, count)
+    runner.log_result_counts(result_counts=result_counts, duplicate_wall_file_path=duplicate_wall_file_path)
+    runner.log_progress(emulation_results=emulation_results)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,154 @@
+import threading
+import time
+from typing import Any, Optional
+
+import mortal.mortal_lib.model as mortal_model
+from mortal import model_registry
+from mortal.model_registry import EngineSource
+
+
+class InferenceRequest:
+    def __init__(self, obs: list, masks: list, invisible_obs: Optional[list], with_meta: bool):
+        self.obs = obs
+        self.masks = masks
+        self.invisible_obs = invisible_obs
+        self.with_meta = with_meta
+        self.created_at = time.monotonic()
+        self.done = threading.Event()
+        self.result: Optional[tuple[list, list, list, list]] = None
+        self.error: Optional[BaseException] = None
+
+
+class BatchedEngine:
+    # Stands in for a MortalEngine: requests from many bots (usually living in different threads)
+    # are gathered by a worker thread and evaluated with a single react_batch call
+    def __init__(self, engine: mortal_model.MortalEngine, max_batch_size: int, max_wait: float):
+        assert max_batch_size >= 1
+        assert max_wait >= 0
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending: list[InferenceRequest] = []
+        self.pending_rows: int = 0
+        self.condition = threading.Condition()
+        self.closed: bool = False
+        self.batch_count: int = 0
+        self.row_count: int = 0
+        self.worker = threading.Thread(target=self.run_worker, name=f"batched-{engine.name}", daemon=True)
+        self.worker.start()
+
+    def __getattr__(self, name: str) -> Any:
+        # libriichi reads engine settings (engine_type, version, name, ...) as attributes
+        return getattr(self.engine, name)
+
+    def react_batch(self, obs, masks, invisible_obs, with_meta=True):
+        request = InferenceRequest(obs=obs, masks=masks, invisible_obs=invisible_obs, with_meta=with_meta)
+        with self.condition:
+            assert not self.closed
+            self.pending.append(request)
+            self.pending_rows += len(obs)
+            self.condition.notify_all()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def take_batch(self) -> list[InferenceRequest]:
+        with self.condition:
+            while len(self.pending) == 0 and not self.closed:
+                self.condition.wait()
+            if len(self.pending) == 0:
+                return []
+            deadline = self.pending[0].created_at + self.max_wait
+            while self.pending_rows < self.max_batch_size and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(timeout=remaining)
+            batch = []
+            rows = 0
+            while len(self.pending) > 0:
+                request_rows = len(self.pending[0].obs)
+                if len(batch) > 0 and rows + request_rows > self.max_batch_size:
+                    break
+                batch.append(self.pending.pop(0))
+                rows += request_rows
+            self.pending_rows -= rows
+            return batch
+
+    def run_worker(self):
+        while True:
+            batch = self.take_batch()
+            if len(batch) == 0:
+                return
+            self.process_batch(batch=batch)
+
+    def process_batch(self, batch: list[InferenceRequest]):
+        obs = []
+        masks = []
+        invisible_obs = [] if self.engine.is_oracle else None
+        with_meta = any(request.with_meta for request in batch)
+        for request in batch:
+            obs.extend(request.obs)
+            masks.extend(request.masks)
+            if invisible_obs is not None:
+                invisible_obs.extend(request.invisible_obs)
+        try:
+            actions, q_out, masks_out, is_greedy = self.engine.react_batch(obs, masks, invisible_obs,
+                                                                             with_meta=with_meta)
+        except BaseException as e:
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+        self.batch_count += 1
+        self.row_count += len(obs)
+
+        offset = 0
+        for request in batch:
+            end = offset + len(request.obs)
+            request.result = (actions[offset:end], q_out[offset:end], masks_out[offset:end], is_greedy[offset:end])
+            request.done.set()
+            offset = end
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.worker.join()
+
+
+class InferenceBroker(EngineSource):
+    # Hands out bots whose engines batch observations of all tables that use the same checkpoint,
+    # the engines themselves are loaded by a registry
+    def __init__(self, max_batch_size: int = 64, max_wait: float = 0.002, registry: Optional[EngineSource] = None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        if registry is None:
+            registry = model_registry.REGISTRY
+        self.registry = registry
+        self.batched_engines: dict[int, BatchedEngine] = {}  # id of the underlying engine -> batched engine
+        self.lock = threading.Lock()
+
+    def get_engine(self, pth_file: str) -> BatchedEngine:
+        engine = self.registry.get_engine(pth_file=pth_file)
+        with self.lock:
+            batched_engine = self.batched_engines.get(id(engine))
+            if batched_engine is None:
+                batched_engine = BatchedEngine(engine=engine, max_batch_size=self.max_batch_size,
+                                               max_wait=self.max_wait)
+                self.batched_engines[id(engine)] = batched_engine
+            return batched_engine
+
+    def close(self):
+        with self.lock:
+            batched_engines = list(self.batched_engines.values())
+            self.batched_engines.clear()
+        for batched_engine in batched_engines:
+            batched_engine.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,84 @@
+import hashlib
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import mortal.mortal_lib.model as mortal_model
+
+
+def get_file_hash(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class EngineSource(ABC):
+    # Where bots get engines from, libriichi bots are cheap wrappers around a shared engine
+    @abstractmethod
+    def get_engine(self, pth_file: str) -> mortal_model.MortalEngine:
+        pass
+
+    def create_engine_view(self, pth_file: str) -> mortal_model.EngineView:
+        return mortal_model.EngineView(engine=self.get_engine(pth_file=pth_file))
+
+    def create_bot(self, seat: int, pth_file: str) -> mortal_model.Bot:
+        return mortal_model.Bot(self.create_engine_view(pth_file=pth_file), seat)
+
+
+class ModelRegistry(EngineSource):
+    # Keeps one eval-mode engine per checkpoint
+    def __init__(self, decision_cache: Optional[mortal_model.DecisionCache] = None):
+        self.decision_cache = decision_cache
+        self.engines: dict[tuple[str, str], mortal_model.MortalEngine] = {}
+        self.file_hashes: dict[str, tuple[int, int, str]] = {}  # path -> (mtime, size, hash)
+        self.lock = threading.Lock()
+
+    def get_key(self, pth_file: str) -> tuple[str, str]:
+        path = os.path.realpath(pth_file)
+        stat = os.stat(path)
+        cached = self.file_hashes.get(path)
+        if cached is None or cached[0] != stat.st_mtime_ns or cached[1] != stat.st_size:
+            cached = (stat.st_mtime_ns, stat.st_size, get_file_hash(file_path=path))
+            self.file_hashes[path] = cached
+        return path, cached[2]
+
+    def get_engine(self, pth_file: str) -> mortal_model.MortalEngine:
+        with self.lock:
+            key = self.get_key(pth_file=pth_file)
+            engine = self.engines.get(key)
+            if engine is None:
+                logging.info("Loading model %s (sha256 %s)", os.path.basename(key[0]), key[1][:12])
+                engine = mortal_model.load_engine(pth_file=key[0], decision_cache=self.decision_cache,
+                                                  fingerprint=key[1])
+                self.engines[key] = engine
+            return engine
+
+    def set_decision_cache(self, decision_cache: Optional[mortal_model.DecisionCache]):
+        # applies to already loaded engines too
+        with self.lock:
+            self.decision_cache = decision_cache
+            for engine in self.engines.values():
+                engine.decision_cache = decision_cache
+
+    def clear(self):
+        with self.lock:
+            self.engines.clear()
+            self.file_hashes.clear()
+
+
+class CachingEngineSource(EngineSource):
+    # Engines of another source with a decision cache that is not shared with other users of the engines
+    def __init__(self, source: EngineSource, decision_cache: mortal_model.DecisionCache):
+        self.source = source
+        self.decision_cache = decision_cache
+
+    def get_engine(self, pth_file: str) -> mortal_model.CachedEngine:
+        return mortal_model.CachedEngine(engine=self.source.get_engine(pth_file=pth_file),
+                                         decision_cache=self.decision_cache)
+
+
+REGISTRY = ModelRegistry()
@@ -1,20 +1,28 @@
 import json
-from typing import Optional
+from typing import Optional, Union
 
 import mortal.mortal_lib.model as mortal_model
+from mortal import model_registry
 from mortal.mortal_helpers import MortalEvent
+from mortal.model_registry import EngineSource
 
 
 class MortalBot:
-    def __init__(self, player_id: int, pth_file: str):
+    def __init__(self, player_id: int, pth_file: str, registry: Optional[EngineSource] = None):
         self.player_id = player_id
-        self.model = mortal_model.load_model(seat=player_id, pth_file=pth_file)
+        if registry is None:
+            registry = model_registry.REGISTRY
+        self.engine_view = registry.create_engine_view(pth_file=pth_file)
+        self.model = mortal_model.Bot(self.engine_view, player_id)
 
-    def react_all(self, events: list[MortalEvent], with_meta: bool = True, with_nulls: bool = False) -> list[MortalEvent]:
+    def react_all(self, events: list[Union[MortalEvent, str]], with_meta: bool = True, with_nulls: bool = False) -> list[MortalEvent]:
         return_actions: list[MortalEvent] = []
 
+        # without meta the engine skips building q values and masks for libriichi
+        self.engine_view.with_meta = with_meta
         for event in events:
-            event_str = json.dumps(event, separators=(",", ":"))
+            # events can come already encoded
+            event_str = event if isinstance(event, str) else json.dumps(event, separators=(",", ":"))
             return_action_str: Optional[str] = self.model.react(event_str)
             if return_action_str is not None:
                 return_action: MortalEvent = json.loads(return_action_str)
@@ -33,6 +41,6 @@ class MortalBot:
 
         return return_actions
 
-    def react_one(self, events: list[MortalEvent], with_meta: bool = True, with_nulls: bool = False) -> MortalEvent:
+    def react_one(self, events: list[Union[MortalEvent, str]], with_meta: bool = True, with_nulls: bool = False) -> MortalEvent:
         return_actions = self.react_all(events=events, with_meta=with_meta, with_nulls=with_nulls)
         return return_actions[-1]
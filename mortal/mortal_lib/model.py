@@ -1,3 +1,7 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
 import torch
 from torch import nn, Tensor
@@ -292,6 +296,50 @@ class GRP(nn.Module):
         return labels
     
 
+class DecisionCache:
+    # LRU of engine decisions keyed by model fingerprint and observation, shared by any number of engines
+    def __init__(self, max_size = 100000):
+        assert max_size > 0
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @staticmethod
+    def make_key(fingerprint, obs, mask, invisible_obs = None):
+        h = hashlib.blake2b(fingerprint.encode(), digest_size=16)
+        h.update(np.ascontiguousarray(obs).tobytes())
+        h.update(np.ascontiguousarray(mask).tobytes())
+        if invisible_obs is not None:
+            h.update(np.ascontiguousarray(invisible_obs).tobytes())
+        return h.digest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.entries.get(key)
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return row
+
+    def bypass(self, rows):
+        with self.lock:
+            self.bypassed += rows
+
+    def put(self, key, row):
+        with self.lock:
+            self.entries[key] = row
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
 class MortalEngine:
     def __init__(
         self,
@@ -308,6 +356,8 @@ class MortalEngine:
         boltzmann_epsilon = 0,
         boltzmann_temp = 1,
         top_p = 1,
+        decision_cache = None,
+        fingerprint = None,
     ):
         self.engine_type = 'mortal'
         self.device = device or torch.device('cpu')
@@ -327,14 +377,51 @@ class MortalEngine:
         self.boltzmann_temp = boltzmann_temp
         self.top_p = top_p
 
-    def react_batch(self, obs, masks, invisible_obs):
+        self.decision_cache = decision_cache
+        self.fingerprint = fingerprint or f'{name}@{id(self)}'
+
+    def react_batch(self, obs, masks, invisible_obs, with_meta = True, decision_cache = None):
+        # decision_cache, when given, is used instead of the engine's own cache
         with (
             torch.autocast(self.device.type, enabled=self.enable_amp),
             torch.no_grad(),
         ):
-            return self._react_batch(obs, masks, invisible_obs)
+            return self._react_batch(obs, masks, invisible_obs, with_meta, decision_cache)
+
+    def _react_batch(self, obs, masks, invisible_obs, with_meta = True, decision_cache = None):
+        cache = decision_cache if decision_cache is not None else self.decision_cache
+        if cache is None:
+            return self._forward_batch(obs, masks, invisible_obs, with_meta)
+        if self.boltzmann_epsilon > 0 or (self.version == 1 and self.stochastic_latent):
+            # sampled decisions must not be replayed
+            cache.bypass(len(obs))
+            return self._forward_batch(obs, masks, invisible_obs, with_meta)
+
+        keys = [
+            cache.make_key(self.fingerprint, obs[i], masks[i], invisible_obs[i] if self.is_oracle else None)
+            for i in range(len(obs))
+        ]
+        rows = [cache.get(key) for key in keys]
+        # rows cached by the lean path have no q values, they are recomputed when meta is requested
+        missing = [i for i, row in enumerate(rows) if row is None or (with_meta and row[1] is None)]
+        if missing:
+            actions, q_out, masks_out, is_greedy = self._forward_batch(
+                [obs[i] for i in missing],
+                [masks[i] for i in missing],
+                [invisible_obs[i] for i in missing] if self.is_oracle else None,
+                with_meta,
+            )
+            for j, i in enumerate(missing):
+                if with_meta:
+                    rows[i] = (actions[j], q_out[j], masks_out[j], is_greedy[j])
+                else:
+                    rows[i] = (actions[j], None, None, is_greedy[j])
+                cache.put(keys[i], rows[i])
+        if not with_meta:
+            return [row[0] for row in rows], [[]] * len(rows), [[]] * len(rows), [row[3] for row in rows]
+        return tuple([row[column] for row in rows] for column in range(4))
 
-    def _react_batch(self, obs, masks, invisible_obs):
+    def _forward_batch(self, obs, masks, invisible_obs, with_meta = True):
         obs = torch.as_tensor(np.stack(obs, axis=0), device=self.device)
         masks = torch.as_tensor(np.stack(masks, axis=0), device=self.device)
         invisible_obs = None
@@ -363,8 +450,37 @@ class MortalEngine:
             is_greedy = torch.ones(batch_size, dtype=torch.bool, device=self.device)
             actions = q_out.argmax(-1)
 
+        if not with_meta:
+            # lean path: libriichi gets empty q values and masks instead of ACTION_SPACE wide lists
+            return actions.tolist(), [[]] * batch_size, [[]] * batch_size, is_greedy.tolist()
         return actions.tolist(), q_out.tolist(), masks.tolist(), is_greedy.tolist()
 
+class EngineView:
+    # Per-bot view of a shared engine, the owner switches with_meta before every react call
+    def __init__(self, engine):
+        self.engine = engine
+        self.with_meta = True
+
+    def __getattr__(self, name):
+        # libriichi reads engine settings (engine_type, version, name, ...) as attributes
+        return getattr(self.engine, name)
+
+    def react_batch(self, obs, masks, invisible_obs):
+        return self.engine.react_batch(obs, masks, invisible_obs, with_meta=self.with_meta)
+
+class CachedEngine:
+    # A shared engine seen through a decision cache of its own
+    def __init__(self, engine, decision_cache):
+        self.engine = engine
+        self.decision_cache = decision_cache
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    def react_batch(self, obs, masks, invisible_obs, with_meta = True):
+        return self.engine.react_batch(obs, masks, invisible_obs, with_meta=with_meta,
+                                       decision_cache=self.decision_cache)
+
 def sample_top_p(logits, p):
     if p >= 1:
         return Categorical(logits=logits).sample()
@@ -378,7 +494,7 @@ def sample_top_p(logits, p):
     sampled = probs_idx.gather(-1, probs_sort.multinomial(1)).squeeze(-1)
     return sampled
 
-def load_model(seat: int, pth_file: str) -> Bot:
+def load_engine(pth_file: str, decision_cache: Optional[DecisionCache] = None, fingerprint: Optional[str] = None) -> MortalEngine:
     device = torch.device('cpu')
     state = torch.load(pth_file, map_location=torch.device('cpu'))
 
@@ -401,7 +517,12 @@ def load_model(seat: int, pth_file: str) -> Bot:
         enable_rule_based_agari_guard = True,
         name = 'mortal',
         version = version,
+        decision_cache = decision_cache,
+        fingerprint = fingerprint,
     )
+    return engine
 
+def load_model(seat: int, pth_file: str) -> Bot:
+    engine = load_engine(pth_file=pth_file)
     bot = Bot(engine, seat)
     return bot
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("mortal.mortal_lib.libriichi")
+
+import torch
+from torch import nn
+
+import mortal.mortal_lib.model as mortal_model
+from mortal.model_registry import CachingEngineSource, EngineSource
+
+
+class StubBrain(nn.Module):
+    def forward(self, obs):
+        return obs.float()
+
+
+class StubDQN(nn.Module):
+    # q values are the observation itself, rows are counted
+    def __init__(self):
+        super().__init__()
+        self.rows = 0
+
+    def forward(self, phi, masks):
+        self.rows += phi.shape[0]
+        return phi.masked_fill(~masks, -torch.inf)
+
+
+def create_engine(decision_cache: mortal_model.DecisionCache, fingerprint: str = "stub",
+                  boltzmann_epsilon: float = 0) -> mortal_model.MortalEngine:
+    return mortal_model.MortalEngine(StubBrain(), StubDQN(), is_oracle=False, version=4,
+                                     boltzmann_epsilon=boltzmann_epsilon, decision_cache=decision_cache,
+                                     fingerprint=fingerprint)
+
+
+def get_rows(values: list[list[float]]) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    obs = [np.array(row, dtype=np.float32) for row in values]
+    masks = [np.ones(len(row), dtype=bool) for row in values]
+    return obs, masks
+
+
+def test_hits_and_misses():
+    cache = mortal_model.DecisionCache()
+    engine = create_engine(decision_cache=cache)
+    obs, masks = get_rows([[0, 1, 0], [2, 0, 0]])
+    result = engine.react_batch(obs, masks, None)
+    assert result[0] == [1, 0]
+    assert (cache.hits, cache.misses, len(cache)) == (0, 2, 2)
+
+    # only the new row goes through the network
+    obs, masks = get_rows([[2, 0, 0], [0, 0, 3]])
+    assert engine.react_batch(obs, masks, None)[0] == [0, 2]
+    assert (cache.hits, cache.misses, len(cache)) == (1, 3, 3)
+    assert engine.dqn.rows == 3
+
+    # engines with other fingerprints do not share decisions
+    other_engine = create_engine(decision_cache=cache, fingerprint="other")
+    other_engine.react_batch(obs, masks, None)
+    assert other_engine.dqn.rows == 2
+    assert len(cache) == 5
+
+
+def test_lean_rows():
+    cache = mortal_model.DecisionCache()
+    engine = create_engine(decision_cache=cache)
+    obs, masks = get_rows([[0, 1, 0]])
+    assert engine.react_batch(obs, masks, None, with_meta=False) == ([1], [[]], [[]], [True])
+    assert engine.react_batch(obs, masks, None, with_meta=False)[0] == [1]
+    assert engine.dqn.rows == 1
+    # lean rows have no q values, they are computed again when meta is requested
+    actions, q_out, masks_out, _ = engine.react_batch(obs, masks, None)
+    assert actions == [1]
+    assert len(q_out[0]) == 3 and masks_out == [[True, True, True]]
+    assert engine.dqn.rows == 2
+    assert engine.react_batch(obs, masks, None)[1] == q_out
+    assert engine.dqn.rows == 2
+
+
+class StubSource(EngineSource):
+    def __init__(self):
+        self.engine = create_engine(decision_cache=None)
+
+    def get_engine(self, pth_file: str) -> mortal_model.MortalEngine:
+        return self.engine
+
+
+def test_caching_engine_source():
+    source = StubSource()
+    cache = mortal_model.DecisionCache()
+    caching_source = CachingEngineSource(source=source, decision_cache=cache)
+    engine = caching_source.get_engine(pth_file="stub.pth")
+    # the engine is shared, the cache is not attached to it
+    assert engine.engine is source.engine
+    assert engine.fingerprint == "stub"
+    obs, masks = get_rows([[0, 1, 0]])
+    engine.react_batch(obs, masks, None)
+    caching_source.get_engine(pth_file="stub.pth").react_batch(obs, masks, None)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert source.engine.decision_cache is None
+    source.engine.react_batch(obs, masks, None)
+    assert source.engine.dqn.rows == 2
+
+
+def test_bypass():
+    cache = mortal_model.DecisionCache()
+    engine = create_engine(decision_cache=cache, boltzmann_epsilon=0.5)
+    obs, masks = get_rows([[0, 1, 0], [0, 1, 0]])
+    engine.react_batch(obs, masks, None)
+    engine.react_batch(obs, masks, None)
+    # sampled decisions are never cached
+    assert (cache.hits, cache.misses, cache.bypassed, len(cache)) == (0, 0, 4, 0)
+    assert engine.dqn.rows == 4
+
+
+def test_eviction():
+    cache = mortal_model.DecisionCache(max_size=2)
+    cache.put(b"a", 1)
+    cache.put(b"b", 2)
+    assert cache.get(b"a") == 1
+    cache.put(b"c", 3)
+    # b is the least recently used entry
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == 1
+    assert cache.get(b"c") == 3
+    assert len(cache) == 2
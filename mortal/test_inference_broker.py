@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("mortal.mortal_lib.libriichi")
+
+from mortal.inference_broker import BatchedEngine, InferenceBroker
+from mortal.model_registry import EngineSource
+
+
+class FakeEngine:
+    # the action of every row is its observation, batches are recorded
+    def __init__(self, name: str = "fake", error: bool = False):
+        self.name = name
+        self.is_oracle = False
+        self.error = error
+        self.batches: list[list] = []
+
+    def react_batch(self, obs, masks, invisible_obs, with_meta=True):
+        if self.error:
+            raise ValueError("broken engine")
+        self.batches.append(list(obs))
+        return list(obs), [[]] * len(obs), list(masks), [True] * len(obs)
+
+
+class FakeRegistry(EngineSource):
+    def __init__(self):
+        self.engines: dict[str, FakeEngine] = {}
+
+    def get_engine(self, pth_file: str) -> FakeEngine:
+        if pth_file not in self.engines:
+            self.engines[pth_file] = FakeEngine(name=pth_file)
+        return self.engines[pth_file]
+
+
+def react_concurrently(engine: BatchedEngine, count: int) -> list[tuple]:
+    results = [None] * count
+
+    def react(i: int):
+        results[i] = engine.react_batch([i], [f"mask {i}"], None)
+
+    threads = [threading.Thread(target=react, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_batching():
+    engine = FakeEngine()
+    batched_engine = BatchedEngine(engine=engine, max_batch_size=4, max_wait=10.0)
+    try:
+        results = react_concurrently(engine=batched_engine, count=8)
+    finally:
+        batched_engine.close()
+    # full batches are taken without waiting for max_wait
+    assert batched_engine.batch_count == 2
+    assert batched_engine.row_count == 8
+    assert sorted(len(batch) for batch in engine.batches) == [4, 4]
+    for i, (actions, _, masks, is_greedy) in enumerate(results):
+        assert actions == [i]
+        assert masks == [f"mask {i}"]
+        assert is_greedy == [True]
+
+
+def test_max_wait():
+    engine = FakeEngine()
+    batched_engine = BatchedEngine(engine=engine, max_batch_size=64, max_wait=0.05)
+    try:
+        start = time.monotonic()
+        actions, _, _, _ = batched_engine.react_batch([7], [None], None)
+        elapsed = time.monotonic() - start
+    finally:
+        batched_engine.close()
+    # a lone request is evaluated once max_wait has passed
+    assert actions == [7]
+    assert 0.04 <= elapsed < 5.0
+    assert engine.batches == [[7]]
+
+
+def test_errors():
+    batched_engine = BatchedEngine(engine=FakeEngine(error=True), max_batch_size=2, max_wait=10.0)
+    try:
+        with pytest.raises(ValueError, match="broken engine"):
+            batched_engine.react_batch([1, 2], [None, None], None)
+        # the worker survives an error
+        batched_engine.engine.error = False
+        assert batched_engine.react_batch([3, 4], [None, None], None)[0] == [3, 4]
+    finally:
+        batched_engine.close()
+
+
+def test_broker():
+    registry = FakeRegistry()
+    with InferenceBroker(max_batch_size=8, max_wait=0.001, registry=registry) as broker:
+        engine = broker.get_engine(pth_file="a.pth")
+        assert broker.get_engine(pth_file="a.pth") is engine
+        assert broker.get_engine(pth_file="b.pth") is not engine
+        # engine settings are read through the batched engine
+        assert engine.name == "a.pth"
+        assert engine.react_batch([5], [None], None)[0] == [5]
+    assert engine.closed
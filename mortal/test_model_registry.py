@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+pytest.importorskip("mortal.mortal_lib.libriichi")
+
+import mortal.mortal_lib.model as mortal_model
+from mortal import model_registry
+from mortal.model_registry import ModelRegistry
+
+
+class StubEngine:
+    def __init__(self, pth_file: str, fingerprint: str):
+        self.pth_file = pth_file
+        self.fingerprint = fingerprint
+
+
+class StubBot:
+    def __init__(self, engine, seat: int):
+        self.engine = engine
+        self.seat = seat
+
+
+@pytest.fixture
+def loads(monkeypatch) -> list[StubEngine]:
+    engines = []
+
+    def load_engine(pth_file: str, decision_cache=None, fingerprint=None) -> StubEngine:
+        engines.append(StubEngine(pth_file=pth_file, fingerprint=fingerprint))
+        return engines[-1]
+
+    monkeypatch.setattr(mortal_model, "load_engine", load_engine)
+    monkeypatch.setattr(mortal_model, "Bot", StubBot)
+    return engines
+
+
+def write_file(path, content: bytes, mtime_ns: int):
+    path.write_bytes(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_same_file(tmp_path, loads):
+    write_file(path=tmp_path / "a.pth", content=b"weights", mtime_ns=10 ** 18)
+    registry = ModelRegistry()
+    engine = registry.get_engine(pth_file=str(tmp_path / "a.pth"))
+    assert registry.get_engine(pth_file=str(tmp_path / "a.pth")) is engine
+    # the same file through another path
+    assert registry.get_engine(pth_file=str(tmp_path / "." / "a.pth")) is engine
+    assert len(loads) == 1
+    assert engine.fingerprint == model_registry.get_file_hash(file_path=str(tmp_path / "a.pth"))
+
+
+def test_changed_file(tmp_path, loads, monkeypatch):
+    path = tmp_path / "a.pth"
+    write_file(path=path, content=b"weights", mtime_ns=10 ** 18)
+    registry = ModelRegistry()
+    engine = registry.get_engine(pth_file=str(path))
+
+    hashed = []
+    get_file_hash = model_registry.get_file_hash
+    monkeypatch.setattr(model_registry, "get_file_hash",
+                        lambda file_path: hashed.append(file_path) or get_file_hash(file_path=file_path))
+    # unchanged files are not hashed again
+    assert registry.get_engine(pth_file=str(path)) is engine
+    assert hashed == []
+
+    # new content is hashed again and the engine is reloaded
+    write_file(path=path, content=b"WEIGHTS", mtime_ns=10 ** 18 + 1)
+    new_engine = registry.get_engine(pth_file=str(path))
+    assert new_engine is not engine
+    assert new_engine.fingerprint != engine.fingerprint
+    assert len(hashed) == 1
+
+    # a touched file is hashed again, the engine is kept while the content is the same
+    write_file(path=path, content=b"WEIGHTS", mtime_ns=10 ** 18 + 2)
+    assert registry.get_engine(pth_file=str(path)) is new_engine
+    assert len(hashed) == 2
+    assert len(loads) == 2
+
+
+def test_create_bot(tmp_path, loads):
+    write_file(path=tmp_path / "a.pth", content=b"weights", mtime_ns=10 ** 18)
+    registry = ModelRegistry()
+    bots = [registry.create_bot(seat=seat, pth_file=str(tmp_path / "a.pth")) for seat in range(4)]
+    assert len(loads) == 1
+    assert [bot.seat for bot in bots] == [0, 1, 2, 3]
+    # every bot has its own view of the shared engine
+    assert all(bot.engine.engine is loads[0] for bot in bots)
+    assert len({id(bot.engine) for bot in bots}) == 4
@@ -0,0 +1,71 @@
+from typing import Optional
+
+import pytest
+
+pytest.importorskip("mortal.mortal_lib.libriichi")
+
+import torch
+from torch import nn
+
+import mortal.mortal_helpers as mortal_helpers
+import mortal.mortal_lib.model as mortal_model
+from mortal.model_registry import EngineSource
+from mortal.mortal_bot import MortalBot
+from mortal.mortal_helpers import MortalEvent
+
+
+class StubBrain(nn.Module):
+    def forward(self, obs):
+        return torch.zeros(obs.shape[0], 1)
+
+
+class StubDQN(nn.Module):
+    # prefers the allowed action with the lowest index
+    def forward(self, phi, masks):
+        q_out = -torch.arange(masks.shape[1], dtype=torch.float32).expand(masks.shape[0], -1)
+        return q_out.masked_fill(~masks, -torch.inf)
+
+
+class StubRegistry(EngineSource):
+    def __init__(self, decision_cache: Optional[mortal_model.DecisionCache] = None):
+        self.engine = mortal_model.MortalEngine(StubBrain(), StubDQN(), is_oracle=False, version=4,
+                                                decision_cache=decision_cache, fingerprint="stub")
+
+    def get_engine(self, pth_file: str) -> mortal_model.MortalEngine:
+        return self.engine
+
+
+def get_events() -> list[MortalEvent]:
+    return [
+        mortal_helpers.start_game(),
+        mortal_helpers.start_hand(
+            round_wind="E", dora_marker="5m", round_id=1, honba=0, riichi_sticks=0, dealer_id=0, scores=[25000] * 4,
+            start_hands=[["1m", "2m", "3m", "7m", "7m", "7m", "7s", "8s", "9s", "E", "E", "W", "N"], ["?"] * 13, ["?"] * 13, ["?"] * 13],
+        ),
+        mortal_helpers.draw_tile(player_id=0, tile="C"),
+    ]
+
+
+def test_lean_actions():
+    # libriichi accepts the empty q value and mask rows of the lean path and picks the same action
+    registry = StubRegistry()
+    action = MortalBot(player_id=0, pth_file="stub.pth", registry=registry).react_one(events=get_events())
+    lean_action = MortalBot(player_id=0, pth_file="stub.pth", registry=registry).react_one(events=get_events(),
+                                                                                          with_meta=False)
+    assert action["type"] == "dahai"
+    assert len(action["meta"]["q_values"]) > 0
+    assert "meta" not in lean_action
+    action.pop("meta")
+    assert lean_action == action
+
+
+def test_lean_rows_are_recomputed_for_meta():
+    cache = mortal_model.DecisionCache()
+    registry = StubRegistry(decision_cache=cache)
+    lean_action = MortalBot(player_id=0, pth_file="stub.pth", registry=registry).react_one(events=get_events(),
+                                                                                          with_meta=False)
+    # the cached lean row has no q values, so meta is computed again
+    action = MortalBot(player_id=0, pth_file="stub.pth", registry=registry).react_one(events=get_events())
+    assert len(action["meta"]["q_values"]) > 0
+    action.pop("meta")
+    assert lean_action == action
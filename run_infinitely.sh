@@ -1,7 +1,8 @@
 #!/bin/bash
 
-for ((i = 0; i < 1000; i++));
+# campaign.py simulates all walls in one process and resumes from its state file,
+# so it is only restarted if it crashes
+until python3 campaign.py 2>> _infinite_log.txt;
 do
-  echo $i
-  python3 main.py 2>> _infinite_log.txt
+  echo "Campaign exited with code $?, restarting"
 done
@@ -0,0 +1,120 @@
+import os
+import signal
+from concurrent.futures import Future
+from typing import Optional
+
+import pytest
+
+pytest.importorskip("mortal.mortal_lib.libriichi")
+
+from campaign import Campaign, CampaignState
+from drawing import drawing
+from emulator.results_store import ResultsStore
+from emulator.runner import PERMUTATIONS, WallRunner
+from emulator.wall import DuplicateWall
+
+PTH_FILES = ["a.pth", "b.pth", "c.pth", "d.pth"]
+
+
+class FakeRunner(WallRunner):
+    # every round is a draw, the runner crashes when it is given wall number crash_at
+    def __init__(self, crash_at: Optional[int] = None):
+        super().__init__(max_pending_walls=2)
+        self.crash_at = crash_at
+        self.walls: list[list[str]] = []
+
+    def submit_wall(self, shuffled_tiles: list[str]) -> list[Future]:
+        if len(self.walls) == self.crash_at:
+            raise RuntimeError("crash")
+        self.walls.append(shuffled_tiles)
+        futures = []
+        for _ in PERMUTATIONS:
+            future = Future()
+            future.set_result({"result": "draw"})
+            futures.append(future)
+        return futures
+
+
+def run_campaign(tmp_path, wall_runner: FakeRunner, walls_count: int = 8, name: str = "campaign") -> Campaign:
+    campaign = Campaign(
+        pth_files=PTH_FILES,
+        walls_count=walls_count,
+        seed="seed",
+        workers=1,
+        state_file_path=str(tmp_path / f"{name}_state.json"),
+        results_db_path=str(tmp_path / f"{name}.sqlite"),
+    )
+    campaign.create_runner = lambda: wall_runner
+    campaign.run()
+    return campaign
+
+
+def get_wall_hashes(walls: list[list[str]]) -> list[str]:
+    return [drawing.get_wall_hash(wall=DuplicateWall(shuffled_tiles=shuffled_tiles)) for shuffled_tiles in walls]
+
+
+def get_stored_wall_hashes(db_path: str) -> set[str]:
+    with ResultsStore(db_path=db_path) as store:
+        return {wall_hash for wall_hash, _, _ in store.iter_walls()}
+
+
+@pytest.fixture(autouse=True)
+def keep_signal_handlers(monkeypatch):
+    monkeypatch.setattr(signal, "signal", lambda signum, handler: None)
+
+
+def test_resume_after_crash(tmp_path):
+    expected_runner = FakeRunner()
+    run_campaign(tmp_path=tmp_path, wall_runner=expected_runner, name="expected")
+    expected = get_wall_hashes(walls=expected_runner.walls)
+    assert len(set(expected)) == 8
+
+    with pytest.raises(RuntimeError, match="crash"):
+        run_campaign(tmp_path=tmp_path, wall_runner=FakeRunner(crash_at=5))
+    state = CampaignState(file_path=str(tmp_path / "campaign_state.json"))
+    # walls submitted before the crash are saved, the one being submitted is pending
+    assert state.walls_done == 3
+    assert get_wall_hashes(walls=state.pending_walls) == expected[3:6]
+    assert get_stored_wall_hashes(db_path=str(tmp_path / "campaign.sqlite")) == set(expected[:3])
+
+    resumed_runner = FakeRunner()
+    campaign = run_campaign(tmp_path=tmp_path, wall_runner=resumed_runner)
+    # pending walls come first, then the walls the crashed campaign did not start
+    assert get_wall_hashes(walls=resumed_runner.walls) == expected[3:]
+    assert campaign.state.walls_done == 8
+    assert campaign.state.pending_walls == []
+    assert get_stored_wall_hashes(db_path=str(tmp_path / "campaign.sqlite")) == set(expected)
+    assert not os.path.exists(str(tmp_path / "campaign_state.json.tmp"))
+
+
+def test_resume_after_stop(tmp_path):
+    expected_runner = FakeRunner()
+    run_campaign(tmp_path=tmp_path, wall_runner=expected_runner, name="expected")
+    expected = get_wall_hashes(walls=expected_runner.walls)
+
+    class StoppingRunner(FakeRunner):
+        def submit_wall(self, shuffled_tiles: list[str]) -> list[Future]:
+            futures = super().submit_wall(shuffled_tiles=shuffled_tiles)
+            if len(self.walls) == 4:
+                campaign.request_stop(signum=signal.SIGTERM, frame=None)
+            return futures
+
+    stopping_runner = StoppingRunner()
+    campaign = Campaign(
+        pth_files=PTH_FILES,
+        walls_count=8,
+        seed="seed",
+        workers=1,
+        state_file_path=str(tmp_path / "campaign_state.json"),
+        results_db_path=str(tmp_path / "campaign.sqlite"),
+    )
+    campaign.create_runner = lambda: stopping_runner
+    campaign.run()
+    # walls in progress are finished after a stop request, no new walls are started
+    assert campaign.state.walls_done == 4
+    assert campaign.state.pending_walls == []
+
+    resumed_runner = FakeRunner()
+    run_campaign(tmp_path=tmp_path, wall_runner=resumed_runner)
+    assert get_wall_hashes(walls=resumed_runner.walls) == expected[4:]
+    assert get_stored_wall_hashes(db_path=str(tmp_path / "campaign.sqlite")) == set(expected)